@@ -1,20 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from fastapi.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from pydantic import BaseModel
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import NamedTuple, Optional
+import os
 import time
 
 from database import SessionLocal
 from models import User as DBUser
+from shared_cache import SHARED_CACHE_PATH, SharedCache, TieredCache
+from password_pool import PasswordPoolBusy, password_pool
 
 SECRET_KEY = "secret_key"
 ALGORITHM = "HS256" 
 ACCESS_TOKEN_EXPIRE_SECONDS = 3600
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))  # 0 disables both caches
+# Changing this rehashes each user's password at their next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login") 
 router = APIRouter()
 
@@ -36,28 +46,48 @@ def get_db():
     finally:
         db.close()
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
 def get_password_hash(password):
     return pwd_context.hash(password)
 
 def get_user(db: Session, username: str):
     return db.query(DBUser).filter(DBUser.username == username).first()
 
-def create_user(db: Session, username: str, password: str):
-    hashed_password = get_password_hash(password)
-    db_user = DBUser(username=username, hashed_password=hashed_password) 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
-
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
-    if not user or not verify_password(password, user.hashed_password):
+def insert_user(username: str, hashed_password: str) -> bool:
+    """False if the username is taken."""
+    db = SessionLocal()
+    try:
+        db.add(DBUser(username=username, hashed_password=hashed_password))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
         return False
-    return user
+    finally:
+        db.close()
+
+def load_credentials(username: str):
+    """(id, hashed password) or None."""
+    db = SessionLocal()
+    try:
+        return db.query(DBUser.id, DBUser.hashed_password).filter(DBUser.username == username).first()
+    finally:
+        db.close()
+
+def update_password_hash(user_id: int, hashed_password: str):
+    db = SessionLocal()
+    try:
+        db.query(DBUser).filter(DBUser.id == user_id).update({"hashed_password": hashed_password})
+        db.commit()
+    finally:
+        db.close()
+
+async def run_password_hash(fn, *args):
+    """Run a bcrypt call on the password pool; 429 when the pool is saturated."""
+    try:
+        return await password_pool.run(fn, *args)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=429, detail="Too many logins in progress, try again shortly",
+                            headers={"Retry-After": "1"})
 
 def create_access_token(data: dict, expires_delta: Optional[int] = None):
     to_encode = data.copy()
@@ -66,44 +96,100 @@ def create_access_token(data: dict, expires_delta: Optional[int] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# bcrypt runs on the password pool and database calls in the thread pool, so neither blocks the
+# event loop and a login burst cannot take more than the pool's share of the CPU.
 @router.post("/register", status_code=201)
-def register(user_in: UserIn, db: Session = Depends(get_db)):
-    if get_user(db, user_in.username):
+async def register(user_in: UserIn):
+    if await run_in_threadpool(load_credentials, user_in.username) is not None:
+        raise HTTPException(status_code=400, detail="Username already registered")
+    hashed_password = await run_password_hash(get_password_hash, user_in.password)
+    if not await run_in_threadpool(insert_user, user_in.username, hashed_password):
         raise HTTPException(status_code=400, detail="Username already registered")
-    create_user(db, user_in.username, user_in.password)
     return {"msg": "User registered successfully"}
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    credentials = await run_in_threadpool(load_credentials, form_data.username)
+    if credentials is None:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
-    access_token = create_access_token(data={"sub": user.username})
+    user_id, hashed_password = credentials
+    verified, new_hash = await run_password_hash(pwd_context.verify_and_update, form_data.password, hashed_password)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    if new_hash is not None:
+        # hashed with other bcrypt settings than BCRYPT_ROUNDS
+        await run_in_threadpool(update_password_hash, user_id, new_hash)
+    access_token = create_access_token(data={"sub": form_data.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+class CurrentUser(NamedTuple):
+    """What request handlers get from get_current_user: a snapshot, never bound to a session."""
+    id: int
+    username: str
+
+# Validated token -> username (until the token expires or the TTL passes, whichever is first), and
+# username -> CurrentUser. A cached request does two dict lookups: no JWT decode, no session, no query.
+# With several workers on one host (SHARED_CACHE_PATH) a miss in memory falls back to the shared cache.
+token_cache = TieredCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS, SharedCache(
+    SHARED_CACHE_PATH, "auth_token", AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS,
+) if SHARED_CACHE_PATH else None)
+user_cache = TieredCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS, SharedCache(
+    SHARED_CACHE_PATH, "auth_user", AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS, decode=lambda value: CurrentUser(*value),
+) if SHARED_CACHE_PATH else None)
+
+# Changes made through the ORM in this process drop the cached user at once (other workers on the
+# host see them within SHARED_CACHE_MEMORY_TTL_SECONDS); other hosts within AUTH_CACHE_TTL_SECONDS.
+@event.listens_for(DBUser, "after_update")
+@event.listens_for(DBUser, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.pop(target.username)
+    for old_username in inspect(target).attrs.username.history.deleted or ():
+        user_cache.pop(old_username)
+
+def load_user(username: str):
+    db = SessionLocal()
+    try:
+        user = get_user(db, username)
+    finally:
+        db.close()
+    return CurrentUser(user.id, user.username) if user is not None else None
+
+# The lookup uses its own short-lived session instead of Depends(get_db), which would pin a pooled
+# connection for the whole request (including time spent waiting on the LLM).
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    username = await token_cache.aget(token)
+    if username is not None:
+        user = await user_cache.aget(username)
+        if user is not None:
+            return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    if username is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        if AUTH_CACHE_TTL_SECONDS > 0:
+            await token_cache.aset(token, username, min(AUTH_CACHE_TTL_SECONDS, payload.get("exp", float("inf")) - time.time()))
 
-    user = get_user(db, username)
+    user = await run_in_threadpool(load_user, username)
     if user is None:
         raise credentials_exception
+    if AUTH_CACHE_TTL_SECONDS > 0:
+        await user_cache.aset(username, user)
     return user
 
 @router.get("/me")
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: CurrentUser = Depends(get_current_user)):
     return {"username": current_user.username}
 
 @router.get("/userinfo")
-async def get_user_info(current_user: DBUser = Depends(get_current_user)):
+async def get_user_info(current_user: CurrentUser = Depends(get_current_user)):
     return {"id": current_user.id, "username": current_user.username}
@@ -0,0 +1,76 @@
+"""Schedule many (user, tasks, available time) jobs in one pass.
+
+Instead of N independent /personalized-schedule calls, a batch:
+  1. loads every user's scoring index with one query per feature-store table (users whose store is
+     stale are rebuilt together, scoring all of their logs in one model pass),
+  2. parses every job's text concurrently (parse cache, coalescing and the LLM semaphore still apply),
+  3. runs schedule_tasks_cognitive for each job on a process pool,
+and yields each job's result as soon as its schedule is done.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scheduler import schedule_tasks_cognitive, schedule_utilization
+
+BATCH_SCHEDULE_PROCESSES = int(os.getenv("BATCH_SCHEDULE_PROCESSES", str(os.cpu_count() or 1)))
+BATCH_SCHEDULE_MAX_JOBS = int(os.getenv("BATCH_SCHEDULE_MAX_JOBS", "1000"))
+
+_process_pool = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Workers come from a forkserver: forking the API process directly would copy its threads' locks."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=BATCH_SCHEDULE_PROCESSES, mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True)
+        _process_pool = None
+
+
+async def stream_batch(jobs: list[dict], parse_tasks, load_profiles, personalize, thread_executor):
+    """Yield {"index", "user_id", ...} per job in completion order.
+
+    parse_tasks(job) -> parsed task dicts (async); load_profiles(user_ids) -> {user_id: profile}
+    and personalize(profile, tasks) run on thread_executor; profile is None for users without history.
+    """
+    loop = asyncio.get_running_loop()
+    process_pool = get_process_pool()
+    profiles = loop.run_in_executor(thread_executor, load_profiles, {job["user_id"] for job in jobs})
+
+    async def run_job(index, job):
+        result = {"index": index, "user_id": job["user_id"]}
+        try:
+            parsed_tasks = await parse_tasks(job)
+            profile = (await asyncio.shield(profiles)).get(job["user_id"])
+            parsed_tasks = await loop.run_in_executor(thread_executor, personalize, profile, parsed_tasks)
+            schedule = await loop.run_in_executor(
+                process_pool, schedule_tasks_cognitive, parsed_tasks, job["available_time_minutes"],
+                job.get("schedule_mode", "greedy"),
+            )
+        except Exception as e:
+            return {**result, "error": str(e)}
+        return {
+            **result,
+            "available_time_minutes": job["available_time_minutes"],
+            "parsed_tasks": parsed_tasks,
+            "schedule": schedule,
+            "utilization": schedule_utilization(schedule, job["available_time_minutes"]),
+        }
+
+    pending = [asyncio.ensure_future(run_job(i, job)) for i, job in enumerate(jobs)]
+    try:
+        for next_done in asyncio.as_completed(pending):
+            yield await next_done
+    finally:
+        for task in pending:
+            task.cancel()
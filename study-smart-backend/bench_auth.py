@@ -0,0 +1,93 @@
+"""Benchmark: per-request cost of get_current_user with and without the token/user caches.
+
+"uncached" clears both caches before every call, which is what every request paid before them
+(JWT decode, a thread hop, a session and a users query). Also times GET /auth/me end to end in
+process, and checks that deleting a user invalidates the cache.
+
+Run with: python bench_auth.py [--requests 2000]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_auth.db")
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+import auth
+from database import Base, SessionLocal, engine
+
+
+def clear_caches():
+    auth.token_cache.clear()
+    auth.user_cache.clear()
+
+
+async def time_dependency(token: str, n: int, cached: bool) -> list[float]:
+    timings = []
+    for _ in range(n):
+        if not cached:
+            clear_caches()
+        start = time.perf_counter()
+        await auth.get_current_user(token)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def time_endpoint(token: str, n: int, cached: bool) -> list[float]:
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    headers = {"Authorization": f"Bearer {token}"}
+    timings = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(n):
+            if not cached:
+                clear_caches()
+            start = time.perf_counter()
+            response = await client.get("/auth/me", headers=headers)
+            timings.append(time.perf_counter() - start)
+            response.raise_for_status()
+    return timings
+
+
+def summary(timings: list[float]) -> str:
+    timings = sorted(timings)
+    return f"{statistics.median(timings) * 1e6:>9.1f} {timings[int(len(timings) * 0.99) - 1] * 1e6:>9.1f}"
+
+
+async def run(n: int):
+    Base.metadata.create_all(bind=engine)
+    if auth.load_credentials("bench") is None:
+        auth.insert_user("bench", auth.get_password_hash("bench"))
+    token = auth.create_access_token({"sub": "bench"})
+
+    print(f"{'':<28} {'p50 us':>9} {'p99 us':>9}")
+    for name, timer in [("get_current_user", time_dependency), ("GET /auth/me", time_endpoint)]:
+        for cached in (False, True):
+            timings = await timer(token, n, cached)
+            print(f"{name + (' cached' if cached else ' uncached'):<28} {summary(timings)}")
+
+    db = SessionLocal()
+    db.delete(auth.get_user(db, "bench"))
+    db.commit()
+    db.close()
+    try:
+        await auth.get_current_user(token)
+        raise SystemExit("deleted user still authenticated from the cache")
+    except HTTPException as e:
+        print(f"after delete: {e.status_code} (cache invalidated)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
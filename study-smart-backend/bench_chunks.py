@@ -0,0 +1,82 @@
+"""Benchmark: eagerly built chunk dicts vs lazy Chunk records, for long-horizon plans.
+
+The eager variant is the greedy scheduler as it was before iter_chunks: every chunk of every task
+is built as a dict before scheduling starts. Peak memory is measured with tracemalloc.
+
+Run with: python bench_chunks.py [--tasks 1000 10000 50000] [--budgets 240 1680]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import deque
+
+from bench_data import synthetic_parsed_tasks
+from scheduler import BREAK_DURATION, WORK_BEFORE_BREAK, break_entry, chunk_task, schedule_tasks_cognitive
+
+
+def eager_greedy(parsed_tasks, available_time_minutes):
+    parsed_tasks = sorted(
+        parsed_tasks, key=lambda t: (t.get("must_do", False), t.get("priority_score", 0)), reverse=True
+    )
+    chunk_queues = deque(deque(chunk_task(task)) for task in parsed_tasks)
+    schedule = []
+    time_used = 0
+    work_since_last_break = 0
+    while chunk_queues:
+        queue = chunk_queues.popleft()
+        chunk = queue.popleft()
+        if queue:
+            chunk_queues.append(queue)
+        if time_used + chunk["duration"] > available_time_minutes:
+            return schedule
+        schedule.append(chunk)
+        time_used += chunk["duration"]
+        work_since_last_break += chunk["duration"]
+        if work_since_last_break >= WORK_BEFORE_BREAK and time_used + BREAK_DURATION <= available_time_minutes:
+            schedule.append(break_entry())
+            time_used += BREAK_DURATION
+            work_since_last_break = 0
+    return schedule
+
+
+def measure(fn, repeat):
+    """(best seconds, peak traced KiB, result)."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--budgets", type=int, nargs="+", default=[240, 7 * 240])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>7} {'budget':>7} | {'eager ms':>9} {'peak KiB':>10} | {'lazy ms':>9} {'peak KiB':>10} | {'speedup':>7} {'memory':>7}")
+    for n_tasks in args.tasks:
+        tasks = synthetic_parsed_tasks(n_tasks, seed=n_tasks)
+        for budget in args.budgets:
+            eager_time, eager_peak, eager = measure(lambda: eager_greedy(tasks, budget), args.repeat)
+            lazy_time, lazy_peak, lazy = measure(lambda: schedule_tasks_cognitive(tasks, budget), args.repeat)
+            if eager != lazy:
+                raise SystemExit(f"schedules differ at {n_tasks} tasks, {budget} minutes")
+            print(
+                f"{n_tasks:>7} {budget:>7} | {eager_time * 1000:>9.2f} {eager_peak:>10.0f} | "
+                f"{lazy_time * 1000:>9.2f} {lazy_peak:>10.0f} | "
+                f"{eager_time / lazy_time:>6.1f}x {eager_peak / lazy_peak:>6.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
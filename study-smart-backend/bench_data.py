@@ -0,0 +1,85 @@
+"""Synthetic, seeded data for the benchmarks: TaskLog-shaped histories and parsed task lists."""
+import random
+from datetime import datetime, timedelta
+
+SUBJECTS = ["math", "biology", "history", "physics", "english", "chemistry", "economics", "spanish"]
+TASK_TYPES = ["homework", "reading", "writing", "problem_solving", "video_watching", "project", "assignment"]
+ACTIONS = ["c", "c", "c", "s", "d", "e"]
+
+
+def synthetic_description(rng: random.Random, n_topics: int) -> str:
+    subject = rng.choice(SUBJECTS)
+    task_type = rng.choice(TASK_TYPES).replace("_", " ")
+    return f"{subject} {task_type} {rng.randrange(n_topics)}"
+
+
+def synthetic_logs(n_rows: int, seed: int = 0, user_id: int = 1, days: int = 120) -> list[dict]:
+    """Rows shaped like personalization.get_user_logs output (plus user_id), newest first."""
+    rng = random.Random(seed)
+    n_topics = max(5, n_rows // 20)
+    now = datetime.utcnow()
+    rows = []
+    for _ in range(n_rows):
+        description = synthetic_description(rng, n_topics)
+        task_type = description.split(" ", 1)[1].rsplit(" ", 1)[0].replace(" ", "_")
+        scheduled = rng.choice([10, 15, 20, 25])
+        action = rng.choice(ACTIONS)
+        rows.append({
+            "user_id": user_id,
+            "task_id": f"t{rng.randrange(10 ** 9)}",
+            "task_description": f"{description} (Part {rng.randint(1, 4)})",
+            "task_type": task_type,
+            "scheduled_duration": scheduled,
+            "actual_duration": scheduled + (rng.choice([5, 10]) if action == "e" else 0),
+            "action": action,
+            "timestamp": now - timedelta(days=rng.uniform(0, days)),
+        })
+    rows.sort(key=lambda r: r["timestamp"], reverse=True)
+    return rows
+
+
+def synthetic_parsed_tasks(n_tasks: int, seed: int = 0, n_topics: int = 50) -> list[dict]:
+    """Task dicts shaped like call_gpt_parse_tasks output."""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(n_tasks):
+        description = synthetic_description(rng, n_topics)
+        tasks.append({
+            "description": description,
+            "subject": description.split(" ", 1)[0],
+            "task_type": description.split(" ", 1)[1].rsplit(" ", 1)[0].replace(" ", "_"),
+            "estimated_duration_minutes": rng.choice([20, 30, 45, 60, 90]),
+            "task_id": f"task-{seed}-{i}",
+            "must_do": rng.random() < 0.1,
+        })
+    return tasks
+
+
+def synthetic_users(n_users: int, seed: int = 0) -> list[dict]:
+    """Credentials for n_users distinct accounts; the same seed gives the same names."""
+    return [{"username": f"bench-{seed}-{i}", "password": f"bench-password-{i}"} for i in range(n_users)]
+
+
+def populate_database(users: list[dict], logs_per_user: int, seed: int = 0) -> list[int]:
+    """Create the schema in the DATABASE_URL database and insert users (password hashes made with
+    the configured BCRYPT_ROUNDS) and logs_per_user TaskLog rows each; returns the user ids.
+    Feature store rows are left for the first read to build, as for any user after a model change."""
+    from auth import get_password_hash
+    from database import Base, SessionLocal, engine
+    from migrations import upgrade
+    from models import TaskLog, User
+
+    Base.metadata.create_all(bind=engine)
+    upgrade()
+    db = SessionLocal()
+    try:
+        rows = [User(username=u["username"], hashed_password=get_password_hash(u["password"])) for u in users]
+        db.add_all(rows)
+        db.flush()
+        user_ids = [row.id for row in rows]
+        for i, user_id in enumerate(user_ids):
+            db.bulk_insert_mappings(TaskLog, synthetic_logs(logs_per_user, seed=seed * 100_003 + i, user_id=user_id))
+        db.commit()
+        return user_ids
+    finally:
+        db.close()
@@ -0,0 +1,61 @@
+"""Benchmark: generic per-estimator predict_proba scoring vs CompiledLinearScorer.
+
+Run with: python bench_inference.py [--sizes 10 100 1000 10000 100000]
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import personalization
+from bench_data import synthetic_logs
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def score(features, weights, compiled):
+    personalization.USE_COMPILED_SCORER = compiled
+    return personalization.compute_task_priority_scores(features, weights)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if personalization.get_compiled_scorer(personalization.get_model()) is None:
+        raise SystemExit("the loaded model is not linear; only the generic path is available")
+
+    print(f"{'rows':>8} {'generic ms':>11} {'compiled ms':>12} {'speedup':>8} {'generic KiB':>12} {'compiled KiB':>13} {'max abs diff':>13}")
+    for n_rows in args.sizes:
+        df = pd.DataFrame(synthetic_logs(n_rows, seed=n_rows))
+        features, weights = personalization.preprocess_user_logs(df)
+
+        generic_time, generic_peak, generic = timed(lambda: score(features, weights, False), args.repeat)
+        compiled_time, compiled_peak, compiled = timed(lambda: score(features, weights, True), args.repeat)
+
+        diff = float(np.max(np.abs(generic.to_numpy() - compiled.to_numpy())))
+        print(
+            f"{n_rows:>8} {generic_time * 1000:>11.2f} {compiled_time * 1000:>12.3f} "
+            f"{generic_time / compiled_time:>7.1f}x {generic_peak / 1024:>12.0f} {compiled_peak / 1024:>13.0f} {diff:>13.2e}"
+        )
+        if not np.allclose(generic.to_numpy(), compiled.to_numpy(), rtol=1e-9, atol=1e-12):
+            raise SystemExit(f"compiled scores diverge from predict_proba at {n_rows} rows")
+
+
+if __name__ == "__main__":
+    main()
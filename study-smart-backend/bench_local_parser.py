@@ -0,0 +1,88 @@
+"""Benchmark: how many inputs the local parser resolves, and how fast, against the LLM round trip.
+
+Inputs are a fixed list of typical requests plus synthetic ones from bench_data. With --llm-url,
+escalated inputs are also timed against an OpenAI-compatible endpoint (e.g. stub_llm.py).
+
+Run with: python bench_local_parser.py [--min-confidence 0.8] [--llm-url http://127.0.0.1:8001/v1]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from bench_data import synthetic_parsed_tasks
+from local_parser import DEFAULT_DURATIONS, parse_locally
+
+TYPICAL_INPUTS = [
+    "do 2 homework assignments, read chapter 3",
+    "read chapter 3 of the biology textbook and write essay on the french revolution",
+    "finish the chemistry lab report",
+    "watch two lectures for econ",
+    "leetcode for 1.5 hours",
+    "read 20 pages of hamlet, then write a draft",
+    "10 physics problems; spanish worksheet",
+    "math pset 4 and history reading",
+    "study for my calculus exam",
+    "review notes from last week",
+    "prepare presentation slides for the group project",
+    "finish the capstone project and watch the recorded lecture",
+    "3 essays",
+    "catch up on everything",
+    "do problem set 2, read article, watch video",
+    "write 500 words for english, 30 minutes of statistics homework",
+]
+
+
+def synthetic_inputs(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    tasks = synthetic_parsed_tasks(n * 3, seed=seed)
+    return [", ".join(t["description"] for t in rng.sample(tasks, rng.randint(1, 4))) for _ in range(n)]
+
+
+async def time_llm(inputs: list[str], url: str) -> float:
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(base_url=url, api_key="bench")
+    start = time.perf_counter()
+    for text in inputs:
+        await client.chat.completions.create(
+            model="gpt-4", messages=[{"role": "user", "content": f"Tasks: {text}"}], temperature=0.3
+        )
+    return (time.perf_counter() - start) / max(1, len(inputs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--min-confidence", type=float, default=0.8)
+    parser.add_argument("--synthetic", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--llm-url")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    for name, inputs in [("typical", TYPICAL_INPUTS), ("synthetic", synthetic_inputs(args.synthetic))]:
+        resolved, escalated = [], []
+        for text in inputs:
+            tasks, confidence = parse_locally(text, DEFAULT_DURATIONS)
+            ok = tasks is not None and confidence > args.min_confidence
+            (resolved if ok else escalated).append(text)
+            if args.verbose:
+                print(f"  {'local' if ok else 'LLM  '} {confidence:.2f}  {text}")
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for text in inputs:
+                parse_locally(text, DEFAULT_DURATIONS)
+        per_parse_us = (time.perf_counter() - start) / (args.repeat * len(inputs)) * 1e6
+
+        line = (
+            f"{name:<10} {len(inputs):>5} inputs  {len(resolved) / len(inputs):>6.1%} resolved locally  "
+            f"{per_parse_us:>7.1f} us/parse"
+        )
+        if args.llm_url and escalated:
+            line += f"  LLM {asyncio.run(time_llm(escalated[:20], args.llm_url)) * 1000:.0f} ms/parse"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark: a burst of concurrent logins against other traffic on the same API process.
+
+Starts the API under uvicorn against a throwaway SQLite database, registers --users accounts,
+then fires --concurrency logins at once in a loop for --seconds while a probe polls GET /ready.
+Reports login throughput and latency, how many logins were turned away with 429, and the
+probe's latency, which is what a blocking bcrypt call on the event loop used to ruin.
+
+Run with: python bench_login_storm.py [--concurrency 50] [--seconds 10] [--workers 1] [--max-pending 4]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_stream import HERE, wait_for
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else 0.0
+
+
+async def storm(base_url, users, concurrency, seconds):
+    logins, rejected, failed, probes = [], 0, 0, []
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=concurrency + 1)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def login(i):
+            nonlocal rejected, failed
+            while time.monotonic() < deadline:
+                username = f"storm{(i + len(logins)) % users}"
+                start = time.perf_counter()
+                response = await client.post("/auth/login", data={"username": username, "password": "storm-password"})
+                if response.status_code == 200:
+                    logins.append(time.perf_counter() - start)
+                elif response.status_code == 429:
+                    rejected += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+                else:
+                    failed += 1
+
+        async def probe():
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                await client.get("/ready")
+                probes.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        start = time.monotonic()
+        await asyncio.gather(probe(), *(login(i) for i in range(concurrency)))
+    # logins already queued at the deadline still finish, so throughput is over the real duration
+    return logins, rejected, failed, probes, time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="PASSWORD_HASH_WORKERS")
+    parser.add_argument("--max-pending", type=int, default=4, help="PASSWORD_HASH_MAX_PENDING")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--port", type=int, default=8063)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+        MODEL_REGISTRY_DIR=os.path.join(tmp, "model_registry"),
+        PASSWORD_HASH_WORKERS=str(args.workers),
+        PASSWORD_HASH_MAX_PENDING=str(args.max_pending),
+        BCRYPT_ROUNDS=str(args.rounds),
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for(f"{base_url}/ready", timeout=120)
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            for i in range(args.users):
+                client.post("/auth/register", json={"username": f"storm{i}", "password": "storm-password"})
+            while client.get("/ready").status_code != 200:
+                time.sleep(0.2)
+            idle = []
+            for _ in range(20):
+                start = time.perf_counter()
+                client.get("/ready")
+                idle.append(time.perf_counter() - start)
+
+        logins, rejected, failed, probes, elapsed = asyncio.run(storm(base_url, args.users, args.concurrency, args.seconds))
+        print(
+            f"{args.concurrency} concurrent logins for {elapsed:.1f}s, "
+            f"{args.workers} hash workers, {args.max_pending} pending, {args.rounds} rounds"
+        )
+        print(f"  logins       {len(logins) / elapsed:>8.1f}/s  p50 {percentile(logins, 0.5):>7.0f} ms  p99 {percentile(logins, 0.99):>7.0f} ms")
+        print(f"  rejected 429 {rejected:>8}    failed {failed}")
+        print(f"  /ready idle  p50 {statistics.median(idle) * 1000:>7.1f} ms")
+        print(f"  /ready storm p50 {percentile(probes, 0.5):>7.1f} ms  p99 {percentile(probes, 0.99):>7.1f} ms")
+    finally:
+        api.terminate()
+        api.wait()
+
+
+if __name__ == "__main__":
+    main()
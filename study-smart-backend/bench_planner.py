@@ -0,0 +1,73 @@
+"""Benchmark: incremental plan repair vs rebuilding the plan, for week-long plans.
+
+Each action is applied to the first pending chunk of a random window, on a copy of the plan.
+Rebuilding means new_plan on the same tasks (what re-planning cost before, minus the LLM call).
+Also checks that timed windows take fractional durations, as personalized estimates (per-user
+mean minutes) are.
+
+Run with: python bench_planner.py [--tasks 20 100 500] [--days 7]
+"""
+import argparse
+import copy
+import random
+import re
+import statistics
+import time
+
+from bench_data import synthetic_parsed_tasks
+from planner import apply_action, day_windows, new_plan
+
+WINDOWS = [("16:00", "17:30"), ("19:00", "21:00")]
+
+
+def check_float_durations(days: int):
+    tasks = [dict(t, estimated_duration_minutes=t["estimated_duration_minutes"] * 7 / 6) for t in synthetic_parsed_tasks(20)]
+    plan = new_plan(1, tasks, [(f"day-{d}", day_windows(None, WINDOWS)) for d in range(days)])
+    items = [i for day in plan["days"] for w in day["windows"] for i in w["items"]]
+    apply_action(plan, next(i["chunk_id"] for i in items if "chunk_id" in i), "e", 7.5)
+    items = [i for day in plan["days"] for w in day["windows"] for i in w["items"]]
+    assert all(re.fullmatch(r"\d\d:\d\d", i["start"]) for i in items), "bad start times with fractional durations"
+    print(f"fractional durations: {len(items)} items placed with HH:MM starts")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[20, 100, 500])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--actions", type=int, default=200)
+    args = parser.parse_args()
+
+    check_float_durations(args.days)
+    print(f"{'tasks':>6} {'chunks':>7} | {'rebuild ms':>10} | " + " | ".join(f"{a} ms p50/p99" for a in "sde"))
+    for n_tasks in args.tasks:
+        tasks = synthetic_parsed_tasks(n_tasks, seed=n_tasks)
+        days = [(f"day-{d}", day_windows(None, WINDOWS)) for d in range(args.days)]
+
+        rebuild = []
+        for _ in range(5):
+            start = time.perf_counter()
+            plan = new_plan(1, tasks, copy.deepcopy(days))
+            rebuild.append(time.perf_counter() - start)
+        windows = [w for day in plan["days"] for w in day["windows"]]
+        n_chunks = sum("chunk_id" in i for w in windows for i in w["items"]) + len(plan["backlog"])
+
+        rng = random.Random(n_tasks)
+        columns = []
+        for action in "sde":
+            timings = []
+            for _ in range(args.actions):
+                trial = copy.deepcopy(plan)
+                trial_windows = [w for day in trial["days"] for w in day["windows"]]
+                items = [i for i in rng.choice(trial_windows)["items"] if "chunk_id" in i]
+                if not items:
+                    continue
+                start = time.perf_counter()
+                apply_action(trial, items[0]["chunk_id"], action, 15 if action == "e" else None)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            columns.append(f"{statistics.median(timings) * 1000:>6.3f}/{timings[int(len(timings) * 0.99) - 1] * 1000:<6.3f}")
+        print(f"{n_tasks:>6} {n_chunks:>7} | {min(rebuild) * 1000:>10.2f} | " + " | ".join(f"{c:>13}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: greedy vs optimal schedule packing, sweeping task count and available time.
+
+Reports budget utilization, priority-weighted minutes (the value "optimal" maximizes) and runtime,
+and checks that the deque-based greedy still produces the old list-rotation schedule.
+
+Run with: python bench_scheduler.py [--tasks 10 100 500 1000] [--budgets 60 240 600]
+"""
+import argparse
+import random
+import time
+
+from bench_data import synthetic_parsed_tasks
+from scheduler import (
+    BREAK_DURATION, MUST_DO_WEIGHT, WORK_BEFORE_BREAK, break_entry, chunk_task, schedule_tasks_cognitive,
+    schedule_utilization,
+)
+
+
+def legacy_greedy(parsed_tasks, available_time_minutes):
+    """schedule_tasks_cognitive before the deque rotation: O(tasks) list copy + remove per chunk."""
+    parsed_tasks = sorted(
+        parsed_tasks, key=lambda t: (t.get("must_do", False), t.get("priority_score", 0)), reverse=True
+    )
+    chunk_queues = {task["task_id"]: chunk_task(task) for task in parsed_tasks}
+    task_order = list(chunk_queues)
+    schedule = []
+    time_used = 0
+    work_since_last_break = 0
+    while any(chunk_queues.values()):
+        for task_id in list(task_order):
+            if not chunk_queues[task_id]:
+                task_order.remove(task_id)
+                continue
+            chunk = chunk_queues[task_id].pop(0)
+            if time_used + chunk["duration"] > available_time_minutes:
+                return schedule
+            schedule.append(chunk)
+            time_used += chunk["duration"]
+            work_since_last_break += chunk["duration"]
+            if work_since_last_break >= WORK_BEFORE_BREAK and time_used + BREAK_DURATION <= available_time_minutes:
+                schedule.append(break_entry())
+                time_used += BREAK_DURATION
+                work_since_last_break = 0
+    return schedule
+
+
+def weighted_minutes(schedule, tasks_by_id):
+    total = 0.0
+    for item in schedule:
+        if item["task_type"] == "break":
+            continue
+        task = tasks_by_id[item["task_id"]]
+        weight = max(0.1, 1 + task.get("priority_score", 0))
+        total += item["duration"] * weight * (MUST_DO_WEIGHT if task.get("must_do") else 1)
+    return total
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--budgets", type=int, nargs="+", default=[60, 240, 600])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'tasks':>6} {'budget':>7} | {'legacy ms':>10} {'greedy ms':>10} {'util':>6} {'value':>8} | "
+        f"{'optimal ms':>10} {'util':>6} {'value':>8} {'gain':>7}"
+    )
+    for n_tasks in args.tasks:
+        tasks = synthetic_parsed_tasks(n_tasks, seed=n_tasks)
+        rng = random.Random(n_tasks)
+        for task in tasks:
+            task["priority_score"] = rng.uniform(-0.5, 1.0)
+        tasks_by_id = {task["task_id"]: task for task in tasks}
+
+        for budget in args.budgets:
+            legacy_time, legacy = best_of(lambda: legacy_greedy(tasks, budget), args.repeat)
+            greedy_time, greedy = best_of(lambda: schedule_tasks_cognitive(tasks, budget, "greedy"), args.repeat)
+            optimal_time, optimal = best_of(lambda: schedule_tasks_cognitive(tasks, budget, "optimal"), args.repeat)
+            if greedy != legacy:
+                raise SystemExit(f"greedy schedule changed at {n_tasks} tasks, {budget} minutes")
+            for schedule in (greedy, optimal):
+                used = sum(item["duration"] for item in schedule)
+                if used > budget:
+                    raise SystemExit(f"schedule over budget at {n_tasks} tasks, {budget} minutes: {used}")
+
+            greedy_value = weighted_minutes(greedy, tasks_by_id)
+            optimal_value = weighted_minutes(optimal, tasks_by_id)
+            print(
+                f"{n_tasks:>6} {budget:>7} | {legacy_time * 1000:>10.2f} {greedy_time * 1000:>10.2f} "
+                f"{schedule_utilization(greedy, budget)['utilization']:>6.1%} {greedy_value:>8.0f} | "
+                f"{optimal_time * 1000:>10.2f} {schedule_utilization(optimal, budget)['utilization']:>6.1%} "
+                f"{optimal_value:>8.0f} {optimal_value / greedy_value - 1 if greedy_value else 0:>+7.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark: per-task DataFrame scans vs TaskScoringIndex, sweeping log history size.
+
+Run with: python bench_scoring.py [--tasks 10] [--sizes 10 100 1000 10000 100000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_data import synthetic_logs, synthetic_parsed_tasks
+from personalization import TaskScoringIndex
+
+
+def legacy_score_tasks(df_logs: pd.DataFrame, parsed_tasks: list[dict]) -> np.ndarray:
+    """The scoring loop personalized_schedule used before TaskScoringIndex."""
+    avg_scores_by_type = df_logs.groupby("task_type")["priority_score"].mean().to_dict()
+    scores = []
+    for task in parsed_tasks:
+        matching_logs = df_logs[
+            df_logs["task_description"].str.contains(task["description"], case=False, na=False)
+        ]
+        if not matching_logs.empty:
+            scores.append(
+                (matching_logs["priority_score"] * matching_logs["recency_weight"]).sum()
+                / matching_logs["recency_weight"].sum()
+            )
+        else:
+            scores.append(avg_scores_by_type.get(task["task_type"], 0))
+    return np.asarray(scores, dtype=float)
+
+
+def scored_logs(n_rows: int, seed: int) -> pd.DataFrame:
+    df = pd.DataFrame(synthetic_logs(n_rows, seed=seed))
+    rng = np.random.default_rng(seed)
+    days_ago = (pd.Timestamp.utcnow().tz_localize(None) - df["timestamp"]).dt.days
+    df["recency_weight"] = np.exp(-0.1 * days_ago)
+    df["priority_score"] = rng.uniform(-0.5, 1.0, len(df)) * df["recency_weight"]
+    return df
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'log rows':>10} {'legacy ms':>12} {'index ms':>12} {'(build':>9} {'score)':>9} {'speedup':>9}  match")
+    for n_rows in args.sizes:
+        df = scored_logs(n_rows, seed=n_rows)
+        tasks = synthetic_parsed_tasks(args.tasks, seed=1, n_topics=max(5, n_rows // 20))
+
+        legacy_time, legacy = best_of(lambda: legacy_score_tasks(df, tasks), args.repeat)
+        index_time, indexed = best_of(lambda: TaskScoringIndex.from_logs(df).score_tasks(tasks), args.repeat)
+        build_time, index = best_of(lambda: TaskScoringIndex.from_logs(df), args.repeat)
+        score_time, _ = best_of(lambda: index.score_tasks(tasks), args.repeat)
+
+        match = np.allclose(legacy, indexed, equal_nan=True)
+        print(
+            f"{n_rows:>10} {legacy_time * 1000:>12.2f} {index_time * 1000:>12.2f} "
+            f"{build_time * 1000:>9.2f} {score_time * 1000:>9.2f} "
+            f"{legacy_time / index_time:>8.1f}x  {'ok' if match else 'MISMATCH'}"
+        )
+        if not match:
+            raise SystemExit(f"scores differ at {n_rows} rows: {legacy} vs {indexed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Startup benchmark: import cost of main.py and time to first login / readiness.
+
+1. Runs `python -X importtime -c "import main"` --repeat times and checks the best cumulative
+   import time against --import-budget-ms, and that none of the heavy modules the ML path needs
+   (pandas, numpy, sklearn, openai, ...) are imported before the app starts serving.
+2. Unless --imports-only, starts the API under uvicorn against a throwaway SQLite database and
+   measures the time from spawn until /auth/login succeeds and until /ready reports warm.
+
+Exits non-zero when a budget is exceeded, so CI can track it.
+
+Run with: python bench_startup.py [--import-budget-ms 1500] [--login-budget-ms 3000]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ["pandas", "numpy", "sklearn", "scipy", "joblib", "openai"]
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def import_profile(env):
+    """(cumulative microseconds of main, {top-level module: cumulative us}) for one cold import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=HERE, env=env, capture_output=True, text=True, check=True,
+    )
+    total, modules = None, {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if name == "main" and depth == 0:
+            total = cumulative
+        root = name.split(".")[0]
+        modules[root] = max(modules.get(root, 0), cumulative)
+    return total, modules
+
+
+def time_to_serving(env, port):
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env,
+    )
+    login_at = ready_at = None
+    try:
+        with httpx.Client(timeout=30) as client:
+            deadline = time.monotonic() + 120
+            while ready_at is None and time.monotonic() < deadline:
+                try:
+                    if login_at is None:
+                        client.post(f"{base_url}/auth/register", json={"username": "bench", "password": "bench"})
+                        response = client.post(f"{base_url}/auth/login", data={"username": "bench", "password": "bench"})
+                        if response.status_code == 200:
+                            login_at = time.perf_counter() - start
+                    elif client.get(f"{base_url}/ready").status_code == 200:
+                        ready_at = time.perf_counter() - start
+                        continue
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.02)
+    finally:
+        api.terminate()
+        api.wait()
+    return login_at, ready_at
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--login-budget-ms", type=float, default=3000)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8020)
+    parser.add_argument("--imports-only", action="store_true")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="study-smart-startup-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'startup.db')}")
+
+    profiles = [import_profile(env) for _ in range(args.repeat)]
+    best_total, modules = min(profiles, key=lambda p: p[0])
+    print(f"import main: {best_total / 1000:.0f}ms (best of {args.repeat})")
+    for name, cumulative in sorted(modules.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:<20} {cumulative / 1000:>8.1f}ms")
+
+    failed = False
+    if best_total / 1000 > args.import_budget_ms:
+        print(f"FAIL: import main took {best_total / 1000:.0f}ms, budget {args.import_budget_ms:.0f}ms")
+        failed = True
+    eager = [name for name in HEAVY_MODULES if name in modules]
+    if eager:
+        print(f"FAIL: imported at startup instead of during warm-up: {', '.join(eager)}")
+        failed = True
+
+    if not args.imports_only:
+        login_at, ready_at = time_to_serving(env, args.port)
+        print(f"first successful /auth/login: {login_at * 1000:.0f}ms after spawn" if login_at else "login never succeeded")
+        print(f"/ready: {ready_at * 1000:.0f}ms after spawn" if ready_at else "never became ready")
+        if login_at is None or login_at * 1000 > args.login_budget_ms:
+            print(f"FAIL: login budget is {args.login_budget_ms:.0f}ms")
+            failed = True
+        if ready_at is None:
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Benchmark: time to first content, /personalized-schedule vs /personalized-schedule/stream.
+
+Starts stub_llm.py (streaming supported) and the API under uvicorn against a throwaway SQLite
+database, then sends each request with fresh task text so every parse goes to the LLM. Reports
+median time to the first parsed task, to the first schedule chunk and to the end of the response.
+
+Run with: python bench_stream.py [--llm-delay 2.0] [--requests 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def wait_for(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up")
+
+
+def task_text(i: int) -> str:
+    # vague verbs keep the local parser from answering, so every request goes to the LLM
+    return f"review unit {i} notes, study chapter {i} slides, prepare lab {i}, practice quiz {i}, study set {i} cards"
+
+
+def blocking(client, headers, text):
+    start = time.perf_counter()
+    response = client.post("/personalized-schedule", json={"raw_tasks_text": text, "available_time_minutes": 90}, headers=headers)
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, elapsed
+
+
+def streaming(client, headers, text):
+    first_task = first_chunk = None
+    start = time.perf_counter()
+    payload = {"raw_tasks_text": text, "available_time_minutes": 90}
+    with client.stream("POST", "/personalized-schedule/stream", json=payload, headers=headers) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)["event"]
+            if event == "error":
+                raise SystemExit(line)
+            if event == "task" and first_task is None:
+                first_task = time.perf_counter() - start
+            elif event == "chunk" and first_chunk is None:
+                first_chunk = time.perf_counter() - start
+    return first_task, first_chunk, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-delay", type=float, default=2.0)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8061)
+    parser.add_argument("--llm-port", type=int, default=8062)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+        MODEL_REGISTRY_DIR=os.path.join(tmp, "model_registry"),
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.llm_port}/v1",
+        OPENAI_API_KEY="bench",
+    )
+    stub = subprocess.Popen(
+        [sys.executable, "stub_llm.py", "--port", str(args.llm_port), "--delay", str(args.llm_delay)], cwd=HERE, env=env
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(f"http://127.0.0.1:{args.llm_port}/stats")
+        wait_for(f"http://127.0.0.1:{args.port}/ready", timeout=120)
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=120) as client:
+            client.post("/auth/register", json={"username": "bench", "password": "bench"})
+            token = client.post("/auth/login", data={"username": "bench", "password": "bench"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            while client.get("/ready").status_code != 200:
+                time.sleep(0.2)
+
+            print(f"LLM delay {args.llm_delay:.1f}s, {args.requests} requests, medians in ms")
+            print(f"{'endpoint':<30} {'first task':>11} {'first chunk':>12} {'complete':>9}")
+            for name, run, offset in [("/personalized-schedule", blocking, 0), ("/personalized-schedule/stream", streaming, 10_000)]:
+                timings = [run(client, headers, task_text(offset + i)) for i in range(args.requests)]
+                first_task, first_chunk, total = (statistics.median(column) * 1000 for column in zip(*timings))
+                print(f"{name:<30} {first_task:>11.0f} {first_chunk:>12.0f} {total:>9.0f}")
+    finally:
+        api.terminate()
+        stub.terminate()
+        api.wait()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Benchmark suite: scheduling and personalization microbenchmarks plus end-to-end
+/personalized-schedule runs, saved as JSON and compared against a baseline.
+
+Everything runs against generated data with fixed seeds (bench_data) in a throwaway SQLite
+database, and the end-to-end runs use stub_llm.py, whose parses are deterministic, in place of OpenAI.
+
+Microbenchmarks report the median and best time per call over --repeat timed rounds, each long
+enough to be measurable. End-to-end scenarios start the API under uvicorn with --users seeded users
+of --logs-per-user TaskLog rows each and send --requests requests --concurrency at a time:
+  local   task text the rule-based parser resolves (no LLM)
+  llm     distinct vague text, so every request goes to the stub LLM
+  cached  one vague text repeated, so all but the first parse come from the parse cache
+They report throughput, latency percentiles and the mean time per pipeline stage from /metrics.
+
+With --baseline, each gated figure (median_us, requests_per_second, p95_ms) is compared with the
+baseline's and the run exits non-zero if any is worse by more than --tolerance, or if none of them
+could be compared. An --only that selects no benchmark also exits non-zero. Baselines only
+mean something on the machine that recorded them.
+
+Run with: python bench_suite.py [--quick] [--only scheduler e2e.local] [--output results.json]
+                                [--baseline bench_baseline.json] [--tolerance 0.15]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from bench_data import populate_database, synthetic_logs, synthetic_parsed_tasks, synthetic_users
+from bench_stream import HERE, wait_for
+
+# figure -> True if higher is better
+GATED = {"median_us": False, "requests_per_second": True, "p95_ms": False}
+STAGE_LINE = re.compile(r'^request_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', re.MULTILINE)
+
+
+def measure(fn, repeat: int, min_round_seconds: float) -> dict:
+    """Median and best microseconds per call of fn over repeat rounds of calls."""
+    fn()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_seconds:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_round_seconds / elapsed) + 1))
+    rounds = [elapsed]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append(time.perf_counter() - start)
+    per_call = [r / number * 1e6 for r in rounds]
+    return {"median_us": statistics.median(per_call), "min_us": min(per_call), "calls_per_round": number, "rounds": repeat}
+
+
+def micro_benchmarks(args, user_ids):
+    """(name, fn) pairs; imports happen here, after DATABASE_URL points at the bench database."""
+    import copy
+
+    import pandas as pd
+
+    import feature_store
+    import personalization
+    from bench_local_parser import TYPICAL_INPUTS
+    from local_parser import DEFAULT_DURATIONS, parse_locally
+    from scheduler import schedule_tasks_cognitive
+
+    tasks = synthetic_parsed_tasks(args.tasks, seed=1)
+    df = pd.DataFrame(synthetic_logs(args.logs_per_user, seed=2))
+    features, weights = personalization.preprocess_user_logs(df)
+    df["priority_score"] = personalization.compute_task_priority_scores(features, weights).to_numpy()
+    index = personalization.TaskScoringIndex.from_logs(df)
+    feature_store.load_scoring_indexes(user_ids)  # build the feature store once, as the first request would
+
+    budget = args.budget
+    return [
+        (f"scheduler.greedy[tasks={args.tasks},minutes={budget}]",
+         lambda: schedule_tasks_cognitive(copy.copy(tasks), budget, "greedy")),
+        (f"scheduler.optimal[tasks={args.tasks},minutes={budget}]",
+         lambda: schedule_tasks_cognitive(copy.copy(tasks), budget, "optimal")),
+        ("local_parser.parse_locally[typical]",
+         lambda: [parse_locally(text, DEFAULT_DURATIONS) for text in TYPICAL_INPUTS]),
+        (f"personalization.preprocess_user_logs[logs={args.logs_per_user}]",
+         lambda: personalization.preprocess_user_logs(df.copy())),
+        (f"personalization.compute_task_priority_scores[logs={args.logs_per_user}]",
+         lambda: personalization.compute_task_priority_scores(features, weights)),
+        (f"personalization.TaskScoringIndex.from_logs[logs={args.logs_per_user}]",
+         lambda: personalization.TaskScoringIndex.from_logs(df)),
+        (f"personalization.personalize_tasks[tasks={args.tasks}]",
+         lambda: personalization.personalize_tasks(index, [dict(t) for t in tasks])),
+        (f"feature_store.load_scoring_index[logs={args.logs_per_user}]",
+         lambda: feature_store.load_scoring_index(user_ids[0])),
+    ]
+
+
+def scenario_texts(scenario: str, n: int) -> list[str]:
+    if scenario == "local":
+        from bench_local_parser import TYPICAL_INPUTS
+        from local_parser import LOCAL_PARSE_MIN_CONFIDENCE, DEFAULT_DURATIONS, parse_locally
+
+        texts = [t for t in TYPICAL_INPUTS if parse_locally(t, DEFAULT_DURATIONS)[1] > LOCAL_PARSE_MIN_CONFIDENCE]
+        return [texts[i % len(texts)] for i in range(n)]
+    if scenario == "llm":
+        return [f"review unit {i} notes, study chapter {i} slides, prepare lab {i}" for i in range(n)]
+    return ["review the unit notes, study the chapter slides, prepare the lab"] * n
+
+
+def stage_totals(metrics_text: str) -> dict:
+    totals = {}
+    for kind, stage, value in STAGE_LINE.findall(metrics_text):
+        totals.setdefault(stage, {"sum": 0.0, "count": 0.0})[kind] = float(value)
+    return totals
+
+
+async def run_scenario(base_url, tokens, texts, concurrency, budget) -> dict:
+    latencies, errors = [], 0
+    queue = iter(enumerate(texts))
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def worker():
+            nonlocal errors
+            for i, text in queue:
+                headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+                start = time.perf_counter()
+                response = await client.post(
+                    "/personalized-schedule", json={"raw_tasks_text": text, "available_time_minutes": budget}, headers=headers
+                )
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+        before = stage_totals((await client.get("/metrics")).text)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        after = stage_totals((await client.get("/metrics")).text)
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    stages = {}
+    for stage, total in after.items():
+        count = total["count"] - before.get(stage, {}).get("count", 0)
+        if count:
+            stages[stage] = (total["sum"] - before.get(stage, {}).get("sum", 0)) / count * 1000
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": pick(0.5),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "errors": errors,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "stage_mean_ms": stages,
+    }
+
+
+def e2e_benchmarks(args, env, users, scenarios) -> dict:
+    stub = subprocess.Popen(
+        [sys.executable, "stub_llm.py", "--port", str(args.llm_port), "--delay", str(args.llm_delay)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    try:
+        wait_for(f"http://127.0.0.1:{args.llm_port}/stats")
+        wait_for(f"{base_url}/ready", timeout=120)
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            tokens = [
+                client.post("/auth/login", data=user).json()["access_token"]
+                for user in users
+            ]
+            while client.get("/ready").status_code != 200:
+                time.sleep(0.2)
+        for scenario in scenarios:
+            # warm up with texts outside the measured set so the parse cache starts cold for "llm"
+            warmup = [f"warmup {i}: {text}" for i, text in enumerate(scenario_texts(scenario, args.concurrency))]
+            asyncio.run(run_scenario(base_url, tokens, warmup, args.concurrency, args.budget))
+            texts = scenario_texts(scenario, args.requests)
+            results[f"e2e.{scenario}[c={args.concurrency}]"] = asyncio.run(
+                run_scenario(base_url, tokens, texts, args.concurrency, args.budget)
+            )
+    finally:
+        api.terminate()
+        stub.terminate()
+        api.wait()
+        stub.wait()
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> tuple[bool, int]:
+    """Print each gated figure against the baseline; (False if any regressed beyond tolerance, figures compared)."""
+    if baseline["meta"].get("machine") != results["meta"]["machine"]:
+        print(f"⚠️  baseline was recorded on {baseline['meta'].get('machine')}, this run is {results['meta']['machine']}")
+    ok = True
+    compared = 0
+    print(f"\n{'benchmark':<62} {'figure':<20} {'baseline':>11} {'now':>11} {'change':>8}")
+    for name, figures in results["benchmarks"].items():
+        old = baseline["benchmarks"].get(name)
+        if old is None:
+            print(f"{name:<62} {'(new)':<20}")
+            continue
+        for figure, higher_is_better in GATED.items():
+            if figure not in figures or figure not in old or not old[figure]:
+                continue
+            change = figures[figure] / old[figure] - 1
+            worse = -change if higher_is_better else change
+            flag = "❌" if worse > tolerance else "✅"
+            ok &= worse <= tolerance
+            compared += 1
+            print(f"{name:<62} {figure:<20} {old[figure]:>11.2f} {figures[figure]:>11.2f} {change:>+7.1%} {flag}")
+    return ok, compared
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="smaller data and fewer rounds, for a smoke run")
+    parser.add_argument("--only", nargs="+", help="run benchmarks whose name starts with any of these")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--budget", type=int, default=240)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logs-per-user", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-delay", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8064)
+    parser.add_argument("--llm-port", type=int, default=8065)
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.logs_per_user, args.users, args.requests = 3, 200, 5, 60
+    wanted = lambda name: not args.only or any(name.startswith(prefix) for prefix in args.only)
+
+    tmp = tempfile.mkdtemp()
+    env = {
+        "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+        "MODEL_REGISTRY_DIR": os.path.join(tmp, "model_registry"),
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "BCRYPT_ROUNDS": "4",
+        "TRAINING_ENABLED": "false",
+        "PYTHONHASHSEED": "0",
+    }
+    os.environ.update(env)
+    env = dict(os.environ)
+
+    users = synthetic_users(args.users)
+    user_ids = populate_database(users, args.logs_per_user)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+            "args": vars(args),
+        },
+        "benchmarks": {},
+    }
+    min_round_seconds = 0.02 if args.quick else 0.1
+    for name, fn in micro_benchmarks(args, user_ids):
+        if wanted(name):
+            results["benchmarks"][name] = measure(fn, args.repeat, min_round_seconds)
+            print(f"{name:<62} {results['benchmarks'][name]['median_us']:>12.1f} us")
+
+    scenarios = [s for s in ("local", "llm", "cached") if wanted(f"e2e.{s}")]
+    if scenarios:
+        for name, figures in e2e_benchmarks(args, env, users, scenarios).items():
+            results["benchmarks"][name] = figures
+            stages = ", ".join(f"{stage} {ms:.1f}" for stage, ms in figures["stage_mean_ms"].items())
+            print(
+                f"{name:<62} {figures['requests_per_second']:>8.1f} req/s  p50 {figures['p50_ms']:.1f} ms  "
+                f"p95 {figures['p95_ms']:.1f} ms  errors {figures['errors']}  ({stages} ms)"
+            )
+
+    if not results["benchmarks"]:
+        raise SystemExit(f"\nno benchmark matches --only {' '.join(args.only)}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        ok, compared = compare(results, baseline, args.tolerance)
+        if not compared:
+            raise SystemExit(f"\nnothing in this run has a gated figure in {args.baseline} to compare against")
+        if not ok:
+            raise SystemExit(f"\nregression beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark: per-task-type duration and outcome stats from the rollups against scanning task_logs.
+
+"scan" is what computing the stats used to take: read every log and group them in pandas.
+"rebuild" is the scheduled one-query recompute of task_type_stats, "rollup" reads its rows and
+summarizes them (p50/p90 from the histograms), and "apply" is the cached cold-start prior lookup
+per request. Also checks that the incrementally maintained rows equal a rebuild.
+
+Run with: python bench_task_type_stats.py [--users 200] [--logs-per-user 500]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_task_type_stats.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pandas as pd
+
+from bench_data import populate_database, synthetic_parsed_tasks, synthetic_users
+from database import SessionLocal
+from log_writer import write_task_logs
+from models import TaskLog, TaskTypeStats
+from task_type_stats import TaskTypePriors, rebuild_global_stats, summarize
+
+
+def time_calls(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def scan(db):
+    df = pd.read_sql(db.query(TaskLog.task_type, TaskLog.action, TaskLog.actual_duration).statement, db.bind)
+    grouped = df.groupby("task_type")["actual_duration"]
+    return pd.DataFrame({"mean": grouped.mean(), "p50": grouped.quantile(0.5), "p90": grouped.quantile(0.9)})
+
+
+def rollup(db):
+    return {row.task_type: summarize(row) for row in db.query(TaskTypeStats)}
+
+
+def snapshot(db) -> dict:
+    return {
+        row.task_type: (row.log_count, round(row.duration_sum, 6), row.completed_count, row.skipped_count,
+                        row.deferred_count, row.extended_count, row.duration_histogram)
+        for row in db.query(TaskTypeStats)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--logs-per-user", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    user_ids = populate_database(synthetic_users(args.users), args.logs_per_user)
+    db = SessionLocal()
+    try:
+        rebuild_global_stats(db)
+        # more logs through the log writer path, which updates task_type_stats incrementally
+        tasks = synthetic_parsed_tasks(1000, seed=1)
+        rows = [
+            {"user_id": user_ids[i % len(user_ids)], "task_id": None, "task_description": task["description"],
+             "task_type": task["task_type"], "scheduled_duration": task["estimated_duration_minutes"],
+             "actual_duration": task["estimated_duration_minutes"] + i % 7, "action": "csde"[i % 4],
+             "timestamp": datetime.utcnow()}
+            for i, task in enumerate(tasks)
+        ]
+        write_task_logs(db, rows)
+        db.commit()
+        incremental = snapshot(db)
+
+        print(f"{args.users * args.logs_per_user + len(rows)} logs, {len(incremental)} task types")
+        print(f"  scan task_logs   {time_calls(lambda: scan(db), args.repeat):>9.2f} ms")
+        print(f"  rebuild rollups  {time_calls(lambda: rebuild_global_stats(db), args.repeat):>9.2f} ms")
+        print(f"  read rollups     {time_calls(lambda: rollup(db), args.repeat * 10):>9.2f} ms")
+        print(f"  incremental == rebuild: {incremental == snapshot(db)}")
+    finally:
+        db.close()
+
+    priors = TaskTypePriors(ttl_seconds=600, rebuild_seconds=86400, min_logs=20)
+    priors.refresh()
+    parsed = synthetic_parsed_tasks(10)
+    print(f"  apply priors     {time_calls(lambda: priors.apply(parsed), 1000) * 1000:>9.2f} us per 10 tasks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Benchmark: throughput and memory per worker for serve.py at several worker counts.
+
+For each worker count, starts serve.py against a copy of one seeded SQLite database (bench_data)
+with stub_llm.py in place of OpenAI, and sends bench_suite's "local" scenario (rule-based parses)
+and a "cached" one (one vague text: one LLM call, then every worker should find it in the
+shared cache).
+Reports requests/sec and latency, how many LLM calls the cached scenario made, and memory per
+worker from /proc/<pid>/smaps_rollup:
+  RSS  resident pages, shared ones counted in every worker
+  USS  pages only this worker has (private clean + dirty), what another worker would add
+  PSS  shared pages split between the processes mapping them; summed over the parent and the
+       workers, the memory the deployment really takes
+--compare-no-preload repeats each count with --no-preload (every worker imports and loads on its
+own, as under uvicorn --workers). Requests/sec can only scale up to the number of CPUs, which the
+load generator shares.
+
+Run with: python bench_workers.py [--workers 1 2 4 8] [--requests 400] [--concurrency 16]
+                                  [--compare-no-preload] [--output workers.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_data import populate_database, synthetic_users
+from bench_stream import HERE, wait_for
+from bench_suite import run_scenario, scenario_texts
+
+
+def smaps_rollup(pid: int) -> dict:
+    """Memory of one process in MiB: rss, pss, uss."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def children(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def warm(base_url: str, workers: int, timeout: float = 180):
+    """Wait until /ready answers 200 several times per worker in a row, so each one has loaded."""
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while streak < 5 * workers:
+        if time.monotonic() > deadline:
+            raise SystemExit(f"{base_url} workers did not all become ready")
+        # a new connection each time, so the kernel hands it to any worker
+        ok = httpx.get(f"{base_url}/ready", timeout=10).status_code == 200
+        streak = streak + 1 if ok else 0
+        if not ok:
+            time.sleep(0.2)
+
+
+def llm_calls(llm_url: str) -> int:
+    return httpx.get(f"{llm_url}/stats").json()["calls"]
+
+
+def run(args, env, template_db, users, workers: int, preload: bool, run_index: int) -> dict:
+    tmp = tempfile.mkdtemp()
+    shutil.copy(template_db, os.path.join(tmp, "bench.db"))
+    command = [sys.executable, "serve.py", "--workers", str(workers), "--port", str(args.port), "--log-level", "warning"]
+    if not preload:
+        command.append("--no-preload")
+    server = subprocess.Popen(
+        command, cwd=HERE, stdout=subprocess.DEVNULL,
+        env=dict(env, DATABASE_URL=f"sqlite:///{tmp}/bench.db", MODEL_REGISTRY_DIR=os.path.join(tmp, "model_registry")),
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    try:
+        wait_for(f"{base_url}/ready", timeout=180)
+        warm(base_url, workers)
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            tokens = [client.post("/auth/login", data=user).json()["access_token"] for user in users]
+
+        warmup = [f"warmup {i}: {text}" for i, text in enumerate(scenario_texts("local", args.concurrency * workers))]
+        asyncio.run(run_scenario(base_url, tokens, warmup, args.concurrency, args.budget))
+        local = asyncio.run(run_scenario(base_url, tokens, scenario_texts("local", args.requests), args.concurrency, args.budget))
+
+        # one request on its own first: concurrent misses in different workers each go to the LLM,
+        # since requests are only coalesced within a process
+        calls = llm_calls(llm_url)
+        text = f"review the unit {run_index} notes, study the chapter slides, prepare the lab"
+        asyncio.run(run_scenario(base_url, tokens, [text], 1, args.budget))
+        cached = asyncio.run(run_scenario(base_url, tokens, [text] * args.requests, args.concurrency, args.budget))
+        cached["llm_calls"] = llm_calls(llm_url) - calls
+
+        worker_pids = children(server.pid)
+        memory = [smaps_rollup(pid) for pid in worker_pids]
+        parent = smaps_rollup(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for result in (local, cached):
+        result.pop("stage_mean_ms")  # /metrics is per worker, so these would be one worker's
+    mean = lambda key: sum(m[key] for m in memory) / len(memory)
+    return {
+        "workers": workers,
+        "preload": preload,
+        "local": local,
+        "cached": cached,
+        "rss_mib_per_worker": mean("rss"),
+        "uss_mib_per_worker": mean("uss"),
+        "pss_mib_per_worker": mean("pss"),
+        "parent_pss_mib": parent["pss"],
+        "total_pss_mib": parent["pss"] + sum(m["pss"] for m in memory),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--compare-no-preload", action="store_true")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--budget", type=int, default=240)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--logs-per-user", type=int, default=300)
+    parser.add_argument("--llm-delay", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8066)
+    parser.add_argument("--llm-port", type=int, default=8067)
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    template_db = os.path.join(tmp, "template.db")
+    env = {
+        "DATABASE_URL": f"sqlite:///{template_db}",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "BCRYPT_ROUNDS": "4",
+        "TRAINING_ENABLED": "false",
+        "PYTHONHASHSEED": "0",
+    }
+    os.environ.update(env)
+    env = dict(os.environ)
+    users = synthetic_users(args.users)
+    populate_database(users, args.logs_per_user)
+    from database import engine
+
+    engine.dispose()  # closing the last connection checkpoints the WAL, so copying the file is enough
+
+    stub = subprocess.Popen(
+        [sys.executable, "stub_llm.py", "--port", str(args.llm_port), "--delay", str(args.llm_delay)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+    )
+    results = []
+    try:
+        wait_for(f"http://127.0.0.1:{args.llm_port}/stats")
+        print(f"{os.cpu_count()} CPUs; {args.requests} requests per scenario, {args.concurrency} at a time")
+        print(f"\n{'mode':<11} {'workers':>7} {'local req/s':>12} {'p95 ms':>8} {'cached req/s':>13} {'LLM calls':>10}"
+              f" {'RSS/worker':>11} {'USS/worker':>11} {'total PSS':>10}")
+        modes = [True, False] if args.compare_no_preload else [True]
+        for preload in modes:
+            for workers in args.workers:
+                result = run(args, env, template_db, users, workers, preload, len(results))
+                results.append(result)
+                print(
+                    f"{'preload' if preload else 'no-preload':<11} {workers:>7} "
+                    f"{result['local']['requests_per_second']:>12.1f} {result['local']['p95_ms']:>8.1f} "
+                    f"{result['cached']['requests_per_second']:>13.1f} {result['cached']['llm_calls']:>10} "
+                    f"{result['rss_mib_per_worker']:>8.0f} MiB {result['uss_mib_per_worker']:>7.0f} MiB "
+                    f"{result['total_pss_mib']:>6.0f} MiB"
+                )
+    finally:
+        stub.terminate()
+        stub.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "args": vars(args), "results": results}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
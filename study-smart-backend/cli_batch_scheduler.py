@@ -0,0 +1,60 @@
+"""Produce many schedules at once through /batch-schedule.
+
+The jobs file is a JSON array or NDJSON, one job per entry:
+
+    {"user_id": 3, "available_time_minutes": 120, "raw_tasks_text": "read chapter 4, problem set 2"}
+
+(or "tasks": [...] with already-parsed tasks). Every job's user_id must be the logged-in user's;
+the server rejects the batch otherwise. Results are written as NDJSON as each schedule finishes.
+
+Run with: python cli_batch_scheduler.py jobs.json --username ... --password ... [--output plans.ndjson]
+"""
+import argparse
+import json
+import sys
+
+import requests
+
+from cli_scheduler import BASE_URL, login
+
+def read_jobs(path):
+    with open(path) as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def stream_batch_schedule(token, jobs):
+    """Yield one result dict per job as the server finishes it."""
+    headers = {"Authorization": f"Bearer {token}"}
+    with requests.post(f"{BASE_URL}/batch-schedule", json=jobs, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("jobs")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--output", help="NDJSON file for the results (default: stdout)")
+    args = parser.parse_args()
+
+    jobs = read_jobs(args.jobs)
+    token = login(args.username, args.password)
+    out = open(args.output, "w") if args.output else sys.stdout
+    failed = 0
+    try:
+        for done, result in enumerate(stream_batch_schedule(token, jobs), start=1):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            if "error" in result:
+                failed += 1
+                print(f"⚠️ job {result['index']} (user {result['user_id']}) failed: {result['error']}", file=sys.stderr)
+            if args.output:
+                print(f"{done}/{len(jobs)} schedules done", file=sys.stderr, end="\r")
+    finally:
+        if args.output:
+            out.close()
+    print(f"\n✅ {len(jobs) - failed}/{len(jobs)} schedules produced", file=sys.stderr)
@@ -1,7 +1,9 @@
+import json
+
 import requests
-from log_utils import log_action_db 
 
 BASE_URL = "http://127.0.0.1:8000"
+CLI_LOG_BATCH_SIZE = 10
 
 def signup(username, password):
     data = {"username": username, "password": password}
@@ -36,12 +38,83 @@ def get_schedule_from_backend(token, raw_tasks_text, available_time_minutes=120)
     response.raise_for_status()
     return response.json()['schedule']
 
-def run_interactive_scheduler(schedule, user_id):
+def stream_schedule_from_backend(token, raw_tasks_text, available_time_minutes=120):
+    """Like get_schedule_from_backend, but prints each task and schedule item as the server streams it."""
+    url = f"{BASE_URL}/personalized-schedule/stream"
+    headers = {"Authorization": f"Bearer {token}"}
+    payload = {
+        "raw_tasks_text": raw_tasks_text,
+        "available_time_minutes": available_time_minutes
+    }
+    schedule = []
+    with requests.post(url, json=payload, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            message = json.loads(line)
+            event, data = message["event"], message["data"]
+            if event == "task":
+                print(f"📝 {data['description']} ({data['task_type']}, ~{data['estimated_duration_minutes']} mins)")
+            elif event == "estimates":
+                print("🎯 Personalized your estimates, building the schedule...")
+            elif event == "chunk":
+                schedule.append(data)
+                print(f"  {len(schedule)}. {data['description']} ({data['duration']} mins)")
+            elif event == "error":
+                raise RuntimeError(data["detail"])
+    return schedule
+
+class ActionBuffer:
+    """Collects logged actions and sends them in batches of batch_size. Without a token they are
+    written straight to the database (one transaction per batch) instead of via /log-tasks.
+    Actions that fail to send stay buffered and are retried on the next flush."""
+
+    def __init__(self, user_id, token=None, batch_size=CLI_LOG_BATCH_SIZE):
+        self.user_id = user_id
+        self.token = token
+        self.batch_size = batch_size
+        self.pending = []
+
+    def add(self, task, action, extended_by=None):
+        self.pending.append({"user_id": self.user_id, "task": dict(task), "action": action, "extended_by": extended_by})
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return True
+        try:
+            if self.token:
+                headers = {"Authorization": f"Bearer {self.token}"}
+                response = requests.post(f"{BASE_URL}/log-tasks", json=self.pending, headers=headers)
+                response.raise_for_status()
+            else:
+                from log_utils import log_actions_db
+                log_actions_db(self.user_id, [(a["task"], a["action"], a["extended_by"]) for a in self.pending])
+        except Exception as e:
+            print(f"Logging failed, will retry {len(self.pending)} action(s): {e}")
+            return False
+        print(f"Saved {len(self.pending)} logged action(s).")
+        self.pending = []
+        return True
+
+def run_interactive_scheduler(schedule, user_id, token=None, batch_size=CLI_LOG_BATCH_SIZE):
     print("\nYour Study Schedule:\n")
     for i, task in enumerate(schedule):
         print(f"{i+1}. {task['description']} ({task['duration']} mins)")
     print("\nLet's start! Type your action when prompted.\n")
 
+    buffer = ActionBuffer(user_id, token, batch_size)
+    try:
+        run_session(schedule, buffer)
+    finally:
+        if not buffer.flush():
+            print(f"⚠️ {len(buffer.pending)} action(s) could not be saved.")
+
+    print("\nAll tasks handled! Your session is complete.")
+
+def run_session(schedule, buffer):
     i = 0
     while i < len(schedule):
         task = schedule[i]
@@ -66,12 +139,8 @@ def run_interactive_scheduler(schedule, user_id):
                 print("Please enter a valid number.")
                 continue
 
-        try:
-            print(f"Logging action for user_id={user_id}, task_id={task.get('task_id')}, task='{task['description']}', action='{action}'")
-            log_action_db(user_id=user_id, task=task, action=action, extended_by=extended_by)
-            print("Log saved successfully.")
-        except Exception as e:
-            print(f"Logging failed: {e}")
+        print(f"Logging action for user_id={buffer.user_id}, task_id={task.get('task_id')}, task='{task['description']}', action='{action}'")
+        buffer.add(task, action, extended_by)
 
         if action in ['c', 's']:
             i += 1
@@ -79,8 +148,6 @@ def run_interactive_scheduler(schedule, user_id):
             print(f"Deferred task: {task['description']}")
             schedule.append(schedule.pop(i))
 
-    print("\nAll tasks handled! Your session is complete.")
-
 if __name__ == "__main__":
     print("Welcome to the Interactive Study Scheduler!")
     username = input("Username: ")
@@ -97,8 +164,8 @@ if __name__ == "__main__":
         available_time = input("Enter your available time in minutes (default 120): ").strip()
         available_time = int(available_time) if available_time.isdigit() else 120
 
-        schedule = get_schedule_from_backend(token, raw_tasks, available_time)
-        run_interactive_scheduler(schedule, user_id)
+        schedule = stream_schedule_from_backend(token, raw_tasks, available_time)
+        run_interactive_scheduler(schedule, user_id, token)
 
     except Exception as e:
         print("Error:", e)
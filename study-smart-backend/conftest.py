@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# before any test imports database or model_registry, which read these at import time
+_tmp = tempfile.mkdtemp(prefix="study-smart-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["MODEL_REGISTRY_DIR"] = os.path.join(_tmp, "model_registry")
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["TRAINING_ENABLED"] = "false"
+os.environ.pop("SHARED_CACHE_PATH", None)
@@ -1,36 +1,210 @@
-import sqlite3
-import pandas as pd
+"""Stream task_logs into training data, one keyset-paginated chunk at a time.
 
-def export_and_process_logs(db_path='study_smart.db'):
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("SELECT * FROM task_logs", conn)
+Rows are read in id order (WHERE id > last seen id LIMIT chunk_rows), so memory stays constant
+however large the table grows, and every chunk is encoded against the fixed TASK_TYPES vocabulary
+so the columns never depend on which types a chunk happens to contain.
 
-    print("Unique task types before cleanup:", df['task_type'].unique())
+Each run writes one part to the output directory, covering ids in (since, last]:
 
-    df['task_type'] = df['task_type'].fillna('unknown').str.lower().str.replace(' ', '_')
+    part-<first id>-<last id>.features.npy   float matrix, FEATURE_COLUMNS
+    part-<first id>-<last id>.targets.npy    int8 matrix, TARGET_COLUMNS
+    part-<first id>-<last id>.json           columns, row count and id range
 
-    print("Unique task types after cleanup:", df['task_type'].unique())
+or a single .parquet file per part with --format parquet (needs pyarrow). --incremental exports only
+rows added since the last run (tracked in state.json); a full export replaces all parts.
+--format csv writes task_logs_processed.csv in the old layout for train_model.py's default mode.
 
-    task_type_dummies = pd.get_dummies(df['task_type'], prefix='task_type')
+Run with: python export_logs.py [--incremental] [--format npy|parquet|csv]
+"""
+import argparse
+import glob
+import json
+import os
+from datetime import datetime
 
-    print("Task type dummy columns:", task_type_dummies.columns.tolist())
+import numpy as np
+from numpy.lib.format import open_memmap
+from sqlalchemy import func, select
 
-    df['action_completed'] = (df['action'] == 'c').astype(int)
-    df['action_deferred'] = (df['action'] == 'd').astype(int)
-    df['action_skipped'] = (df['action'] == 's').astype(int)
-    df['action_extended'] = (df['action'] == 'e').astype(int)
+from database import engine
+from models import TaskLog
+from task_types import ACTION_TARGETS, TASK_TYPES, normalize_task_type
 
-    df['actual_duration'] = df['actual_duration'].fillna(df['scheduled_duration']).fillna(0)
+EXPORT_DIR = os.getenv("EXPORT_DIR", "log_exports")
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+LEGACY_CSV_PATH = "task_logs_processed.csv"
 
-    features = ['scheduled_duration', 'actual_duration']
+FEATURE_COLUMNS = ["scheduled_duration", "actual_duration"] + [f"task_type_{t}" for t in TASK_TYPES]
+TARGET_COLUMNS = list(ACTION_TARGETS)
+TYPE_INDEX = {t: i for i, t in enumerate(TASK_TYPES)}
+ACTION_INDEX = {action: i for i, action in enumerate(ACTION_TARGETS.values())}
 
-    df_final = pd.concat([df[features], task_type_dummies,
-                          df[['action_completed', 'action_deferred', 'action_skipped', 'action_extended']]], axis=1)
+COLUMNS = (TaskLog.id, TaskLog.task_type, TaskLog.scheduled_duration, TaskLog.actual_duration, TaskLog.action)
 
-    print("Columns in final DataFrame:", df_final.columns.tolist())
 
-    df_final.to_csv('task_logs_processed.csv', index=False)
-    print("Exported cleaned processed logs to task_logs_processed.csv")
+def iter_log_chunks(conn, since_id: int, until_id: int, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Yield lists of (id, task_type, scheduled_duration, actual_duration, action) rows."""
+    last_id = since_id
+    while True:
+        rows = conn.execute(
+            select(*COLUMNS)
+            .where(TaskLog.id > last_id, TaskLog.id <= until_id)
+            .order_by(TaskLog.id)
+            .limit(chunk_rows)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def encode_chunk(rows, dtype=np.float64):
+    """(features, targets) for a chunk of rows, in FEATURE_COLUMNS / TARGET_COLUMNS order."""
+    n = len(rows)
+    _, task_types, scheduled, actual, actions = zip(*rows)
+
+    features = np.zeros((n, len(FEATURE_COLUMNS)), dtype=dtype)
+    scheduled = np.array([np.nan if v is None else v for v in scheduled], dtype=float)
+    actual = np.array([np.nan if v is None else v for v in actual], dtype=float)
+    features[:, 0] = np.nan_to_num(scheduled)
+    features[:, 1] = np.where(np.isnan(actual), features[:, 0], actual)
+
+    type_index = np.fromiter((TYPE_INDEX.get(normalize_task_type(t or "unknown"), -1) for t in task_types),
+                             dtype=np.int64, count=n)
+    known = type_index >= 0
+    features[np.flatnonzero(known), 2 + type_index[known]] = 1
+
+    targets = np.zeros((n, len(TARGET_COLUMNS)), dtype=np.int8)
+    action_index = np.fromiter((ACTION_INDEX.get(a, -1) for a in actions), dtype=np.int64, count=n)
+    recognized = action_index >= 0
+    targets[np.flatnonzero(recognized), action_index[recognized]] = 1
+    return features, targets
+
+
+def read_state(output_dir: str) -> dict:
+    try:
+        with open(os.path.join(output_dir, "state.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"last_id": 0, "columns": FEATURE_COLUMNS + TARGET_COLUMNS}
+
+
+def write_state(output_dir: str, state: dict):
+    path = os.path.join(output_dir, "state.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def part_paths(output_dir: str) -> list[str]:
+    """Metadata (.json) paths of every exported part, oldest first."""
+    return sorted(glob.glob(os.path.join(output_dir, "part-*.json")))
+
+
+def _write_npy(conn, stem, since_id, until_id, n_rows, chunk_rows):
+    features = open_memmap(stem + ".features.npy", mode="w+", dtype=np.float64, shape=(n_rows, len(FEATURE_COLUMNS)))
+    targets = open_memmap(stem + ".targets.npy", mode="w+", dtype=np.int8, shape=(n_rows, len(TARGET_COLUMNS)))
+    offset = 0
+    for rows in iter_log_chunks(conn, since_id, until_id, chunk_rows):
+        X, Y = encode_chunk(rows)
+        features[offset:offset + len(rows)] = X
+        targets[offset:offset + len(rows)] = Y
+        offset += len(rows)
+    features.flush()
+    targets.flush()
+    del features, targets
+    return offset, {"features": os.path.basename(stem) + ".features.npy", "targets": os.path.basename(stem) + ".targets.npy"}
+
+
+def _write_parquet(conn, stem, since_id, until_id, chunk_rows):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("--format parquet needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([(c, pa.float64()) for c in FEATURE_COLUMNS] + [(c, pa.int8()) for c in TARGET_COLUMNS])
+    written = 0
+    with pq.ParquetWriter(stem + ".parquet", schema) as writer:
+        for rows in iter_log_chunks(conn, since_id, until_id, chunk_rows):
+            X, Y = encode_chunk(rows)
+            writer.write_table(pa.Table.from_arrays(list(X.T) + list(Y.T), schema=schema))
+            written += len(rows)
+    return written, {"parquet": os.path.basename(stem) + ".parquet"}
+
+
+def export_legacy_csv(path: str = LEGACY_CSV_PATH, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Full export to one CSV in the layout train_model.py's default mode reads."""
+    with engine.connect() as conn, open(path + ".tmp", "w") as f:
+        until_id = conn.execute(select(func.max(TaskLog.id))).scalar() or 0
+        f.write(",".join(FEATURE_COLUMNS + TARGET_COLUMNS) + "\n")
+        written = 0
+        for rows in iter_log_chunks(conn, 0, until_id, chunk_rows):
+            X, Y = encode_chunk(rows)
+            np.savetxt(f, np.hstack([X, Y]), delimiter=",", fmt="%g")
+            written += len(rows)
+    # the CSV has no ids, so the watermark a model trained on it publishes goes next to it
+    with open(path + ".json.tmp", "w") as f:
+        json.dump({"last_id": until_id, "rows": written, "exported_at": datetime.utcnow().isoformat()}, f, indent=2)
+    os.replace(path + ".tmp", path)
+    os.replace(path + ".json.tmp", path + ".json")
+    print(f"Exported {written} logs (ids up to {until_id}) to {path}")
+
+
+def export_and_process_logs(output_dir: str = EXPORT_DIR, incremental: bool = False, fmt: str = "npy",
+                            chunk_rows: int = EXPORT_CHUNK_ROWS) -> dict | None:
+    """Export logs to a new part; returns its metadata, or None if there was nothing new."""
+    os.makedirs(output_dir, exist_ok=True)
+    state = read_state(output_dir)
+    if incremental and state["columns"] != FEATURE_COLUMNS + TARGET_COLUMNS:
+        raise SystemExit("the task type vocabulary changed since the last export; run a full export")
+    since_id = state["last_id"] if incremental else 0
+
+    with engine.connect() as conn:
+        # Snapshot the upper bound first so rows logged mid-export wait for the next run
+        until_id = conn.execute(select(func.max(TaskLog.id))).scalar() or 0
+        n_rows = conn.execute(
+            select(func.count()).select_from(TaskLog).where(TaskLog.id > since_id, TaskLog.id <= until_id)
+        ).scalar()
+        if not n_rows:
+            print(f"No logs after id {since_id}")
+            return None
+
+        if not incremental:
+            for old in glob.glob(os.path.join(output_dir, "part-*")):
+                os.remove(old)
+
+        stem = os.path.join(output_dir, f"part-{since_id + 1:010d}-{until_id:010d}")
+        if fmt == "parquet":
+            written, files = _write_parquet(conn, stem, since_id, until_id, chunk_rows)
+        else:
+            written, files = _write_npy(conn, stem, since_id, until_id, n_rows, chunk_rows)
+
+    part = {
+        "first_id": since_id + 1,
+        "last_id": until_id,
+        "rows": written,
+        "feature_columns": FEATURE_COLUMNS,
+        "target_columns": TARGET_COLUMNS,
+        "files": files,
+        "exported_at": datetime.utcnow().isoformat(),
+    }
+    with open(stem + ".json", "w") as f:
+        json.dump(part, f, indent=2)
+    write_state(output_dir, {"last_id": until_id, "columns": FEATURE_COLUMNS + TARGET_COLUMNS})
+    print(f"Exported {written} logs (ids {since_id + 1}-{until_id}) to {stem}")
+    return part
+
 
 if __name__ == "__main__":
-    export_and_process_logs()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output-dir", default=EXPORT_DIR)
+    parser.add_argument("--incremental", action="store_true", help="only export logs added since the last run")
+    parser.add_argument("--format", choices=["npy", "parquet", "csv"], default="npy")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.format == "csv":
+        export_legacy_csv(chunk_rows=args.chunk_rows)
+    else:
+        export_and_process_logs(args.output_dir, args.incremental, args.format, args.chunk_rows)
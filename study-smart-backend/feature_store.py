@@ -0,0 +1,221 @@
+"""Materialized per-user aggregates so scheduling reads O(task types + distinct descriptions) rows
+instead of a user's whole TaskLog history.
+
+Recency-weighted sums are stored as of their row's decayed_at and decayed lazily: a sum of
+exp(-rate * age) terms at time T becomes that sum * exp(-rate * (now - T)) at time now, so rows
+only need touching when a new log arrives. Raw model scores are baked in at ingest, so a user's
+rows are rebuilt from task_logs whenever the model changes (tracked in user_feature_state).
+"""
+import math
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import TaskLog, UserDescriptionStats, UserFeatureState, UserTaskTypeStats
+from personalization import (
+    RECENCY_DECAY_PER_DAY,
+    TaskScoringIndex,
+    current_model_version,
+    normalize_task_type,
+    raw_priority_scores,
+)
+from task_type_stats import add_outcomes, as_rows, outcome_contributions, record_global_logs
+
+SECONDS_PER_DAY = 86400.0
+# weighted_score_sum carries the recency weight twice, so it decays twice as fast
+DESCRIPTION_SCORE_DECAY_PER_DAY = 2 * RECENCY_DECAY_PER_DAY
+
+
+def decay_factors(decayed_at, now: datetime, rate: float) -> np.ndarray:
+    ages = np.array([(now - t).total_seconds() for t in decayed_at], dtype=float) / SECONDS_PER_DAY
+    return np.exp(-rate * ages)
+
+
+def _logs_frame(logs) -> pd.DataFrame:
+    return pd.DataFrame([{
+        "user_id": log.user_id,
+        "task_description": log.task_description,
+        "task_type": normalize_task_type(log.task_type or "unknown"),
+        "scheduled_duration": log.scheduled_duration,
+        "actual_duration": log.actual_duration or 0,
+        "action": log.action,
+        "timestamp": log.timestamp or datetime.utcnow(),
+    } for log in logs])
+
+
+def _contributions(df: pd.DataFrame, now: datetime):
+    raw = raw_priority_scores(df)
+    ages = (now - df["timestamp"]).dt.total_seconds().to_numpy() / SECONDS_PER_DAY
+    weights = np.exp(-RECENCY_DECAY_PER_DAY * ages)
+
+    df = df.assign(
+        description=df["task_description"].str.lower(),
+        score=raw * weights,
+        weighted_score=raw * weights * weights,
+        weight=weights,
+    )
+    types = outcome_contributions(df, ["user_id", "task_type"])
+    types["score_sum"] = df.groupby(["user_id", "task_type"])["score"].sum()
+    descriptions = df.groupby(["user_id", "description"]).agg(
+        log_count=("score", "size"), weighted_score_sum=("weighted_score", "sum"), weight_sum=("weight", "sum")
+    )
+    return types, descriptions
+
+
+def _apply_contributions(db, types: pd.DataFrame, descriptions: pd.DataFrame, now: datetime):
+    user_ids = [int(u) for u in types.index.get_level_values("user_id").unique()]
+
+    existing_types = {
+        (row.user_id, row.task_type): row
+        for row in db.query(UserTaskTypeStats).filter(UserTaskTypeStats.user_id.in_(user_ids)).with_for_update()
+    }
+    for (user_id, task_type), delta in types.iterrows():
+        row = existing_types.get((user_id, task_type))
+        if row is None:
+            row = UserTaskTypeStats(user_id=int(user_id), task_type=task_type, log_count=0,
+                                    duration_sum=0.0, score_sum=0.0, decayed_at=now)
+            db.add(row)
+        decay = math.exp(-RECENCY_DECAY_PER_DAY * (now - row.decayed_at).total_seconds() / SECONDS_PER_DAY)
+        row.log_count += int(delta["log_count"])
+        row.duration_sum += float(delta["duration_sum"])
+        row.score_sum = row.score_sum * decay + float(delta["score_sum"])
+        add_outcomes(row, delta)
+        row.decayed_at = now
+
+    keys = descriptions.index.get_level_values("description").unique().tolist()
+    existing_descriptions = {
+        (row.user_id, row.description): row
+        for row in db.query(UserDescriptionStats).filter(
+            UserDescriptionStats.user_id.in_(user_ids), UserDescriptionStats.description.in_(keys)
+        ).with_for_update()
+    }
+    for (user_id, description), delta in descriptions.iterrows():
+        row = existing_descriptions.get((user_id, description))
+        if row is None:
+            row = UserDescriptionStats(user_id=int(user_id), description=description, log_count=0,
+                                       weighted_score_sum=0.0, weight_sum=0.0, decayed_at=now)
+            db.add(row)
+        age_days = (now - row.decayed_at).total_seconds() / SECONDS_PER_DAY
+        row.log_count += int(delta["log_count"])
+        row.weighted_score_sum = (
+            row.weighted_score_sum * math.exp(-DESCRIPTION_SCORE_DECAY_PER_DAY * age_days)
+            + float(delta["weighted_score_sum"])
+        )
+        row.weight_sum = row.weight_sum * math.exp(-RECENCY_DECAY_PER_DAY * age_days) + float(delta["weight_sum"])
+        row.decayed_at = now
+
+
+def record_logs(db, logs):
+    """Fold newly added (flushed, not yet committed) TaskLog rows into the global task type stats
+    and their users' aggregates, in the caller's transaction. Users without an up-to-date store are
+    skipped; their next read rebuilds from task_logs, which already includes these rows."""
+    if not logs:
+        return
+    now = datetime.utcnow()
+    df = _logs_frame(logs)
+    record_global_logs(db, df, now)
+    version = current_model_version()
+    fresh_users = {
+        state.user_id
+        for state in db.query(UserFeatureState).filter(
+            UserFeatureState.user_id.in_({log.user_id for log in logs}),
+            UserFeatureState.model_version == version,
+        ).with_for_update()
+    }
+    df = df[df["user_id"].isin(fresh_users)]
+    if df.empty:
+        return
+    types, descriptions = _contributions(df.reset_index(drop=True), now)
+    _apply_contributions(db, types, descriptions, now)
+
+
+def rebuild_users_features(db, user_ids: list[int]):
+    """Recompute the aggregates of user_ids from task_logs, scoring all of their logs in one
+    model pass, and commit."""
+    if not user_ids:
+        return
+    # Clear first so on SQLite the write lock is held before task_logs is read and no
+    # concurrent log can slip between the read and the new state rows.
+    db.query(UserDescriptionStats).filter(UserDescriptionStats.user_id.in_(user_ids)).delete()
+    db.query(UserTaskTypeStats).filter(UserTaskTypeStats.user_id.in_(user_ids)).delete()
+
+    version = current_model_version()
+    states = {
+        state.user_id: state
+        for state in db.query(UserFeatureState).filter(UserFeatureState.user_id.in_(user_ids)).with_for_update()
+    }
+    for user_id in user_ids:
+        state = states.get(user_id)
+        if state is None:
+            state = UserFeatureState(user_id=user_id)
+            db.add(state)
+        state.model_version = version
+        state.updated_at = datetime.utcnow()
+
+    logs = db.query(TaskLog).filter(TaskLog.user_id.in_(user_ids)).all()
+    if logs:
+        # the users' rows were just cleared, so the contributions are inserted as-is
+        now = datetime.utcnow()
+        types, descriptions = _contributions(_logs_frame(logs), now)
+        db.bulk_insert_mappings(UserTaskTypeStats, [dict(row, decayed_at=now) for row in as_rows(types)])
+        db.bulk_insert_mappings(
+            UserDescriptionStats, descriptions.reset_index().assign(decayed_at=now).to_dict("records")
+        )
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # another worker rebuilt the same users concurrently; its rows are equivalent
+        db.rollback()
+
+
+def _scoring_index(types, descriptions, now: datetime) -> TaskScoringIndex:
+    type_decay = decay_factors([t.decayed_at for t in types], now, RECENCY_DECAY_PER_DAY)
+    decayed_at = [d.decayed_at for d in descriptions]
+
+    return TaskScoringIndex(
+        [d.description for d in descriptions],
+        np.array([d.weighted_score_sum for d in descriptions], dtype=float)
+        * decay_factors(decayed_at, now, DESCRIPTION_SCORE_DECAY_PER_DAY),
+        np.array([d.weight_sum for d in descriptions], dtype=float)
+        * decay_factors(decayed_at, now, RECENCY_DECAY_PER_DAY),
+        {t.task_type: t.duration_sum / t.log_count for t in types},
+        {t.task_type: t.score_sum * decay / t.log_count for t, decay in zip(types, type_decay)},
+    )
+
+
+def load_scoring_indexes(user_ids) -> dict[int, TaskScoringIndex]:
+    """Scoring indexes for many users with one query per table; users without logs are left out."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return {}
+    db = SessionLocal()
+    try:
+        version = current_model_version()
+        fresh = {
+            state.user_id
+            for state in db.query(UserFeatureState).filter(UserFeatureState.user_id.in_(user_ids))
+            if state.model_version == version
+        }
+        rebuild_users_features(db, [u for u in user_ids if u not in fresh])
+
+        types_by_user, descriptions_by_user = {}, {}
+        for row in db.query(UserTaskTypeStats).filter(UserTaskTypeStats.user_id.in_(user_ids)):
+            types_by_user.setdefault(row.user_id, []).append(row)
+        for row in db.query(UserDescriptionStats).filter(UserDescriptionStats.user_id.in_(user_ids)):
+            descriptions_by_user.setdefault(row.user_id, []).append(row)
+    finally:
+        db.close()
+
+    now = datetime.utcnow()
+    return {
+        user_id: _scoring_index(types, descriptions_by_user.get(user_id, []), now)
+        for user_id, types in types_by_user.items()
+    }
+
+
+def load_scoring_index(user_id: int) -> TaskScoringIndex | None:
+    return load_scoring_indexes([user_id]).get(user_id)
@@ -1,6 +1,8 @@
 from database import engine, Base
 from models import User, TaskLog  # make sure TaskLog is included!
+from migrations import upgrade
 
 print("Creating database tables...")
 Base.metadata.create_all(bind=engine)
+upgrade()
 print("Done.")
@@ -0,0 +1,54 @@
+import json
+
+
+class JSONArrayStream:
+    """Incrementally parse a streamed JSON array: feed() text as it arrives and get back each
+    top-level object as soon as its closing brace is seen. Text before the opening "[" (such as a
+    markdown fence) is ignored. closed turns true once the array's closing "]" has been seen."""
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.item_start = None
+        self.closed = False
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        items = []
+        text = self.text
+        for i in range(self.pos, len(text)):
+            ch = text[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+            if ch == '"':
+                self.in_string = True
+                if self.depth == 1 and self.item_start is None:
+                    self.item_start = i
+            elif ch in "[{":
+                if self.depth == 1 and self.item_start is None:
+                    self.item_start = i
+                self.depth += 1
+            elif ch in "]}":
+                self.depth -= 1
+                if self.depth == 1 and self.item_start is not None:
+                    items.append(json.loads(text[self.item_start:i + 1]))
+                    self.item_start = None
+                elif self.depth == 0:
+                    self.closed = True
+        self.pos = len(text)
+        # keep only what an unfinished element still needs
+        if self.item_start is None:
+            self.text, self.pos = "", 0
+        else:
+            self.text, self.pos = text[self.item_start:], len(text) - self.item_start
+            self.item_start = 0
+        return items
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import random
+import time
+
+import httpx
+
+import metrics
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+
+_client = None
+_semaphore = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        _client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            timeout=LLM_TIMEOUT_SECONDS,
+            max_retries=0,  # retries are handled below so they respect the semaphore
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONCURRENCY,
+                    max_keepalive_connections=LLM_MAX_CONCURRENCY,
+                ),
+            ),
+        )
+    return _client
+
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _is_retryable(exc: Exception) -> bool:
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+
+    return isinstance(exc, (asyncio.TimeoutError, APIConnectionError, InternalServerError, RateLimitError))
+
+
+async def chat_completion(messages: list[dict], **kwargs):
+    """Run a chat completion with bounded concurrency, a hard timeout and jittered exponential backoff."""
+    kwargs.setdefault("model", LLM_MODEL)
+    client = get_client()
+
+    with metrics.stage("llm"):
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                async with _get_semaphore():
+                    response = await asyncio.wait_for(
+                        client.chat.completions.create(messages=messages, **kwargs),
+                        timeout=LLM_TIMEOUT_SECONDS,
+                    )
+                metrics.llm_requests_total.inc(mode="chat", outcome="ok")
+                _record_usage(response.usage)
+                return response
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                    metrics.llm_requests_total.inc(mode="chat", outcome="error")
+                    raise
+                metrics.llm_retries_total.inc(mode="chat")
+                delay = LLM_BACKOFF_SECONDS * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+
+def _record_usage(usage):
+    if usage is not None:
+        metrics.llm_tokens_total.inc(usage.prompt_tokens or 0, kind="prompt")
+        metrics.llm_tokens_total.inc(usage.completion_tokens or 0, kind="completion")
+
+
+async def stream_chat_completion(messages: list[dict], **kwargs):
+    """Yield the completion's content as it is generated. Holds a concurrency slot for the whole
+    stream; connection errors are retried as in chat_completion, but only before the first delta."""
+    kwargs.setdefault("model", LLM_MODEL)
+    client = get_client()
+    start = time.perf_counter()
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        started = False
+        try:
+            async with _get_semaphore(), asyncio.timeout(LLM_TIMEOUT_SECONDS):
+                stream = await client.chat.completions.create(messages=messages, stream=True, **kwargs)
+                try:
+                    async for chunk in stream:
+                        _record_usage(getattr(chunk, "usage", None))
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            if not started:
+                                metrics.llm_first_token_seconds.observe(time.perf_counter() - start)
+                            started = True
+                            yield delta
+                finally:
+                    await stream.close()
+            metrics.llm_requests_total.inc(mode="stream", outcome="ok")
+            # includes the time the consumer spent between deltas
+            metrics.observe_stage("llm_stream", time.perf_counter() - start)
+            return
+        except Exception as e:
+            if started or attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                metrics.llm_requests_total.inc(mode="stream", outcome="error")
+                raise
+            metrics.llm_retries_total.inc(mode="stream")
+            delay = LLM_BACKOFF_SECONDS * (2 ** attempt)
+            await asyncio.sleep(delay + random.uniform(0, delay))
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
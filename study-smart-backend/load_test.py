@@ -0,0 +1,178 @@
+"""Load test: latency of cheap endpoints while /personalized-schedule calls are waiting on a slow LLM.
+
+Starts stub_llm.py and the API as subprocesses against a throwaway SQLite database, measures
+/auth/userinfo and /log-task latency at idle, then again while --parse-concurrency schedule
+requests are in flight.
+
+Run with: python load_test.py --llm-delay 2 --parse-concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def start_server(module_app, port, env):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module_app, "--port", str(port), "--log-level", "warning"],
+        cwd=HERE,
+        env=env,
+    )
+
+
+async def wait_until_up(client, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(url)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+async def login(client, base_url, username, password):
+    await client.post(f"{base_url}/auth/register", json={"username": username, "password": password})
+    response = await client.post(f"{base_url}/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def probe_cheap_endpoints(client, base_url, headers, user_id, duration):
+    latencies = {"userinfo": [], "log-task": []}
+    task = {"task_id": "load-test", "description": "Load test task", "task_type": "homework", "duration": 10}
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        (await client.get(f"{base_url}/auth/userinfo", headers=headers)).raise_for_status()
+        latencies["userinfo"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        (await client.post(
+            f"{base_url}/log-task",
+            json={"user_id": user_id, "task": task, "action": "s"},
+            headers=headers,
+        )).raise_for_status()
+        latencies["log-task"].append(time.perf_counter() - start)
+        await asyncio.sleep(0.02)
+    return latencies
+
+
+async def schedule_worker(client, base_url, headers, stop, results):
+    while not stop.is_set():
+        # distinct text per request so the parse cache does not short-circuit the LLM wait
+        payload = {"raw_tasks_text": f"do 2 homework assignments, read chapter {len(results)}", "available_time_minutes": 90}
+        start = time.perf_counter()
+        response = await client.post(f"{base_url}/personalized-schedule", json=payload, headers=headers)
+        results.append((response.status_code, time.perf_counter() - start))
+
+
+def report(label, latencies):
+    for name, values in latencies.items():
+        print(
+            f"{label:>10} {name:>9}: n={len(values):4d} "
+            f"p50={percentile(values, 50) * 1000:8.1f}ms "
+            f"p99={percentile(values, 99) * 1000:8.1f}ms "
+            f"max={max(values) * 1000:8.1f}ms"
+        )
+
+
+async def run(args):
+    tmpdir = tempfile.mkdtemp(prefix="study-smart-load-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'load.db')}",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.llm_port}/v1",
+        OPENAI_API_KEY="stub",
+    )
+    base_url = f"http://127.0.0.1:{args.api_port}"
+
+    llm = subprocess.Popen(
+        [sys.executable, "stub_llm.py", "--port", str(args.llm_port), "--delay", str(args.llm_delay)],
+        cwd=HERE,
+        env=env,
+    )
+    api = start_server("main:app", args.api_port, env)
+    try:
+        limits = httpx.Limits(max_connections=args.parse_concurrency + 10)
+        async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+            await wait_until_up(client, f"http://127.0.0.1:{args.llm_port}/stats")
+            await wait_until_up(client, f"{base_url}/docs")
+
+            token = await login(client, base_url, "load_test_user", "load_test_password")
+            headers = {"Authorization": f"Bearer {token}"}
+            user_id = (await client.get(f"{base_url}/auth/userinfo", headers=headers)).json()["id"]
+
+            # warm up the personalization path (first pandas/sklearn calls are slow) before measuring
+            await probe_cheap_endpoints(client, base_url, headers, user_id, 0.1)
+            (await client.post(
+                f"{base_url}/personalized-schedule",
+                json={"raw_tasks_text": "warm up", "available_time_minutes": 30},
+                headers=headers,
+            )).raise_for_status()
+
+            idle = await probe_cheap_endpoints(client, base_url, headers, user_id, args.duration)
+
+            stop = asyncio.Event()
+            schedule_results = []
+            workers = [
+                asyncio.create_task(schedule_worker(client, base_url, headers, stop, schedule_results))
+                for _ in range(args.parse_concurrency)
+            ]
+            await asyncio.sleep(0.5)
+            loaded = await probe_cheap_endpoints(client, base_url, headers, user_id, args.duration)
+            stop.set()
+            await asyncio.gather(*workers)
+
+        report("idle", idle)
+        report("loaded", loaded)
+        ok = [latency for status, latency in schedule_results if status == 200]
+        print(
+            f"/personalized-schedule: {len(ok)}/{len(schedule_results)} ok, "
+            f"median {statistics.median(ok) if ok else float('nan'):.2f}s "
+            f"(stub LLM delay {args.llm_delay}s, concurrency {args.parse_concurrency})"
+        )
+
+        # A blocked event loop shows up as cheap-endpoint latency on the order of the LLM delay.
+        failed = False
+        for name in loaded:
+            loaded_p99 = percentile(loaded[name], 99) * 1000
+            if loaded_p99 > args.max_p99_ms:
+                print(f"FAIL: /{name} p99 {loaded_p99:.1f}ms exceeds budget of {args.max_p99_ms:.0f}ms")
+                failed = True
+        if failed:
+            return 1
+        print("OK: cheap endpoint p99 stayed flat while parse calls were in flight")
+        return 0
+    finally:
+        api.terminate()
+        llm.terminate()
+        api.wait()
+        llm.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api-port", type=int, default=8010)
+    parser.add_argument("--llm-port", type=int, default=8011)
+    parser.add_argument("--llm-delay", type=float, default=2.0)
+    parser.add_argument("--parse-concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--max-p99-ms", type=float, default=250.0)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,271 @@
+"""Rule-based task parser that answers simple inputs without the LLM.
+
+"do 2 homework assignments, read chapter 3 of the biology textbook" is split on commas, semicolons,
+"and" and "then". Each part must name exactly one task type (keywords mapped onto the TASK_TYPES
+vocabulary). A count next to the counted word ("read 2 chapters", "problems 1-10") multiplies the
+per-type duration prior or the minutes per item, and an explicit "45 minutes" or "1.5 hours"
+overrides it. A number before several nouns counts the one with minutes per item, else the last
+("10 leetcode problems", "2 textbook chapters"), and "a 2 page essay" is one essay. The priors are the mean actual duration per task type across all users
+(task_type_stats.task_type_priors), so they track what students really spend.
+
+A part's confidence is the share of its words the rules recognize, and the input's confidence is
+its weakest part. Anything not above LOCAL_PARSE_MIN_CONFIDENCE goes to the LLM, as do inputs with no
+type cue, conflicting cues, vague verbs like "study" or "review", a number the rules can't place (neither
+a count, a duration nor a label like "chapter 3"), explicit durations under MIN_EXPLICIT_MINUTES and
+counts over LOCAL_PARSE_MAX_QUANTITY tasks or LOCAL_PARSE_MAX_ITEMS items. Set
+LOCAL_PARSE_MIN_CONFIDENCE to 1 to turn the local tier off.
+"""
+import os
+import re
+import threading
+import time
+
+from task_type_stats import TaskTypePriors, task_type_priors
+from task_types import TASK_TYPE_MAP, TASK_TYPES, normalize_task_type
+
+LOCAL_PARSE_MIN_CONFIDENCE = float(os.getenv("LOCAL_PARSE_MIN_CONFIDENCE", "0.8"))
+LOCAL_PARSE_MAX_PARTS = 20
+LOCAL_PARSE_MAX_QUANTITY = 20
+# "read 300 pages" is more likely a whole book over several days than one 600-minute task
+LOCAL_PARSE_MAX_ITEMS = 50
+# "in 2 m" is more likely months or a typo than a two-minute task
+MIN_EXPLICIT_MINUTES = 5
+
+# Minutes per task until enough logs exist for a type
+DEFAULT_DURATIONS = {
+    "assignment": 45,
+    "break": 10,
+    "homework": 45,
+    "problem_solving": 45,
+    "project": 90,
+    "reading": 30,
+    "video_watching": 30,
+    "writing": 60,
+}
+
+# Words that name a task type. Weak cues only apply when nothing stronger is in the same part,
+# so "2 homework assignments" is homework.
+TYPE_CUES = {
+    **{key.replace("_", " "): task_type for key, task_type in TASK_TYPE_MAP.items() if " " not in key and "_" not in key},
+    **{task_type: task_type for task_type in TASK_TYPES if "_" not in task_type},
+    "homeworks": "homework",
+    "projects": "project",
+    "read": "reading",
+    "chapter": "reading", "chapters": "reading",
+    "article": "reading", "articles": "reading",
+    "textbook": "reading",
+    "pages": "reading",
+    "write": "writing",
+    "essays": "writing",
+    "paper": "writing", "papers": "writing",
+    "report": "writing", "reports": "writing",
+    "draft": "writing",
+    "problem": "problem_solving", "problems": "problem_solving",
+    "pset": "problem_solving", "psets": "problem_solving",
+    "code": "problem_solving",
+    "solve": "problem_solving",
+    "watch": "video_watching",
+    "videos": "video_watching",
+    "lecture": "video_watching", "lectures": "video_watching",
+    "rest": "break",
+}
+WEAK_CUES = {
+    "assignment": "assignment", "assignments": "assignment",
+    "worksheet": "assignment", "worksheets": "assignment",
+    "exercise": "assignment", "exercises": "assignment",
+    "questions": "assignment",
+}
+# Too vague to pick a type or a duration from
+VAGUE_WORDS = {"study", "review", "revise", "prepare", "practice", "exam", "exams", "quiz", "test", "midterm", "final", "learn"}
+
+# Countable words that are parts of a task rather than tasks: minutes per item
+ITEM_MINUTES = {
+    "pages": 2,
+    "problems": 5,
+    "questions": 5,
+    "exercises": 5,
+}
+
+# "a 2 page essay", "a 500-word report": a number before these sizes the next noun rather than counting it
+SIZE_WORDS = {"page", "word", "paragraph", "slide"}
+
+# Type cues that are verbs: never counted ("read 2 chapters" counts chapters) and never labelled
+VERB_CUES = {"read", "write", "watch", "solve", "code", "draft", "rest"}
+# Numbers right after these (or after a type cue noun) name something rather than count it: "unit 4", "set 2"
+LABEL_WORDS = {"unit", "section", "part", "set", "lesson", "module", "week", "ch", "no", "number", "watching", "solving"}
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "couple": 2, "few": 3,
+}
+
+SUBJECTS = {
+    "math": "math", "maths": "math", "calculus": "math", "algebra": "math", "geometry": "math", "statistics": "math",
+    "biology": "biology", "bio": "biology",
+    "chemistry": "chemistry", "chem": "chemistry",
+    "physics": "physics",
+    "history": "history",
+    "english": "english", "literature": "english",
+    "spanish": "spanish", "french": "french", "german": "german",
+    "economics": "economics", "econ": "economics",
+    "psychology": "psychology", "psych": "psychology",
+    "cs": "computer science", "programming": "computer science",
+}
+
+FILLER_WORDS = {
+    "do", "finish", "complete", "start", "work", "on", "the", "my", "of", "for", "in", "to", "from", "about",
+    "some", "set", "sets", "more", "next", "last", "first", "second", "third", "part", "parts", "unit", "section",
+    "class", "course", "hw", "online", "video", "sheet", "up", "with", "and", "then", "this", "that", "new", "solving", "watching", "hours",
+    "hour", "hrs", "hr", "h", "minutes", "minute", "mins", "min", "m", "x",
+}
+
+SPLIT_PATTERN = re.compile(r"[,;\n&+]|\band\b|\bthen\b", re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+EXPLICIT_DURATION = re.compile(r"(\d+(?:\.\d+)?)\s*(hours?|hrs?|h|minutes?|mins?|m)\b")
+RANGE_PATTERN = re.compile(r"(\d+)\s*(?:-|–|to|through)\s*(\d+)\b")
+
+
+def _is_noun(token: str) -> bool:
+    return (token in TYPE_CUES or token in WEAK_CUES) and token not in VERB_CUES
+
+
+def _counts(tokens: list[str], spans: list[tuple[int, int]], lowered: str, used: set[int]) -> dict[int, int]:
+    """{index of a counted word: count}, from a range next to it ("problems 1-10") or a number (or
+    number word) in the two tokens before it ("2 homework", "three short essays"). Words with minutes
+    per item claim a number first, then the rest from the right, so a compound is counted by its last
+    noun. Adds the indexes of the numbers it takes to used."""
+    counts = {}
+    for match in RANGE_PATTERN.finditer(lowered):
+        inside = [i for i, (start, end) in enumerate(spans) if start >= match.start() and end <= match.end()]
+        used.update(inside)
+        first, last = int(match.group(1)), int(match.group(2))
+        before, after = inside[0] - 1, inside[-1] + 1
+        noun = before if before >= 0 and _is_noun(tokens[before]) else after if after < len(tokens) and _is_noun(tokens[after]) else None
+        if noun is not None and last >= first:
+            counts[noun] = last - first + 1
+    for i, token in enumerate(tokens[:-2]):
+        if token.isdigit() and tokens[i + 1] in SIZE_WORDS and _is_noun(tokens[i + 2]):
+            used.add(i)
+    for index in sorted(range(len(tokens)), key=lambda i: (tokens[i] not in ITEM_MINUTES, -i)):
+        if not _is_noun(tokens[index]) or index in counts:
+            continue
+        for i in range(index - 1, max(0, index - 2) - 1, -1):
+            if i in used:
+                break
+            if tokens[i].isdigit() or tokens[i] in NUMBER_WORDS:
+                counts[index] = int(tokens[i]) if tokens[i].isdigit() else NUMBER_WORDS[tokens[i]]
+                used.add(i)
+                break
+    return counts
+
+
+def parse_part(part: str, priors: dict):
+    """(task dict, confidence) for one comma-separated part; (None, 0.0) when it has no single type."""
+    text = part.strip()
+    lowered = text.lower()
+    matches = list(TOKEN_PATTERN.finditer(lowered))
+    tokens = [m.group() for m in matches]
+    spans = [m.span() for m in matches]
+    if not tokens or VAGUE_WORDS.intersection(tokens):
+        return None, 0.0
+
+    strong = {TYPE_CUES[t] for t in tokens if t in TYPE_CUES}
+    weak = {WEAK_CUES[t] for t in tokens if t in WEAK_CUES}
+    types = strong or weak
+    if len(types) != 1:
+        return None, 0.0
+    task_type = normalize_task_type(next(iter(types)))
+    cues = TYPE_CUES if strong else WEAK_CUES
+
+    used = set()
+    explicit = EXPLICIT_DURATION.search(lowered)
+    if explicit:
+        used.update(i for i, (start, end) in enumerate(spans) if start >= explicit.start() and end <= explicit.end())
+    counts = _counts(tokens, spans, lowered, used)
+    for i, token in enumerate(tokens):
+        if token[0].isdigit() and i > 0 and (_is_noun(tokens[i - 1]) or tokens[i - 1] in LABEL_WORDS):
+            used.add(i)  # "chapter 3", "problem set 2"
+    placed = all(i in used for i, t in enumerate(tokens) if t[0].isdigit())
+
+    item_index = next((i for i, t in enumerate(tokens) if t in ITEM_MINUTES and i in counts), None)
+    if explicit:
+        amount = float(explicit.group(1))
+        duration = round(amount * 60 if explicit.group(2).startswith("h") else amount)
+        if duration < MIN_EXPLICIT_MINUTES:
+            placed = False
+    elif item_index is not None:
+        if counts[item_index] > LOCAL_PARSE_MAX_ITEMS:
+            return None, 0.0
+        duration = counts[item_index] * ITEM_MINUTES[tokens[item_index]]
+    else:
+        quantity = next((counts[i] for i in sorted(counts) if tokens[i] in cues), None)
+        if quantity is None:
+            quantity = next((counts[i] for i in sorted(counts)), 1)
+        if quantity > LOCAL_PARSE_MAX_QUANTITY:
+            return None, 0.0
+        duration = quantity * priors.get(task_type, DEFAULT_DURATIONS.get(task_type, 30))
+
+    subject = next((SUBJECTS[t] for t in tokens if t in SUBJECTS), None)
+    known = sum(
+        1 for t in tokens
+        if t in TYPE_CUES or t in WEAK_CUES or t in SUBJECTS or t in NUMBER_WORDS or t in FILLER_WORDS
+        or t in SIZE_WORDS or t[0].isdigit() or len(t) == 1
+    )
+    task = {
+        "description": text[0].upper() + text[1:],
+        "subject": subject or "general",
+        "task_type": task_type,
+        "estimated_duration_minutes": max(5, duration),
+    }
+    # a number we couldn't place may be the duration we got wrong
+    return task, known / len(tokens) if placed else 0.0
+
+
+def parse_locally(raw_text: str, priors: dict):
+    """(parsed tasks, confidence); tasks is None when some part could not be parsed at all."""
+    parts = [p for p in SPLIT_PATTERN.split(raw_text) if p and p.strip()]
+    if not parts or len(parts) > LOCAL_PARSE_MAX_PARTS:
+        return None, 0.0
+    tasks = []
+    confidence = 1.0
+    for part in parts:
+        task, part_confidence = parse_part(part, priors)
+        if task is None:
+            return None, 0.0
+        tasks.append(task)
+        confidence = min(confidence, part_confidence)
+    return tasks, confidence
+
+
+class LocalParser:
+    def __init__(self, min_confidence: float, priors: TaskTypePriors):
+        self.min_confidence = min_confidence
+        self.priors = priors
+        self._stats_lock = threading.Lock()
+        self._stats = {"local": 0, "escalated": 0, "local_seconds": 0.0}
+
+    def parse(self, raw_text: str) -> list[dict] | None:
+        """Parsed tasks (shaped like the LLM's) if the rules are confident enough, else None."""
+        start = time.perf_counter()
+        tasks, confidence = parse_locally(raw_text, self.priors.durations)
+        resolved = tasks is not None and confidence > self.min_confidence
+        with self._stats_lock:
+            self._stats["local" if resolved else "escalated"] += 1
+            self._stats["local_seconds"] += time.perf_counter() - start
+        return tasks if resolved else None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total = stats["local"] + stats["escalated"]
+        return {
+            "min_confidence": self.min_confidence,
+            "local": stats["local"],
+            "escalated": stats["escalated"],
+            "local_fraction": stats["local"] / total if total else 0.0,
+            "mean_parse_microseconds": stats.pop("local_seconds") / total * 1e6 if total else 0.0,
+            "duration_priors": {**DEFAULT_DURATIONS, **self.priors.durations},
+        }
+
+
+local_parser = LocalParser(LOCAL_PARSE_MIN_CONFIDENCE, task_type_priors)
@@ -1,25 +1,17 @@
-from models import TaskLog
 from database import SessionLocal
-from datetime import datetime
+from log_writer import task_log_row, write_task_logs
 
 def log_action_db(user_id, task, action, extended_by=None):
-    db = SessionLocal()
-
-    actual_duration = task['duration']
-    if extended_by:
-        actual_duration += extended_by
+    log_actions_db(user_id, [(task, action, extended_by)])
 
-    log = TaskLog(
-        user_id=user_id,
-        task_id=task.get('task_id'),  # Save task_id for traceability
-        task_description=task['description'],
-        task_type=task.get('task_type', 'Unknown'),
-        scheduled_duration=task['duration'],
-        actual_duration=actual_duration,
-        action=action,
-        timestamp=datetime.utcnow()
-    )
-
-    db.add(log)
-    db.commit()
-    db.close()
+def log_actions_db(user_id, actions):
+    """Write (task, action, extended_by) tuples for one user in a single transaction."""
+    rows = [task_log_row(user_id, task, action, extended_by) for task, action, extended_by in actions]
+    if not rows:
+        return
+    db = SessionLocal()
+    try:
+        write_task_logs(db, rows)
+        db.commit()
+    finally:
+        db.close()
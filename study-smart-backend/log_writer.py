@@ -0,0 +1,158 @@
+"""Group-committed TaskLog ingestion.
+
+Every logged action used to be its own transaction (and, on SQLite, its own fsync). LogWriter
+queues rows from any number of requests and a single thread inserts them in batches with
+bulk_insert_mappings, one commit per batch. A batch is written once LOG_WRITER_BATCH_SIZE rows are
+waiting or the oldest has waited LOG_WRITER_MAX_DELAY_MS.
+
+submit() returns a Future that resolves only after the rows' transaction commits, so callers can
+acknowledge a client without risking an unwritten row. stop() drains the queue before returning,
+and rows submitted after it are written inline.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+
+from database import SessionLocal
+from feature_store import record_logs
+from models import TaskLog
+
+LOG_WRITER_BATCH_SIZE = int(os.getenv("LOG_WRITER_BATCH_SIZE", "500"))
+LOG_WRITER_MAX_DELAY_MS = float(os.getenv("LOG_WRITER_MAX_DELAY_MS", "5"))
+
+
+def task_log_row(user_id: int, task: dict, action: str, extended_by: int | None = None) -> dict:
+    actual_duration = task["duration"]
+    if action == "e" and extended_by:
+        actual_duration += extended_by
+    return {
+        "user_id": user_id,
+        "task_id": task.get("task_id"),
+        "task_description": task["description"],
+        "task_type": task.get("task_type", "unknown"),
+        "scheduled_duration": task["duration"],
+        "actual_duration": actual_duration,
+        "action": action,
+        "timestamp": datetime.utcnow(),
+    }
+
+
+def write_task_logs(db, rows: list[dict]):
+    """Insert rows and fold them into the feature store in one transaction (committed by the caller)."""
+    db.bulk_insert_mappings(TaskLog, rows)
+    record_logs(db, [TaskLog(**row) for row in rows])
+
+
+class LogWriter:
+    def __init__(self, batch_size: int = LOG_WRITER_BATCH_SIZE, max_delay_ms: float = LOG_WRITER_MAX_DELAY_MS,
+                 on_commit=None):
+        self.batch_size = batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.on_commit = on_commit  # called with the number of rows after each commit
+        self._cond = threading.Condition()
+        self._queue = deque()  # (rows, future, submitted_at) in arrival order
+        self._queued_rows = 0
+        self._closed = False
+        self._thread = None
+        self.batches = 0
+        self.rows_written = 0
+
+    def submit(self, rows: list[dict]) -> Future:
+        future = Future()
+        if not rows:
+            future.set_result(0)
+            return future
+        with self._cond:
+            if not self._closed:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    self._thread.start()
+                self._queue.append((rows, future, time.monotonic()))
+                self._queued_rows += len(rows)
+                self._cond.notify()
+                return future
+        self._write([(rows, future, time.monotonic())])
+        return future
+
+    def stop(self):
+        """Write everything queued, then stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = self._queued_rows
+        return {"batches": self.batches, "rows_written": self.rows_written, "queued_rows": queued}
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                if self._queue:
+                    remaining = self._queue[0][2] + self.max_delay - time.monotonic()
+                    if self._closed or self._queued_rows >= self.batch_size or remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+
+            batch, count = [], 0
+            while self._queue and (not batch or count + len(self._queue[0][0]) <= self.batch_size):
+                entry = self._queue.popleft()
+                batch.append(entry)
+                count += len(entry[0])
+            self._queued_rows -= count
+            return batch
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            self._write(batch)
+
+    def _commit(self, entries):
+        db = SessionLocal()
+        try:
+            write_task_logs(db, [row for rows, _, _ in entries for row in rows])
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write(self, batch):
+        try:
+            self._commit(batch)
+            committed = batch
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # one bad submission (e.g. an unknown user_id) must not fail the others it was batched with
+            committed = []
+            for entry in batch:
+                try:
+                    self._commit([entry])
+                    committed.append(entry)
+                except Exception as entry_error:
+                    entry[1].set_exception(entry_error)
+
+        count = sum(len(rows) for rows, _, _ in committed)
+        if committed:
+            self.batches += 1
+            self.rows_written += count
+        for rows, future, _ in committed:
+            future.set_result(len(rows))
+        if count and self.on_commit is not None:
+            try:
+                self.on_commit(count)
+            except Exception as e:
+                print(f"Log writer commit hook failed: {e}")
@@ -1,28 +1,100 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import joblib
-from openai import OpenAI
-from auth import router as auth_router, get_current_user
-from personalization import (
-    get_user_logs,
-    preprocess_user_logs,
-    compute_task_priority_scores,
-    normalize_task_type,
-)
-from scheduler import schedule_tasks_cognitive
-from database import Base, engine, SessionLocal
-from models import TaskLog
-from pydantic import BaseModel
-from datetime import datetime
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import contextvars
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Annotated, Literal
+from auth import router as auth_router, get_current_user, token_cache, user_cache
+from password_pool import password_pool
+from task_types import normalize_task_type
+from warmup import Warmup
+from batch_scheduler import BATCH_SCHEDULE_MAX_JOBS, shutdown_process_pool, stream_batch
+from scheduler import schedule_tasks_cognitive, schedule_utilization
+import planner
+from llm_client import LLM_MODEL, chat_completion, stream_chat_completion, aclose as close_llm_client
+from json_stream import JSONArrayStream
+from parse_cache import parse_cache, make_key as parse_cache_key
+from local_parser import local_parser
+from task_type_stats import task_type_priors, user_summaries
+from singleflight import SingleFlight
+import metrics
+from database import Base, engine
+from migrations import upgrade as upgrade_schema
+from pydantic import BaseModel, Field
 import os
+import time
 import uuid
 import json
 from dotenv import load_dotenv
-import subprocess
+
+if TYPE_CHECKING:
+    from personalization import TaskScoringIndex
 
 load_dotenv()
 
-app = FastAPI()
+# DB reads, pandas and model scoring run here so they never block the event loop
+PERSONALIZATION_WORKERS = int(os.getenv("PERSONALIZATION_WORKERS", "4"))
+personalization_executor = ThreadPoolExecutor(
+    max_workers=PERSONALIZATION_WORKERS, thread_name_prefix="personalization"
+)
+
+def run_personalization(fn, *args):
+    """fn(*args) on the personalization executor, in a copy of the caller's context so its stages
+    and queries count towards the request's Server-Timing."""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(personalization_executor, contextvars.copy_context().run, fn, *args)
+
+def preload_ml():
+    """The imports and model load of load_ml, without starting any threads, so a pre-fork server
+    (serve.py) can run it once in the parent and every worker shares the pages."""
+    from model_registry import registry
+    from personalization import get_compiled_scorer
+    import feature_store, log_writer, training  # noqa: F401  (pandas, scikit-learn)
+
+    get_compiled_scorer(registry.refresh().model)
+
+def load_ml():
+    """Import pandas/scikit-learn and load the promoted model; runs once, off the event loop."""
+    from feature_store import load_scoring_index, load_scoring_indexes
+    from log_writer import LogWriter, task_log_row
+    from model_registry import registry
+    from personalization import personalize_tasks
+    from training import TRAINING_ENABLED, training_service
+
+    preload_ml()
+    registry.start_watching()
+    if TRAINING_ENABLED:
+        training_service.start()
+    return SimpleNamespace(
+        load_scoring_index=load_scoring_index,
+        load_scoring_indexes=load_scoring_indexes,
+        personalize_tasks=personalize_tasks,
+        log_writer=LogWriter(on_commit=training_service.notify),
+        task_log_row=task_log_row,
+        registry=registry,
+        training_service=training_service,
+    )
+
+# Auth routes never touch the ML stack, so the app serves them while this loads
+ml_warmup = Warmup(load_ml)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ml_warmup.start()
+    yield
+    if ml_warmup.ready:
+        ml_warmup.value.log_writer.stop()
+        ml_warmup.value.training_service.stop()
+        ml_warmup.value.registry.stop_watching()
+    await close_llm_client()
+    personalization_executor.shutdown(wait=True)
+    shutdown_process_pool()
+    password_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # ✅ Explicitly list allowed origins
 origins = [
@@ -42,17 +114,22 @@ app.add_middleware(
 
 app.include_router(auth_router, prefix="/auth")
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
 
-MODEL_PATH = "multioutput_model.pkl"
-FEATURES_PATH = "model_feature_names.pkl"
-model = joblib.load(MODEL_PATH)
-MODEL_FEATURES = joblib.load(FEATURES_PATH)
+# "greedy" fills the time in priority order; "optimal" packs the highest priority-weighted minutes
+SCHEDULE_MODE = os.getenv("SCHEDULE_MODE", "greedy")
+ScheduleMode = Literal["greedy", "optimal"]
+# "optimal" mode's DP takes memory per task per minute of budget, so requests are capped (422 above)
+MAX_AVAILABLE_TIME_MINUTES = int(os.getenv("MAX_AVAILABLE_TIME_MINUTES", str(24 * 60)))
+AvailableMinutes = Annotated[int, Field(ge=0, le=MAX_AVAILABLE_TIME_MINUTES)]
 
 class TaskInput(BaseModel):
-    available_time_minutes: int
+    available_time_minutes: AvailableMinutes
     raw_tasks_text: str
     must_do_tasks: list[str] = []
+    schedule_mode: ScheduleMode = SCHEDULE_MODE
 
 class TaskActionInput(BaseModel):
     user_id: int
@@ -60,7 +137,40 @@ class TaskActionInput(BaseModel):
     action: str
     extended_by: int | None = None
 
-def call_gpt_parse_tasks(raw_text: str, must_do_tasks: list[str]):
+class BatchScheduleJob(BaseModel):
+    user_id: int
+    available_time_minutes: AvailableMinutes
+    raw_tasks_text: str | None = None
+    tasks: list[dict] | None = None  # already-parsed tasks; skips the LLM
+    must_do_tasks: list[str] = []
+    schedule_mode: ScheduleMode = SCHEDULE_MODE
+
+class AvailabilityWindow(BaseModel):
+    start: str  # "HH:MM"
+    end: str
+
+class PlanDay(BaseModel):
+    date: str  # ISO date
+    available_time_minutes: AvailableMinutes | None = None
+    windows: list[AvailabilityWindow] = []
+
+class PlanInput(BaseModel):
+    days: list[PlanDay]
+    raw_tasks_text: str | None = None
+    tasks: list[dict] | None = None  # already-parsed tasks; skips the LLM
+    must_do_tasks: list[str] = []
+
+class PlanActionInput(BaseModel):
+    chunk_id: str
+    action: str
+    extended_by: int | None = None
+
+LOG_TASKS_MAX_ACTIONS = int(os.getenv("LOG_TASKS_MAX_ACTIONS", "1000"))
+
+# Bump whenever the parsing prompt changes so cached parses from the old prompt are not reused
+PARSE_PROMPT_VERSION = "1"
+
+def parse_messages(raw_text: str) -> list[dict]:
     system_message = {
         "role": "system",
         "content": (
@@ -73,106 +183,351 @@ def call_gpt_parse_tasks(raw_text: str, must_do_tasks: list[str]):
         ),
     }
     user_message = {"role": "user", "content": f"Tasks: {raw_text}"}
+    return [system_message, user_message]
 
-    response = client.chat.completions.create(
-        model="gpt-4", messages=[system_message, user_message], temperature=0.3
-    )
+async def request_gpt_parse(raw_text: str):
+
+    response = await chat_completion(parse_messages(raw_text), temperature=0.3)
 
     parsed_tasks = json.loads(response.choices[0].message.content)
+    if not isinstance(parsed_tasks, list) or not parsed_tasks:
+        raise ValueError("the LLM reply had no tasks")
     for task in parsed_tasks:
-        task["task_id"] = str(uuid.uuid4())
         task["task_type"] = normalize_task_type(task.get("task_type", ""))
+    total_tokens = response.usage.total_tokens if response.usage else 0
+    return parsed_tasks, total_tokens
+
+def finalize_parsed_tasks(parsed_tasks: list[dict], must_do_tasks: list[str]):
+    for task in parsed_tasks:
+        task["task_id"] = str(uuid.uuid4())
         task["must_do"] = any(md.lower() in task["description"].lower() for md in must_do_tasks)
     return parsed_tasks
 
+# Concurrent requests for the same text (or the same user's profile) wait on one computation
+parse_flight = SingleFlight()
+profile_flight = SingleFlight()
+
+async def fetch_parsed_tasks(raw_text: str, key: str):
+    parsed_tasks = await parse_cache.aget(key)
+    if parsed_tasks is None:
+        start = time.perf_counter()
+        parsed_tasks, total_tokens = await request_gpt_parse(raw_text)
+        await parse_cache.aput(key, parsed_tasks, time.perf_counter() - start, total_tokens)
+    return parsed_tasks
+
+async def call_gpt_parse_tasks(raw_text: str, must_do_tasks: list[str]):
+    key = parse_cache_key(raw_text, LLM_MODEL, PARSE_PROMPT_VERSION)
+    shared_tasks = await parse_flight.do(key, fetch_parsed_tasks, raw_text, key)
+    return finalize_parsed_tasks([dict(task) for task in shared_tasks], must_do_tasks)
+
+async def parse_tasks(raw_text: str, must_do_tasks: list[str]):
+    """Simple inputs are parsed by the local rules; anything they are unsure of goes to the LLM."""
+    local_parser.priors.refresh_in_background(personalization_executor)
+    with metrics.stage("parse_local"):
+        parsed_tasks = local_parser.parse(raw_text)
+    if parsed_tasks is not None:
+        return finalize_parsed_tasks(parsed_tasks, must_do_tasks)
+    return await call_gpt_parse_tasks(raw_text, must_do_tasks)
+
+async def stream_parsed_tasks(raw_text: str):
+    """Yield parsed tasks one at a time: all at once from the local parser or the parse cache,
+    otherwise each as soon as the streamed LLM reply completes it. Streams bypass parse coalescing
+    (a stream cannot be shared), but a finished stream fills the parse cache. A reply that ends
+    before its array closes, or has no tasks, raises after yielding what it had and is not cached."""
+    local_parser.priors.refresh_in_background(personalization_executor)
+    with metrics.stage("parse_local"):
+        parsed_tasks = local_parser.parse(raw_text)
+    if parsed_tasks is None:
+        key = parse_cache_key(raw_text, LLM_MODEL, PARSE_PROMPT_VERSION)
+        parsed_tasks = await parse_cache.aget(key)
+    if parsed_tasks is not None:
+        for task in parsed_tasks:
+            yield dict(task)
+        return
+
+    start = time.perf_counter()
+    array = JSONArrayStream()
+    streamed = []
+    async for delta in stream_chat_completion(parse_messages(raw_text), temperature=0.3):
+        for task in array.feed(delta):
+            task["task_type"] = normalize_task_type(task.get("task_type", ""))
+            streamed.append(task)
+            yield dict(task)
+    if not array.closed or not streamed:
+        raise ValueError("the LLM reply had no complete task list")
+    await parse_cache.aput(key, streamed, time.perf_counter() - start)
+
+def build_user_profile(user_id: int):
+    with metrics.stage("profile"):
+        return ml_warmup.value.load_scoring_index(user_id)
+
+async def get_user_profile(user_id: int):
+    await ml_warmup.wait()
+    task_type_priors.refresh_in_background(personalization_executor)
+    return await profile_flight.do(user_id, run_personalization, build_user_profile, user_id)
+
+def personalize(profile: "TaskScoringIndex | None", parsed_tasks: list[dict]):
+    """All-user duration priors first, then the user's own history where there is any."""
+    with metrics.stage("personalize"):
+        task_type_priors.apply(parsed_tasks)
+        if profile is not None:
+            ml_warmup.value.personalize_tasks(profile, parsed_tasks)
+    return parsed_tasks
+
+def personalize_and_schedule(profile: "TaskScoringIndex | None", parsed_tasks: list[dict], available_time_minutes: int,
+                             schedule_mode: str = SCHEDULE_MODE):
+    return schedule_tasks_cognitive(personalize(profile, parsed_tasks), available_time_minutes, schedule_mode)
+
 @app.post("/personalized-schedule")
 async def personalized_schedule(task_input: TaskInput, current_user=Depends(get_current_user)):
-    print("DEBUG - received task_input:", task_input.dict())
     try:
-        parsed_tasks = call_gpt_parse_tasks(task_input.raw_tasks_text, task_input.must_do_tasks)
-        df_logs = get_user_logs(current_user.id)
-
-        if df_logs.empty:
-            schedule = schedule_tasks_cognitive(parsed_tasks, task_input.available_time_minutes)
-        else:
-            df_logs["task_type"] = df_logs["task_type"].apply(normalize_task_type)
-            X_user, recency_weights = preprocess_user_logs(df_logs)
-            priority_scores = compute_task_priority_scores(X_user, recency_weights)
-
-            df_logs = df_logs.reset_index(drop=True)
-            df_logs["priority_score"] = priority_scores.values
-            df_logs["recency_weight"] = recency_weights.values
-
-            avg_durations = df_logs.groupby("task_type")["actual_duration"].mean().to_dict()
-            avg_scores_by_type = df_logs.groupby("task_type")["priority_score"].mean().to_dict()
-
-            for task in parsed_tasks:
-                task["estimated_duration_minutes"] = avg_durations.get(
-                    task["task_type"], task["estimated_duration_minutes"]
-                )
-
-                matching_logs = df_logs[
-                    df_logs["task_description"].str.contains(task["description"], case=False, na=False)
-                ]
-
-                if not matching_logs.empty:
-                    weighted_score = (
-                        (matching_logs["priority_score"] * matching_logs["recency_weight"]).sum()
-                        / matching_logs["recency_weight"].sum()
-                    )
-                    task["priority_score"] = weighted_score
-                else:
-                    task["priority_score"] = avg_scores_by_type.get(task["task_type"], 0)
-
-                if task.get("must_do", False):
-                    task["priority_score"] += 0.5
-
-            parsed_tasks.sort(key=lambda t: (t.get("must_do", False), t["priority_score"]), reverse=True)
-            schedule = schedule_tasks_cognitive(parsed_tasks, task_input.available_time_minutes)
+        parsed_tasks, profile = await asyncio.gather(
+            parse_tasks(task_input.raw_tasks_text, task_input.must_do_tasks),
+            get_user_profile(current_user.id),
+        )
+        schedule = await run_personalization(
+            personalize_and_schedule,
+            profile,
+            parsed_tasks,
+            task_input.available_time_minutes,
+            task_input.schedule_mode,
+        )
 
         return {
             "available_time_minutes": task_input.available_time_minutes,
             "parsed_tasks": parsed_tasks,
             "schedule": schedule,
+            "schedule_mode": task_input.schedule_mode,
+            "utilization": schedule_utilization(schedule, task_input.available_time_minutes),
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scheduling error: {e}")
 
-def run_personalization_pipeline():
-    print("📈 Running export_logs.py and train_model.py...")
-    subprocess.run(["python", "export_logs.py"])
-    subprocess.run(["python", "train_model.py"])
+def format_event(event: str, data, sse: bool) -> str:
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, "data": data}) + "\n"
 
-def is_last_task(user_id, task_id):
-    return True
+@app.post("/personalized-schedule/stream")
+async def personalized_schedule_stream(task_input: TaskInput, request: Request, current_user=Depends(get_current_user)):
+    """/personalized-schedule, streamed as it is computed: one "task" event per parsed task as the LLM
+    produces it, then "estimates" (personalized durations and priorities), one "chunk" event per
+    schedule item and "done". Server-sent events if the client accepts text/event-stream, else NDJSON
+    lines of {"event", "data"}. Failures after the stream starts arrive as an "error" event."""
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    profile = asyncio.ensure_future(get_user_profile(current_user.id))
 
-@app.post("/log-task")
-def log_task(input: TaskActionInput, background_tasks: BackgroundTasks, current_user=Depends(get_current_user)):
-    db = SessionLocal()
+    async def events():
+        parsed_tasks = []
+        try:
+            async for task in stream_parsed_tasks(task_input.raw_tasks_text):
+                finalize_parsed_tasks([task], task_input.must_do_tasks)
+                parsed_tasks.append(task)
+                yield format_event("task", task, sse)
+
+            await run_personalization(personalize, await profile, parsed_tasks)
+            yield format_event("estimates", [
+                {key: task.get(key) for key in ("task_id", "estimated_duration_minutes", "priority_score")}
+                for task in parsed_tasks
+            ], sse)
+
+            schedule = await run_personalization(
+                schedule_tasks_cognitive, parsed_tasks, task_input.available_time_minutes, task_input.schedule_mode,
+            )
+            for item in schedule:
+                yield format_event("chunk", item, sse)
+            yield format_event("done", {
+                "available_time_minutes": task_input.available_time_minutes,
+                "schedule_mode": task_input.schedule_mode,
+                "utilization": schedule_utilization(schedule, task_input.available_time_minutes),
+            }, sse)
+        except Exception as e:
+            yield format_event("error", {"detail": f"Scheduling error: {e}"}, sse)
+        finally:
+            profile.cancel()
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def parse_job_tasks(job: dict):
+    if job["tasks"] is not None:
+        tasks = [dict(task, task_type=normalize_task_type(task.get("task_type", ""))) for task in job["tasks"]]
+        return finalize_parsed_tasks(tasks, job["must_do_tasks"])
+    return await parse_tasks(job["raw_tasks_text"], job["must_do_tasks"])
+
+@app.post("/batch-schedule")
+async def batch_schedule(jobs: list[BatchScheduleJob], current_user=Depends(get_current_user)):
+    """Many schedules at once, streamed back as NDJSON (one line per job, in completion order;
+    "index" is the job's position in the request). Jobs are personalized from their user's logs, so
+    until there is a role allowed to act for other users, every job must be for the caller."""
+    if len(jobs) > BATCH_SCHEDULE_MAX_JOBS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_SCHEDULE_MAX_JOBS} jobs per request")
+    foreign = [i for i, job in enumerate(jobs) if job.user_id != current_user.id]
+    if foreign:
+        raise HTTPException(status_code=403, detail=f"Jobs {foreign} are for other users")
+    missing = [i for i, job in enumerate(jobs) if job.raw_tasks_text is None and job.tasks is None]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Jobs {missing} need raw_tasks_text or tasks")
+    ml = await ml_warmup.wait()
+
+    async def lines():
+        async for result in stream_batch(
+            [job.dict() for job in jobs],
+            parse_job_tasks,
+            ml.load_scoring_indexes,
+            personalize,
+            personalization_executor,
+        ):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def build_plan(user_id: int, profile: "TaskScoringIndex | None", parsed_tasks: list[dict], days: list[tuple[str, list[dict]]]):
+    plan = planner.new_plan(user_id, personalize(profile, parsed_tasks), days)
+    planner.save_new_plan(plan)
+    return plan
+
+@app.post("/plans")
+async def create_plan(plan_input: PlanInput, current_user=Depends(get_current_user)):
+    """Plan tasks across several days of availability windows. The plan is kept on the server and
+    repaired by POST /plans/{plan_id}/actions without re-parsing."""
+    if plan_input.raw_tasks_text is None and plan_input.tasks is None:
+        raise HTTPException(status_code=422, detail="Plans need raw_tasks_text or tasks")
     try:
-        task = input.task
-        log = TaskLog(
-            user_id=input.user_id,
-            task_id=task.get("task_id"),
-            task_description=task["description"],
-            task_type=task.get("task_type", "unknown"),
-            scheduled_duration=task["duration"],
-            actual_duration=task["duration"] + (input.extended_by or 0) if input.action == "e" else task["duration"],
-            action=input.action,
-            timestamp=datetime.utcnow()
+        days = [
+            (day.date, planner.day_windows(day.available_time_minutes, [(w.start, w.end) for w in day.windows]))
+            for day in plan_input.days
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        parsed_tasks, profile = await asyncio.gather(
+            parse_job_tasks(plan_input.dict()),
+            get_user_profile(current_user.id),
         )
-        db.add(log)
-        db.commit()
+        return await run_personalization(build_plan, current_user.id, profile, parsed_tasks, days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Planning error: {e}")
+
+@app.get("/plans/{plan_id}")
+async def get_plan(plan_id: str, current_user=Depends(get_current_user)):
+    try:
+        return await run_personalization(planner.load_plan, plan_id, current_user.id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/plans/{plan_id}/actions")
+async def plan_action(plan_id: str, action_input: PlanActionInput, current_user=Depends(get_current_user)):
+    """Complete, skip, defer or extend a planned chunk: repairs the affected windows and logs the action."""
+    start = time.perf_counter()
+    try:
+        plan, chunk, windows_changed = await run_personalization(
+            planner.act_on_plan, plan_id, current_user.id, action_input.chunk_id, action_input.action, action_input.extended_by,
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    repair_ms = (time.perf_counter() - start) * 1000
+    await write_task_logs([TaskActionInput(
+        user_id=current_user.id, task=chunk, action=action_input.action, extended_by=action_input.extended_by
+    )])
+    return {"plan": plan, "windows_changed": windows_changed, "repair_ms": repair_ms}
+
+@app.get("/ready")
+def ready():
+    """Liveness is implied by any response; this reports whether the ML path is warm."""
+    status = ml_warmup.status()
+    if not ml_warmup.ready:
+        return JSONResponse(status_code=503, content=status)
+    return {**status, "model_version": ml_warmup.value.registry.active().version}
+
+@app.get("/parse-cache/stats")
+def parse_cache_stats(current_user=Depends(get_current_user)):
+    stats = {
+        **parse_cache.stats(),
+        "parse_coalescing": parse_flight.stats(),
+        "profile_coalescing": profile_flight.stats(),
+        "local_parser": local_parser.stats(),
+        "password_pool": password_pool.stats(),
+    }
+    if ml_warmup.ready:
+        stats["log_writer"] = ml_warmup.value.log_writer.stats()
+    return stats
+
+@app.get("/task-type-stats")
+async def task_type_stats(current_user=Depends(get_current_user)):
+    """Log count, mean and p50/p90 duration and outcome rates per task type, for the current user
+    and across all users."""
+    await get_user_profile(current_user.id)  # makes sure the user's feature store rows are current
+    return {
+        "user": await run_personalization(user_summaries, current_user.id),
+        "global": task_type_priors.stats,
+    }
+
+def collect_pipeline_stats():
+    parse = parse_cache.stats()
+    parsed_locally = local_parser.stats()
+    lookups = [
+        ({"cache": "parse", "result": "hit"}, parse["memory_hits"] + parse["shared_hits"]),
+        ({"cache": "parse", "result": "miss"}, parse["misses"]),
+        ({"cache": "local_parser", "result": "hit"}, parsed_locally["local"]),
+        ({"cache": "local_parser", "result": "miss"}, parsed_locally["escalated"]),
+    ]
+    for name, cache in [("auth_token", token_cache), ("auth_user", user_cache)]:
+        lookups += [({"cache": name, "result": "hit"}, cache.hits), ({"cache": name, "result": "miss"}, cache.misses)]
+    coalescing = []
+    for name, flight in [("parse", parse_flight), ("profile", profile_flight)]:
+        flight_stats = flight.stats()
+        coalescing += [({"flight": name, "result": "coalesced"}, flight_stats["coalesced"]),
+                       ({"flight": name, "result": "led"}, flight_stats["calls"] - flight_stats["coalesced"])]
+    pool = password_pool.stats()
+    yield "cache_lookups_total", "counter", "Cache lookups by cache and result (the local parser counts as a cache in front of the LLM).", lookups
+    yield "singleflight_calls_total", "counter", "Calls that led a computation or waited on one already in flight.", coalescing
+    yield "llm_tokens_saved_total", "counter", "LLM tokens the parse cache avoided spending.", [({}, parse["saved_llm_tokens"])]
+    yield "password_pool_in_flight", "gauge", "bcrypt calls queued or running.", [({}, pool["in_flight"])]
+    yield "password_pool_rejected_total", "counter", "bcrypt calls turned away with 429.", [({}, pool["rejected"])]
+    yield "ml_ready", "gauge", "1 once the ML stack has loaded.", [({}, int(ml_warmup.ready))]
+    if ml_warmup.ready:
+        writer = ml_warmup.value.log_writer.stats()
+        yield "log_writer_rows_written_total", "counter", "Task log rows committed.", [({}, writer["rows_written"])]
+        yield "log_writer_queued_rows", "gauge", "Task log rows waiting for a commit.", [({}, writer["queued_rows"])]
+
+metrics.register_collector(collect_pipeline_stats)
 
-        if input.action == "c" and is_last_task(input.user_id, task["task_id"]):
-            background_tasks.add_task(run_personalization_pipeline)
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text format; unauthenticated like /ready, and only carries aggregates."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-        return {"msg": "Task logged"}
+async def write_task_logs(actions: list[TaskActionInput]) -> int:
+    """Queue rows on the group-committing log writer; returns once they are committed."""
+    ml = await ml_warmup.wait()
+    try:
+        rows = [ml.task_log_row(a.user_id, a.task, a.action, a.extended_by) for a in actions]
+        return await asyncio.wrap_future(ml.log_writer.submit(rows))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to log: {e}")
-    finally:
-        db.close()
+
+@app.post("/log-task")
+async def log_task(input: TaskActionInput, current_user=Depends(get_current_user)):
+    await write_task_logs([input])
+    return {"msg": "Task logged"}
+
+@app.post("/log-tasks")
+async def log_tasks(actions: list[TaskActionInput], current_user=Depends(get_current_user)):
+    if len(actions) > LOG_TASKS_MAX_ACTIONS:
+        raise HTTPException(status_code=413, detail=f"At most {LOG_TASKS_MAX_ACTIONS} actions per request")
+    # logs train the user's model and the shared priors, so nobody writes them for someone else
+    foreign = [i for i, a in enumerate(actions) if a.user_id != current_user.id]
+    if foreign:
+        raise HTTPException(status_code=403, detail=f"Actions {foreign} are for other users")
+    logged = await write_task_logs(actions)
+    return {"msg": "Tasks logged", "logged": logged}
 
 # ✅ auto-create tables in Postgres/SQLite if not exist
 Base.metadata.create_all(bind=engine)
+upgrade_schema()
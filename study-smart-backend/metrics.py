@@ -0,0 +1,298 @@
+"""Request pipeline instrumentation, exposed in the Prometheus text format at /metrics.
+
+- request_stage_seconds{stage}: time per pipeline stage (local parse, LLM, profile load,
+  personalization, scheduling, ...). Code marks a stage with `with stage("name"):` or
+  `@timed("name")`.
+- http_request_seconds / http_requests_total per route, method and status, from MetricsMiddleware.
+- db_query_seconds{operation}: every SQL statement, through SQLAlchemy cursor events.
+- LLM request, retry, token and time-to-first-token metrics, recorded by llm_client.
+- Anything registered with register_collector (cache hit/miss counters and the like), read at scrape time.
+
+With SERVER_TIMING on, each response carries a Server-Timing header with that request's stage and
+DB totals (streamed responses only get what finished before their first byte). PROFILE_SAMPLE_RATE
+runs cProfile on that fraction of requests, one at a time, and writes .prof files to PROFILE_DIR.
+
+METRICS_ENABLED=false turns off the per-request parts: stage() returns a shared no-op context
+manager, timed() returns the function unchanged, and neither the middleware nor the SQLAlchemy hooks
+are installed. The few counters left (LLM calls, tokens) are one dict update per LLM call.
+"""
+import bisect
+import contextvars
+import cProfile
+import functools
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # label values -> [per-bucket counts (last is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+_metrics = []
+_collectors = []
+
+
+def counter(name: str, help: str, labelnames: tuple = ()) -> Counter:
+    metric = Counter(name, help, labelnames)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    metric = Histogram(name, help, labelnames, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collect):
+    """collect() is called at every scrape and returns (name, type, help, [(labels, value), ...]) tuples."""
+    _collectors.append(collect)
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        for name, metric_type, help, samples in collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(f"{name}{_format_labels(labels)} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+stage_seconds = histogram("request_stage_seconds", "Time spent per request pipeline stage.", ("stage",))
+http_request_seconds = histogram("http_request_seconds", "HTTP request latency.", ("method", "route"))
+http_requests_total = counter("http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+db_query_seconds = histogram("db_query_seconds", "SQL statement latency.", ("operation",))
+llm_requests_total = counter("llm_requests_total", "LLM calls by mode and outcome.", ("mode", "outcome"))
+llm_retries_total = counter("llm_retries_total", "LLM attempts retried after a transient error.", ("mode",))
+llm_tokens_total = counter("llm_tokens_total", "LLM tokens reported by the API.", ("kind",))
+llm_first_token_seconds = histogram("llm_first_token_seconds", "Time to the first streamed LLM delta.")
+
+
+class RequestTimings:
+    """Stage and DB totals for one request; shared by every thread working on it."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_query(self, seconds: float):
+        with self._lock:
+            self.db_seconds += seconds
+            self.db_queries += 1
+
+    def header(self) -> str:
+        with self._lock:
+            parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+            if self.db_queries:
+                parts.append(f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"')
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# The current request's timings. Executor calls only see it if they run in a copy of the caller's
+# context (asyncio.to_thread and run_in_threadpool do; bare loop.run_in_executor does not).
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def observe_stage(name: str, seconds: float):
+    stage_seconds.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add_stage(name, seconds)
+
+
+@contextmanager
+def _timed_stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+_NO_STAGE = nullcontext()
+
+
+def stage(name: str):
+    return _timed_stage(name) if METRICS_ENABLED else _NO_STAGE
+
+
+def timed(name: str):
+    """Decorator form of stage(); leaves the function untouched when metrics are off."""
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _timed_stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    db_query_seconds.observe(elapsed, operation=operation)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add_query(elapsed)
+
+
+def instrument_engine(engine):
+    if not METRICS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+_profiling = threading.Lock()
+
+
+def _route_template(scope) -> str:
+    """The matched route's path template, e.g. /plans/{plan_id}/actions, so labels stay low-cardinality."""
+    template = getattr(scope.get("route"), "path_format", None)
+    if template is None:
+        return "unmatched"
+    # some FastAPI versions report an included router's path without its prefix; the prefix is
+    # whatever comes before the template's segments in the concrete path
+    depth = template.count("/")
+    return "/".join(scope["path"].split("/")[:-depth]) + template
+
+
+def _route_slug(route: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency and status counts, Server-Timing, sampled profiles."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timings.header().encode())]
+            await send(message)
+
+        # cProfile sees everything on the event loop thread while it runs, including other requests
+        profiler = None
+        if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE and _profiling.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - timings.start
+            _request_timings.reset(token)
+            route = _route_template(scope)
+            http_request_seconds.observe(elapsed, method=scope["method"], route=route)
+            http_requests_total.inc(method=scope["method"], route=route, status=str(status))
+            if profiler is not None:
+                profiler.disable()
+                _profiling.release()
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                profiler.dump_stats(os.path.join(
+                    PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{_route_slug(route)}-{elapsed * 1000:.0f}ms.prof"
+                ))
@@ -0,0 +1,164 @@
+"""Schema migrations and query-plan checks.
+
+Base.metadata.create_all creates missing tables (with their indexes) but never changes tables that
+already exist, so changes to existing tables are listed in MIGRATIONS. upgrade() applies the ones a
+database has not recorded in schema_version yet; it runs on app startup and from init_db.py.
+Statements are idempotent, so a fresh database (where create_all already built everything) just
+records them. A statement can also be a function of the connection, for changes SQL alone cannot
+make conditional (add_column).
+
+check_query_plans() runs EXPLAIN on the hot queries and reports any that do not use the index they
+were written for.
+
+Run with: python migrations.py [upgrade|status|explain]
+"""
+import sys
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from database import Base, SessionLocal, engine
+from models import SchemaVersion, TaskLog, User, UserDescriptionStats, UserTaskTypeStats
+
+
+def add_column(table: str, column: str, definition: str):
+    """ALTER TABLE ADD COLUMN, skipped when the column exists (SQLite has no ADD COLUMN IF NOT EXISTS)."""
+    def apply(conn):
+        if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+    return apply
+
+
+MIGRATIONS = [
+    (1, "composite index for per-user task log scans ordered by time", [
+        "CREATE INDEX IF NOT EXISTS ix_task_logs_user_id_timestamp ON task_logs (user_id, timestamp)",
+    ]),
+    (2, "outcome counts and duration histograms in user_task_type_stats", [
+        add_column("user_task_type_stats", "completed_count", "INTEGER NOT NULL DEFAULT 0"),
+        add_column("user_task_type_stats", "skipped_count", "INTEGER NOT NULL DEFAULT 0"),
+        add_column("user_task_type_stats", "deferred_count", "INTEGER NOT NULL DEFAULT 0"),
+        add_column("user_task_type_stats", "extended_count", "INTEGER NOT NULL DEFAULT 0"),
+        add_column("user_task_type_stats", "duration_histogram", "TEXT NOT NULL DEFAULT '[]'"),
+        # existing rows have no outcomes yet: every user's store is rebuilt on its next read
+        "DELETE FROM user_feature_state",
+    ]),
+]
+
+# (name, statement, index it must use per dialect, whether the plan may sort)
+HOT_QUERIES = [
+    (
+        "personalization.get_user_logs",
+        select(TaskLog).where(TaskLog.user_id == 1).order_by(TaskLog.timestamp.desc()),
+        {"sqlite": "ix_task_logs_user_id_timestamp", "postgresql": "ix_task_logs_user_id_timestamp"},
+        False,
+    ),
+    (
+        "feature_store.rebuild_users_features",
+        select(TaskLog).where(TaskLog.user_id.in_([1, 2, 3])),
+        {"sqlite": "ix_task_logs_user_id_timestamp", "postgresql": "ix_task_logs_user_id_timestamp"},
+        True,
+    ),
+    (
+        "training.train_increment",
+        select(TaskLog).where(TaskLog.id > 1).order_by(TaskLog.id).limit(5000),
+        {"sqlite": "INTEGER PRIMARY KEY", "postgresql": "task_logs_pkey"},
+        False,
+    ),
+    (
+        "feature_store.load_scoring_index (types)",
+        select(UserTaskTypeStats).where(UserTaskTypeStats.user_id == 1),
+        {"sqlite": "sqlite_autoindex_user_task_type_stats_1", "postgresql": "user_task_type_stats_pkey"},
+        True,
+    ),
+    (
+        "feature_store.load_scoring_index (descriptions)",
+        select(UserDescriptionStats).where(UserDescriptionStats.user_id == 1),
+        {"sqlite": "sqlite_autoindex_user_description_stats_1", "postgresql": "user_description_stats_pkey"},
+        True,
+    ),
+    (
+        "auth.get_user",
+        select(User).where(User.username == "student"),
+        {"sqlite": "ix_users_username", "postgresql": "ix_users_username"},
+        True,
+    ),
+]
+
+
+def upgrade(bind=engine) -> list[int]:
+    """Apply pending migrations; returns the versions applied by this call."""
+    Base.metadata.create_all(bind=bind, tables=[SchemaVersion.__table__])
+    applied = []
+    with bind.connect() as conn:
+        done = set(conn.execute(select(SchemaVersion.version)).scalars())
+        conn.rollback()  # end the implicit read transaction so each migration gets its own
+        for version, description, statements in MIGRATIONS:
+            if version in done:
+                continue
+            try:
+                with conn.begin():
+                    for statement in statements:
+                        if callable(statement):
+                            statement(conn)
+                        else:
+                            conn.execute(text(statement))
+                    conn.execute(SchemaVersion.__table__.insert().values(version=version, description=description))
+            except (IntegrityError, OperationalError):
+                # another worker applied it at the same time; anything else should still surface
+                if version not in set(conn.execute(select(SchemaVersion.version)).scalars()):
+                    raise
+                conn.rollback()
+                continue
+            applied.append(version)
+            print(f"Applied migration {version}: {description}")
+    return applied
+
+
+def explain(conn, statement) -> str:
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return "\n".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    return "\n".join(row[0] for row in conn.execute(text(f"EXPLAIN {sql}")))
+
+
+def check_query_plans(bind=engine) -> list[tuple[str, bool, str]]:
+    """(query name, uses its index, plan) for each hot query."""
+    results = []
+    with bind.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # small or empty tables make a sequential scan cheapest; ask whether the index is usable
+            conn.execute(text("SET enable_seqscan = off"))
+        for name, statement, indexes, may_sort in HOT_QUERIES:
+            plan = explain(conn, statement)
+            index = indexes.get(conn.dialect.name)
+            ok = index is None or index in plan
+            if not may_sort:
+                ok = ok and "TEMP B-TREE" not in plan and "Sort" not in plan
+            results.append((name, ok, plan))
+    return results
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command == "upgrade":
+        Base.metadata.create_all(bind=engine)
+        applied = upgrade()
+        print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
+    elif command == "status":
+        db = SessionLocal()
+        Base.metadata.create_all(bind=engine, tables=[SchemaVersion.__table__])
+        done = {row.version: row for row in db.query(SchemaVersion)}
+        db.close()
+        for version, description, _ in MIGRATIONS:
+            state = f"applied {done[version].applied_at:%Y-%m-%d %H:%M}" if version in done else "pending"
+            print(f"{version:>4}  {state:<22} {description}")
+    elif command == "explain":
+        failed = False
+        for name, ok, plan in check_query_plans():
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+            for line in plan.splitlines():
+                print(f"       {line}")
+            failed = failed or not ok
+        sys.exit(1 if failed else 0)
+    else:
+        sys.exit(f"unknown command {command!r}; expected upgrade, status or explain")
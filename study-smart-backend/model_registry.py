@@ -0,0 +1,247 @@
+"""Versioned model artifacts with atomic promotion and hot reload.
+
+Layout under MODEL_REGISTRY_DIR:
+
+    versions/<version>/model.joblib   uncompressed joblib dump, loaded with mmap_mode="r" so forked
+                                      workers share the weight pages
+    versions/<version>/manifest.json  feature list, scoring generation and training metadata
+    CURRENT                           name of the promoted version, swapped with os.replace
+
+Versions are written to a temporary directory and renamed into place, so a reader never sees a
+half-written artifact. Each process holds exactly one loaded copy of the promoted version.
+Every promotion deletes versions beyond the MODEL_REGISTRY_KEEP_VERSIONS newest, except the promoted
+one; workers still mapping a deleted artifact keep reading it until they load the new version.
+"""
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import NamedTuple
+
+import joblib
+
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "model_registry")
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "2"))
+# incremental training publishes a version per run, so old ones are deleted on promotion
+MODEL_REGISTRY_KEEP_VERSIONS = max(1, int(os.getenv("MODEL_REGISTRY_KEEP_VERSIONS", "5")))
+LEGACY_MODEL_PATH = "multioutput_model.pkl"
+LEGACY_FEATURES_PATH = "model_feature_names.pkl"
+
+ARTIFACT_NAME = "model.joblib"
+MANIFEST_NAME = "manifest.json"
+
+
+class LoadedModel(NamedTuple):
+    version: str
+    model: object
+    features: list[str]
+    manifest: dict
+
+    @property
+    def scoring_generation(self) -> str:
+        return self.manifest.get("scoring_generation") or self.version
+
+
+def _fsync_write(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class ModelRegistry:
+    def __init__(self, root: str, keep_versions: int = MODEL_REGISTRY_KEEP_VERSIONS):
+        self.root = root
+        self.keep_versions = keep_versions
+        self.versions_dir = os.path.join(root, "versions")
+        self.current_path = os.path.join(root, "CURRENT")
+        self.lock_path = os.path.join(root, ".lock")
+        self._lock = threading.RLock()  # promote() inside refresh() re-enters
+        self._active: LoadedModel | None = None
+        self._current_stamp = None
+        self._checked_at = 0.0
+        self._watcher = None
+        self._stop_watching = threading.Event()
+
+    def version_dir(self, version: str) -> str:
+        return os.path.join(self.versions_dir, version)
+
+    def versions(self) -> list[str]:
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(v for v in os.listdir(self.versions_dir) if not v.startswith("."))
+
+    def manifest(self, version: str) -> dict:
+        with open(os.path.join(self.version_dir(version), MANIFEST_NAME)) as f:
+            return json.load(f)
+
+    def current_version(self) -> str | None:
+        try:
+            with open(self.current_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def publish(self, model, features: list[str], metadata: dict | None = None,
+                scoring_generation: str | None = None, promote: bool = True) -> str:
+        os.makedirs(self.versions_dir, exist_ok=True)
+        created_at = datetime.utcnow()
+        version = f"{created_at:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+        manifest = {
+            "version": version,
+            "created_at": created_at.isoformat(),
+            "features": list(features),
+            "scoring_generation": scoring_generation or version,
+            "artifact": ARTIFACT_NAME,
+            "training": metadata or {},
+        }
+
+        tmp_dir = tempfile.mkdtemp(dir=self.versions_dir, prefix=".tmp-")
+        try:
+            artifact = os.path.join(tmp_dir, ARTIFACT_NAME)
+            joblib.dump(model, artifact)  # uncompressed so it can be memory-mapped
+            with open(artifact, "rb") as f:
+                os.fsync(f.fileno())
+            _fsync_write(os.path.join(tmp_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+            os.rename(tmp_dir, self.version_dir(version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if promote:
+            self.promote(version)
+        return version
+
+    def promote(self, version: str):
+        if not os.path.isfile(os.path.join(self.version_dir(version), MANIFEST_NAME)):
+            raise ValueError(f"unknown model version: {version}")
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-CURRENT-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(version.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.current_path)
+        self.refresh(force=True)
+        self.prune()
+
+    def prune(self) -> list[str]:
+        """Delete all but the keep_versions newest versions and the promoted one; returns the deleted."""
+        current = self.current_version()
+        stale = [v for v in self.versions()[:-self.keep_versions] if v != current]
+        for version in stale:
+            shutil.rmtree(self.version_dir(version), ignore_errors=True)
+        return stale
+
+    def load(self, version: str) -> LoadedModel:
+        manifest = self.manifest(version)
+        model = joblib.load(os.path.join(self.version_dir(version), manifest["artifact"]), mmap_mode="r")
+        return LoadedModel(version, model, manifest["features"], manifest)
+
+    def bootstrap_from_legacy(self):
+        """Import the legacy pickles as the first version when the registry is empty."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if self.current_version() is not None:
+                return
+            from database import SessionLocal
+            from models import TaskLog
+
+            db = SessionLocal()
+            try:
+                newest = db.query(TaskLog.id).order_by(TaskLog.id.desc()).first()
+            except Exception:
+                newest = None  # tables may not exist yet on a fresh database
+            finally:
+                db.close()
+            self.publish(
+                joblib.load(LEGACY_MODEL_PATH),
+                joblib.load(LEGACY_FEATURES_PATH),
+                metadata={"source": LEGACY_MODEL_PATH, "last_log_id": newest[0] if newest else 0},
+            )
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.current_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    def refresh(self, force: bool = False):
+        """Load the promoted version if it differs from the one held in memory."""
+        with self._lock:
+            stamp = self._stamp()
+            if not force and stamp == self._current_stamp and self._active is not None:
+                return self._active
+            if stamp is None:
+                self.bootstrap_from_legacy()
+                stamp = self._stamp()
+            version = self.current_version()
+            if self._active is None or self._active.version != version:
+                try:
+                    self._active = self.load(version)
+                except Exception as e:
+                    if self._active is None:
+                        raise
+                    print(f"Keeping model {self._active.version}; failed to load {version}: {e}")
+            self._current_stamp = stamp
+            self._checked_at = time.monotonic()
+            return self._active
+
+    def active(self) -> LoadedModel:
+        if self._active is None:
+            return self.refresh()
+        if self._watcher is None and time.monotonic() - self._checked_at >= MODEL_WATCH_INTERVAL_SECONDS:
+            return self.refresh()
+        return self._active
+
+    def start_watching(self, interval: float = MODEL_WATCH_INTERVAL_SECONDS):
+        """Poll CURRENT in the background so promotions are loaded off the request path."""
+        if self._watcher is not None:
+            return
+        self._stop_watching.clear()
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Model registry refresh failed: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="model-registry-watch", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+
+registry = ModelRegistry(MODEL_REGISTRY_DIR)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and promote model versions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    promote_parser = sub.add_parser("promote")
+    promote_parser.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = registry.current_version()
+        for v in registry.versions():
+            manifest = registry.manifest(v)
+            marker = "*" if v == current else " "
+            print(f"{marker} {v}  {manifest['created_at']}  {json.dumps(manifest['training'])}")
+    else:
+        registry.promote(args.version)
+        print(f"Promoted {args.version}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Text, DateTime, ForeignKey, Index
 from datetime import datetime
 from database import Base
 
@@ -20,3 +20,82 @@ class TaskLog(Base):
     actual_duration = Column(Integer, nullable=True)
     action = Column(String, nullable=False)  # 'c', 's', 'd', 'e'
     timestamp = Column(DateTime, default=datetime.utcnow)
+
+    # per-user history scans: filter on user_id, order by timestamp (see migrations.py)
+    __table_args__ = (Index("ix_task_logs_user_id_timestamp", "user_id", "timestamp"),)
+
+class ParseCacheEntry(Base):
+    __tablename__ = "parse_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of normalized text + model + prompt version
+    tasks_json = Column(Text, nullable=False)
+    llm_latency_seconds = Column(Float, default=0.0)
+    llm_total_tokens = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+# Per-user aggregates maintained incrementally from task_logs (see feature_store.py).
+# Decayed sums are stored as of decayed_at and decayed lazily when read or updated.
+class UserTaskTypeStats(Base):
+    __tablename__ = "user_task_type_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    task_type = Column(String, primary_key=True)
+    log_count = Column(Integer, nullable=False, default=0)
+    duration_sum = Column(Float, nullable=False, default=0.0)
+    score_sum = Column(Float, nullable=False, default=0.0)  # sum of raw score * recency weight
+    decayed_at = Column(DateTime, nullable=False)
+    # outcome counts and duration histogram, see task_type_stats.py
+    completed_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)
+    deferred_count = Column(Integer, nullable=False, default=0)
+    extended_count = Column(Integer, nullable=False, default=0)
+    duration_histogram = Column(Text, nullable=False, default="[]")  # JSON counts per DURATION_BUCKETS bucket
+
+# The same statistics across all users, maintained alongside the per-user rows (see task_type_stats.py)
+class TaskTypeStats(Base):
+    __tablename__ = "task_type_stats"
+
+    task_type = Column(String, primary_key=True)
+    log_count = Column(Integer, nullable=False, default=0)
+    duration_sum = Column(Float, nullable=False, default=0.0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)
+    deferred_count = Column(Integer, nullable=False, default=0)
+    extended_count = Column(Integer, nullable=False, default=0)
+    duration_histogram = Column(Text, nullable=False, default="[]")
+    rebuilt_at = Column(DateTime, nullable=False)  # last full recompute from task_logs
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class UserDescriptionStats(Base):
+    __tablename__ = "user_description_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    description = Column(String, primary_key=True)  # lower-cased task_description
+    log_count = Column(Integer, nullable=False, default=0)
+    weighted_score_sum = Column(Float, nullable=False, default=0.0)  # sum of raw score * recency weight^2
+    weight_sum = Column(Float, nullable=False, default=0.0)  # sum of recency weight
+    decayed_at = Column(DateTime, nullable=False)
+
+class UserFeatureState(Base):
+    __tablename__ = "user_feature_state"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    model_version = Column(String, nullable=False)  # raw scores above were computed with this model
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)  # see MIGRATIONS in migrations.py
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+class StudyPlan(Base):
+    __tablename__ = "study_plans"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    plan_json = Column(Text, nullable=False)  # days, windows, scheduled chunks and backlog (see planner.py)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import ParseCacheEntry
+from shared_cache import SHARED_CACHE_PATH, SharedCache
+from ttl_cache import TTLCache
+
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "2048"))
+PARSE_CACHE_TTL_SECONDS = float(os.getenv("PARSE_CACHE_TTL_SECONDS", str(24 * 3600)))
+PARSE_CACHE_SHARED = os.getenv("PARSE_CACHE_SHARED", "false").lower() in ("1", "true", "yes")
+
+
+class CachedParse(NamedTuple):
+    tasks: tuple
+    llm_latency_seconds: float
+    llm_total_tokens: int
+
+
+def normalize_raw_text(raw_text: str) -> str:
+    return re.sub(r"\s+", " ", raw_text).strip().lower()
+
+
+def make_key(raw_text: str, model: str, prompt_version: str) -> str:
+    payload = json.dumps([normalize_raw_text(raw_text), model, prompt_version])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    """Two-tier cache of LLM task parses: a per-process LRU with TTL, optionally backed by the
+    parse_cache table so every worker on every host shares results, or else by a SharedCache
+    (store) that the workers on one host share. Cached task lists carry no task_id or must_do
+    flags; callers add those per request."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float, shared: bool, store: SharedCache | None = None):
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self.store = None if shared else store
+        self.memory = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "saved_llm_seconds": 0.0,
+            "saved_llm_tokens": 0,
+        }
+
+    def _record(self, outcome: str, entry: CachedParse | None = None):
+        with self._stats_lock:
+            self._stats[outcome] += 1
+            if entry is not None:
+                self._stats["saved_llm_seconds"] += entry.llm_latency_seconds
+                self._stats["saved_llm_tokens"] += entry.llm_total_tokens
+
+    def _get_shared(self, key: str) -> CachedParse | None:
+        db = SessionLocal()
+        try:
+            row = db.get(ParseCacheEntry, key)
+            if row is None or row.expires_at <= datetime.utcnow():
+                return None
+            return CachedParse(tuple(json.loads(row.tasks_json)), row.llm_latency_seconds or 0.0, row.llm_total_tokens or 0)
+        finally:
+            db.close()
+
+    def _put_shared(self, key: str, entry: CachedParse):
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            db.merge(ParseCacheEntry(
+                key=key,
+                tasks_json=json.dumps(list(entry.tasks)),
+                llm_latency_seconds=entry.llm_latency_seconds,
+                llm_total_tokens=entry.llm_total_tokens,
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl_seconds),
+            ))
+            db.query(ParseCacheEntry).filter(ParseCacheEntry.expires_at <= now).delete()
+            db.commit()
+        except IntegrityError:
+            # another worker stored the same parse first
+            db.rollback()
+        finally:
+            db.close()
+
+    def get(self, key: str) -> list[dict] | None:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._record("memory_hits", entry)
+            return [dict(task) for task in entry.tasks]
+        return self._get_second_tier(key)
+
+    def _get_second_tier(self, key: str) -> list[dict] | None:
+        entry = None
+        if self.shared:
+            entry = self._get_shared(key)
+        elif self.store is not None:
+            entry = self.store.get(key)
+        if entry is None:
+            self._record("misses")
+            return None
+        self.memory.set(key, entry)
+        self._record("shared_hits", entry)
+        return [dict(task) for task in entry.tasks]
+
+    def _put_second_tier(self, key: str, entry: CachedParse):
+        if self.shared:
+            self._put_shared(key, entry)
+        elif self.store is not None:
+            self.store.set(key, entry)
+
+    def put(self, key: str, tasks: list[dict], llm_latency_seconds: float = 0.0, llm_total_tokens: int = 0):
+        entry = CachedParse(tuple(dict(task) for task in tasks), llm_latency_seconds, llm_total_tokens)
+        self.memory.set(key, entry)
+        self._put_second_tier(key, entry)
+
+    # memory hits stay on the event loop; the database or SharedCache tier runs on a worker thread
+    async def aget(self, key: str) -> list[dict] | None:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._record("memory_hits", entry)
+            return [dict(task) for task in entry.tasks]
+        if not self.shared and self.store is None:
+            self._record("misses")
+            return None
+        return await asyncio.to_thread(self._get_second_tier, key)
+
+    async def aput(self, key: str, tasks: list[dict], llm_latency_seconds: float = 0.0, llm_total_tokens: int = 0):
+        entry = CachedParse(tuple(dict(task) for task in tasks), llm_latency_seconds, llm_total_tokens)
+        self.memory.set(key, entry)
+        if self.shared or self.store is not None:
+            await asyncio.to_thread(self._put_second_tier, key, entry)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["shared_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        stats["shared_tier_enabled"] = self.shared or self.store is not None
+        stats["shared_tier"] = "database" if self.shared else "local" if self.store is not None else None
+        return stats
+
+
+parse_cache = ParseCache(
+    PARSE_CACHE_SIZE, PARSE_CACHE_TTL_SECONDS, PARSE_CACHE_SHARED,
+    SharedCache(
+        SHARED_CACHE_PATH, "parse", PARSE_CACHE_SIZE, PARSE_CACHE_TTL_SECONDS,
+        decode=lambda value: CachedParse(tuple(value[0]), *value[1:]),
+    ) if SHARED_CACHE_PATH else None,
+)
@@ -0,0 +1,67 @@
+"""Bounded worker pool for bcrypt hashing and verification.
+
+bcrypt releases the GIL while it hashes, so a thread pool runs it off the event loop without
+pickling anything across processes. At most PASSWORD_HASH_WORKERS hashes run at once, which caps
+the CPU a login burst can take from other requests, and at most PASSWORD_HASH_MAX_PENDING more
+wait in the queue. Beyond that, submit() raises PasswordPoolBusy, which the auth routes turn into
+429 Too Many Requests.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(4 * PASSWORD_HASH_WORKERS)))
+
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+class PasswordPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.capacity = workers + max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {"completed": 0, "rejected": 0}
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats["rejected"] += 1
+                raise PasswordPoolBusy(f"{self._in_flight} password hashes already queued or running")
+            self._in_flight += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+            self._stats["completed"] += 1
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "in_flight": self._in_flight, "workers": self.workers, "capacity": self.capacity}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_pool = PasswordPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
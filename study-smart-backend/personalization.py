@@ -1,29 +1,22 @@
 import pandas as pd
 import numpy as np
-import joblib
+import os
+import metrics
 from database import SessionLocal
 from models import TaskLog
 from datetime import datetime
 
-MODEL_FEATURES = joblib.load("model_feature_names.pkl")
-model = joblib.load("multioutput_model.pkl")
-
-TASK_TYPE_MAP = {
-    "essay": "writing",
-    "essay_writing": "writing",
-    "project_work": "project",
-    "video": "video_watching",
-    "video watching": "video_watching",
-    "coding": "problem_solving",
-    "problem solving": "problem_solving",
-    "hw": "homework",
-    "leetcode": "problem_solving"
-}
-
-def normalize_task_type(task_type: str) -> str:
-    key = task_type.strip().lower().replace(" ", "_")
-    return TASK_TYPE_MAP.get(key, key)
+from model_registry import registry
+from task_types import TASK_TYPE_MAP, normalize_task_type
 
+def get_model():
+    """The promoted model; model_registry reloads it when another version is promoted."""
+    return registry.active().model
+
+def get_model_features() -> list[str]:
+    return registry.active().features
+
+@metrics.timed("get_user_logs")
 def get_user_logs(user_id: int) -> pd.DataFrame:
     db = SessionLocal()
     logs = db.query(TaskLog).filter(TaskLog.user_id == user_id).order_by(TaskLog.timestamp.desc()).all()
@@ -44,27 +37,110 @@ def get_user_logs(user_id: int) -> pd.DataFrame:
 
     return pd.DataFrame(logs_data)
 
-def preprocess_user_logs(df: pd.DataFrame):
+RECENCY_DECAY_PER_DAY = 0.1
+
+def log_feature_matrix(df: pd.DataFrame) -> pd.DataFrame:
     df["task_type"] = df["task_type"].apply(normalize_task_type)
     df["actual_duration"] = df["actual_duration"].fillna(df["scheduled_duration"]).fillna(0)
 
-    now = datetime.utcnow()
-    df["days_ago"] = (now - df["timestamp"]).dt.days
-    df["recency_weight"] = np.exp(-0.1 * df["days_ago"])
-
     task_type_dummies = pd.get_dummies(df["task_type"], prefix="task_type")
     df_features = pd.concat([df[["scheduled_duration", "actual_duration"]], task_type_dummies], axis=1)
 
-    for col in MODEL_FEATURES:
+    model_features = get_model_features()
+    for col in model_features:
         if col not in df_features.columns:
             df_features[col] = 0
 
-    df_features = df_features[MODEL_FEATURES]
+    return df_features[model_features]
+
+@metrics.timed("preprocess_user_logs")
+def preprocess_user_logs(df: pd.DataFrame):
+    df_features = log_feature_matrix(df)
+
+    now = datetime.utcnow()
+    df["days_ago"] = (now - df["timestamp"]).dt.days
+    df["recency_weight"] = np.exp(-RECENCY_DECAY_PER_DAY * df["days_ago"])
 
     return df_features, df["recency_weight"]
 
+def raw_priority_scores(df: pd.DataFrame) -> np.ndarray:
+    """Model score of each log before recency weighting."""
+    features = log_feature_matrix(df)
+    return compute_task_priority_scores(features, pd.Series(np.ones(len(features)))).to_numpy(dtype=float)
+
+def current_model_version() -> str:
+    """Identifies the scores baked into the feature store. Incremental training keeps the
+    scoring generation of the version it updated, so small updates don't force rebuilds."""
+    return registry.active().scoring_generation
+
+# Weights applied to the model's completed / deferred / skipped / extended probabilities
+ACTION_SCORE_WEIGHTS = np.array([1.0, -0.3, -0.5, -0.1])
+USE_COMPILED_SCORER = os.getenv("USE_COMPILED_SCORER", "true").lower() in ("1", "true", "yes")
+
+
+class CompiledLinearScorer:
+    """All four binary linear estimators stacked into one weight matrix, so the combined priority
+    score is a single matmul + sigmoid + dot product on a NumPy array."""
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray):
+        self.coef_t = np.ascontiguousarray(coef.T)
+        self.intercept = intercept
+
+    @classmethod
+    def compile(cls, model):
+        estimators = getattr(model, "estimators_", None)
+        if not estimators or len(estimators) != len(ACTION_SCORE_WEIGHTS):
+            return None
+        for estimator in estimators:
+            coef = getattr(estimator, "coef_", None)
+            classes = getattr(estimator, "classes_", None)
+            if coef is None or coef.shape[0] != 1 or classes is None or list(classes) != [0, 1]:
+                return None
+            if not hasattr(estimator, "predict_proba"):
+                return None
+
+        scorer = cls(
+            np.vstack([e.coef_[0] for e in estimators]).astype(float),
+            np.array([e.intercept_[0] for e in estimators], dtype=float),
+        )
+
+        # Only trust the closed form if it reproduces predict_proba (e.g. not a multinomial softmax fit)
+        n_features = scorer.coef_t.shape[0]
+        probe = np.vstack([np.zeros(n_features), np.eye(n_features), np.full(n_features, 30.0)])
+        probe_df = pd.DataFrame(probe, columns=getattr(estimators[0], "feature_names_in_", None))
+        expected = np.column_stack([e.predict_proba(probe_df)[:, 1] for e in estimators])
+        if not np.allclose(scorer.probabilities(probe), expected, rtol=1e-9, atol=1e-12):
+            return None
+        return scorer
+
+    def probabilities(self, X: np.ndarray) -> np.ndarray:
+        logits = X @ self.coef_t + self.intercept
+        return 0.5 * (1.0 + np.tanh(0.5 * logits))  # numerically stable sigmoid
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        return self.probabilities(X) @ ACTION_SCORE_WEIGHTS
+
+
+_compiled = (None, None)
+
+
+def get_compiled_scorer(current_model):
+    global _compiled
+    compiled_for, scorer = _compiled
+    if compiled_for is not current_model:
+        scorer = CompiledLinearScorer.compile(current_model)
+        _compiled = (current_model, scorer)
+    return scorer
+
+
+@metrics.timed("compute_task_priority_scores")
 def compute_task_priority_scores(features_df: pd.DataFrame, recency_weights: pd.Series) -> pd.Series:
-    global model
+    model = get_model()
+
+    scorer = get_compiled_scorer(model) if USE_COMPILED_SCORER else None
+    if scorer is not None:
+        combined = scorer.score(features_df.to_numpy(dtype=float)) * recency_weights.to_numpy(dtype=float)
+        return pd.Series(combined)
 
     prob_scores = []
     for estimator in model.estimators_:
@@ -87,3 +163,96 @@ def compute_task_priority_scores(features_df: pd.DataFrame, recency_weights: pd.
     combined_score *= recency_weights.values
 
     return combined_score
+
+class TaskScoringIndex:
+    """Per-request lookup structures over one user's scored logs.
+
+    Logs are grouped by lower-cased description into weighted sums, and the distinct descriptions
+    are joined into one NUL-separated blob so a task description is matched against all of them
+    with a single str.find scan. Scoring every parsed task is then one bincount pass.
+    """
+
+    def __init__(self, descriptions: list[str], weighted_sums: np.ndarray, weight_sums: np.ndarray,
+                 avg_durations: dict, avg_scores_by_type: dict):
+        self.descriptions = descriptions
+        self.weighted_sums = np.asarray(weighted_sums, dtype=float)
+        self.weight_sums = np.asarray(weight_sums, dtype=float)
+        self.avg_durations = avg_durations
+        self.avg_scores_by_type = avg_scores_by_type
+
+        self._blob = "\0".join(self.descriptions)
+        lengths = np.fromiter(map(len, self.descriptions), dtype=np.int64, count=len(self.descriptions)) + 1
+        self._starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+
+    @classmethod
+    def from_logs(cls, df_logs: pd.DataFrame):
+        """Build from logs already carrying priority_score and recency_weight columns."""
+        weighted = (df_logs["priority_score"] * df_logs["recency_weight"]).to_numpy(dtype=float)
+        weights = df_logs["recency_weight"].to_numpy(dtype=float)
+
+        codes, descriptions = pd.factorize(df_logs["task_description"].str.lower())
+        known = codes >= 0
+
+        by_type = df_logs.groupby("task_type")
+        return cls(
+            descriptions.tolist(),
+            np.bincount(codes[known], weights=weighted[known], minlength=len(descriptions)),
+            np.bincount(codes[known], weights=weights[known], minlength=len(descriptions)),
+            by_type["actual_duration"].mean().to_dict(),
+            by_type["priority_score"].mean().to_dict(),
+        )
+
+    def matching_descriptions(self, query: str) -> list[int]:
+        if not self.descriptions:
+            return []
+        query = query.lower()
+        blob, starts = self._blob, self._starts
+        matches = []
+        pos = blob.find(query)
+        while pos != -1:
+            desc_id = int(np.searchsorted(starts, pos, side="right")) - 1
+            # skip a hit that only exists by spanning the separator into the next description
+            end = starts[desc_id] + len(self.descriptions[desc_id])
+            if pos + len(query) <= end:
+                matches.append(desc_id)
+                pos = end + 1
+            else:
+                pos += 1
+            pos = blob.find(query, pos) if pos < len(blob) else -1
+        return matches
+
+    def score_tasks(self, tasks: list[dict]) -> np.ndarray:
+        """Recency-weighted score of the logs whose description contains each task's description,
+        falling back to the task type's mean score; must_do bonuses are left to the caller."""
+        task_ids, desc_ids = [], []
+        for i, task in enumerate(tasks):
+            matches = self.matching_descriptions(task["description"])
+            task_ids.extend([i] * len(matches))
+            desc_ids.extend(matches)
+
+        task_ids = np.asarray(task_ids, dtype=np.int64)
+        desc_ids = np.asarray(desc_ids, dtype=np.int64)
+        numerator = np.bincount(task_ids, weights=self.weighted_sums[desc_ids], minlength=len(tasks))
+        denominator = np.bincount(task_ids, weights=self.weight_sums[desc_ids], minlength=len(tasks))
+        matched = np.bincount(task_ids, minlength=len(tasks)) > 0
+
+        fallback = np.array([self.avg_scores_by_type.get(t["task_type"], 0) for t in tasks], dtype=float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(matched, numerator / np.where(matched, denominator, 1.0), fallback)
+
+def personalize_tasks(profile: TaskScoringIndex, parsed_tasks: list[dict]) -> list[dict]:
+    """Apply a user's scores and typical durations to parsed tasks (in place) and order them for
+    schedule_tasks_cognitive."""
+    priority_scores = profile.score_tasks(parsed_tasks)
+
+    for task, priority_score in zip(parsed_tasks, priority_scores):
+        task["estimated_duration_minutes"] = profile.avg_durations.get(
+            task["task_type"], task["estimated_duration_minutes"]
+        )
+        task["priority_score"] = float(priority_score)
+
+        if task.get("must_do", False):
+            task["priority_score"] += 0.5
+
+    parsed_tasks.sort(key=lambda t: (t.get("must_do", False), t["priority_score"]), reverse=True)
+    return parsed_tasks
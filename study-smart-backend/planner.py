@@ -0,0 +1,229 @@
+"""Multi-day study plans that are repaired in place when the student acts on a chunk.
+
+A plan spreads a task list over days, each with one or more availability windows. Chunks flow
+through the windows in order (round-robin across tasks by priority, with breaks, as in
+schedule_tasks_cognitive); whatever does not fit in the horizon waits in the plan's backlog.
+Plans are stored as JSON in study_plans.
+
+Acting on a chunk only re-flows the windows it affects:
+  c  marks it done (nothing moves);
+  s  marks it skipped, and the following chunks move up into the freed time;
+  d  moves it to the end of its window;
+  e  lengthens it.
+Chunks that no longer fit move to the front of the next window and freed time pulls chunks back
+from later windows (or the backlog), so repair stops at the first window that needs no change.
+It never calls the LLM or the model.
+"""
+import json
+import uuid
+from collections import deque
+from datetime import datetime
+
+import metrics
+from database import SessionLocal
+from models import StudyPlan
+from scheduler import BREAK_DURATION, WORK_BEFORE_BREAK, break_entry, iter_chunks, prioritized, round_robin
+
+PLAN_ACTIONS = ("c", "s", "d", "e")
+
+
+def day_windows(available_time_minutes: int | None, windows: list[tuple[str, str]]) -> list[dict]:
+    """Windows for one day, from ("HH:MM", "HH:MM") pairs or else a single untimed block of minutes."""
+    if not windows:
+        if not available_time_minutes or available_time_minutes <= 0:
+            raise ValueError("each day needs windows or a positive available_time_minutes")
+        return [{"start": None, "minutes": available_time_minutes, "items": []}]
+    result = []
+    for start, end in sorted(windows):
+        minutes = int((datetime.strptime(end, "%H:%M") - datetime.strptime(start, "%H:%M")).total_seconds() // 60)
+        if minutes <= 0:
+            raise ValueError(f"window {start}-{end} ends before it starts")
+        result.append({"start": start, "minutes": minutes, "items": []})
+    return result
+
+
+def new_plan(user_id: int, parsed_tasks: list[dict], days: list[tuple[str, list[dict]]]) -> dict:
+    """days: (ISO date, day_windows(...)) pairs in order."""
+    now = datetime.utcnow().isoformat()
+    plan = {
+        "plan_id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "created_at": now,
+        "updated_at": now,
+        "days": [{"date": date, "windows": windows} for date, windows in days],
+        "backlog": [
+            plan_chunk(chunk) for chunk in round_robin(iter_chunks(task) for task in prioritized(parsed_tasks))
+        ],
+    }
+    repair(plan, 0)
+    return plan
+
+
+def plan_chunk(chunk) -> dict:
+    item = chunk.to_dict()
+    item["chunk_id"] = f"{item['task_id']}:{chunk.part}"
+    item["status"] = "pending"
+    return item
+
+
+def _windows(plan: dict) -> list[dict]:
+    return [window for day in plan["days"] for window in day["windows"]]
+
+
+def _minutes(item: dict) -> int:
+    return 0 if item.get("status") == "skipped" else item["duration"]
+
+
+def _split(window: dict):
+    """(items up to the first pending chunk, which stay put; the chunks after it, which may move)."""
+    items = window["items"]
+    frontier = next((i for i, item in enumerate(items) if item.get("status") == "pending"), len(items))
+    return items[:frontier], [item for item in items[frontier:] if "chunk_id" in item]
+
+
+def _placed(item: dict, window: dict, offset: float) -> dict:
+    # personalized durations are per-user means, so offsets are not always whole minutes
+    if window["start"] is not None:
+        hours, minutes = window["start"].split(":")
+        hours, minutes = divmod(int(hours) * 60 + int(minutes) + round(offset), 60)
+        item["start"] = f"{hours % 24:02d}:{minutes:02d}"
+    return item
+
+
+def repair(plan: dict, start: int) -> int:
+    """Re-flow chunks through the windows from index start on; returns how many windows changed."""
+    windows = _windows(plan)
+    fixed = {}
+    stream = deque()
+    next_unread = start
+
+    def read_next():
+        nonlocal next_unread
+        if next_unread < len(windows):
+            fixed[next_unread], movable = _split(windows[next_unread])
+            stream.extend(movable)
+            next_unread += 1
+        elif plan["backlog"]:
+            stream.extend(plan["backlog"])
+            plan["backlog"] = []
+        else:
+            return False
+        return True
+
+    def peek():
+        while not stream:
+            if not read_next():
+                return None
+        return stream[0]
+
+    changed = 0
+    for j in range(start, len(windows)):
+        while next_unread <= j:
+            read_next()
+        window = windows[j]
+        was_here = {id(item) for item in window["items"]}
+        before = [(item.get("chunk_id"), item.get("start"), item.get("status")) for item in window["items"]]
+        items = []
+        first = True
+        used = 0
+        work_since_last_break = 0
+        for item in fixed[j]:
+            items.append(_placed(item, window, used))
+            used += _minutes(item)
+            work_since_last_break = 0 if "chunk_id" not in item else work_since_last_break + _minutes(item)
+
+        while (chunk := peek()) is not None:
+            needs_break = work_since_last_break >= WORK_BEFORE_BREAK
+            fits = used + _minutes(chunk) + (BREAK_DURATION if needs_break else 0) <= window["minutes"]
+            # a chunk extended past the end of its window, or longer than an empty window, overruns it
+            # rather than blocking every chunk behind it
+            if not fits and not (first and (id(chunk) in was_here or not items)):
+                break
+            stream.popleft()
+            first = False
+            if needs_break:
+                items.append(_placed(break_entry(), window, used))
+                used += BREAK_DURATION
+                work_since_last_break = 0
+            items.append(_placed(chunk, window, used))
+            used += _minutes(chunk)
+            work_since_last_break += _minutes(chunk)
+
+        window["items"] = items
+        if [(item.get("chunk_id"), item.get("start"), item.get("status")) for item in items] != before:
+            changed += 1
+        if not stream and next_unread == j + 1:
+            break  # later windows were never touched
+    plan["backlog"] = list(stream) + plan["backlog"]
+    return changed
+
+
+@metrics.timed("plan_repair")
+def apply_action(plan: dict, chunk_id: str, action: str, extended_by: int | None = None):
+    """Apply a c/s/d/e action to a scheduled chunk. Returns (the chunk as it was scheduled, windows changed)."""
+    if action not in PLAN_ACTIONS:
+        raise ValueError(f"action must be one of {PLAN_ACTIONS}")
+    windows = _windows(plan)
+    for w, window in enumerate(windows):
+        for i, item in enumerate(window["items"]):
+            if item.get("chunk_id") == chunk_id:
+                break
+        else:
+            continue
+        break
+    else:
+        raise LookupError(f"chunk {chunk_id} is not scheduled in this plan")
+    if item["status"] != "pending":
+        raise ValueError(f"chunk {chunk_id} is already {item['status']}")
+    scheduled = dict(item)
+
+    if action == "c":
+        item["status"] = "done"
+        return scheduled, 0
+    if action == "s":
+        item["status"] = "skipped"
+    elif action == "d":
+        window["items"].append(window["items"].pop(i))
+    else:
+        if not extended_by or extended_by < 0:
+            raise ValueError("extend needs a positive extended_by")
+        item["duration"] += extended_by
+    plan["updated_at"] = datetime.utcnow().isoformat()
+    return scheduled, repair(plan, w)
+
+
+def save_new_plan(plan: dict):
+    db = SessionLocal()
+    try:
+        db.add(StudyPlan(id=plan["plan_id"], user_id=plan["user_id"], plan_json=json.dumps(plan)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def load_plan(plan_id: str, user_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        row = db.query(StudyPlan).filter_by(id=plan_id, user_id=user_id).first()
+    finally:
+        db.close()
+    if row is None:
+        raise LookupError(f"plan {plan_id} not found")
+    return json.loads(row.plan_json)
+
+
+def act_on_plan(plan_id: str, user_id: int, chunk_id: str, action: str, extended_by: int | None = None):
+    """Load, repair and store a plan in one transaction. Returns (plan, scheduled chunk, windows changed)."""
+    db = SessionLocal()
+    try:
+        row = db.query(StudyPlan).filter_by(id=plan_id, user_id=user_id).with_for_update().first()
+        if row is None:
+            raise LookupError(f"plan {plan_id} not found")
+        plan = json.loads(row.plan_json)
+        scheduled, changed = apply_action(plan, chunk_id, action, extended_by)
+        row.plan_json = json.dumps(plan)
+        row.updated_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+    return plan, scheduled, changed
@@ -1,75 +1,203 @@
+import math
 from collections import deque
+from itertools import islice
 
-def chunk_task(task, max_chunk_length=25):
+import metrics
+
+
+class Chunk:
+    """One scheduled slice of a parsed task. Holds a reference to the task instead of copies of its
+    fields; to_dict() builds the response entry only for chunks that make it into a schedule."""
+    __slots__ = ("task", "part", "duration")
+
+    def __init__(self, task, part, duration):
+        self.task = task
+        self.part = part
+        self.duration = duration
+
+    def to_dict(self):
+        task = self.task
+        return {
+            "task_id": task["task_id"],
+            "description": f"{task['description']} (Part {self.part})",
+            "subject": task['subject'],
+            "task_type": task['task_type'],
+            "duration": self.duration,
+            "priority_score": task.get("priority_score", 0),
+            "must_do": task.get("must_do", False)
+        }
+
+
+def iter_chunks(task, max_chunk_length=25):
+    """Lazily yield the task's Chunks in order."""
     priority = task.get("priority_score", 0)
 
     chunk_length = max(10, min(max_chunk_length, int(priority * max_chunk_length)))
-    
+
     if task.get("must_do", False):
         chunk_length = min(chunk_length, 15)
 
-    total_time = task['estimated_duration_minutes']
-    chunks = []
-    remaining_time = total_time
+    remaining_time = task['estimated_duration_minutes']
     part = 1
 
     while remaining_time > 0:
         chunk_duration = min(chunk_length, remaining_time)
-        chunks.append({
-            "task_id": task["task_id"],
-            "description": f"{task['description']} (Part {part})",
-            "subject": task['subject'],
-            "task_type": task['task_type'],
-            "duration": chunk_duration,
-            "priority_score": priority,
-            "must_do": task.get("must_do", False)
-        })
+        yield Chunk(task, part, chunk_duration)
         remaining_time -= chunk_duration
         part += 1
 
-    return chunks
 
+def chunk_task(task, max_chunk_length=25):
+    return [chunk.to_dict() for chunk in iter_chunks(task, max_chunk_length)]
+
+
+SCHEDULE_MODES = ("greedy", "optimal")
+BREAK_DURATION = 5
+WORK_BEFORE_BREAK = 25
+# "optimal" mode: value of a scheduled minute is max(0.1, 1 + priority_score), times this for must-do tasks
+MUST_DO_WEIGHT = 10.0
+
+
+@metrics.timed("schedule")
+def schedule_tasks_cognitive(parsed_tasks, available_time_minutes, mode="greedy"):
+    if mode not in SCHEDULE_MODES:
+        raise ValueError(f"unknown schedule mode {mode!r}; expected one of {SCHEDULE_MODES}")
 
-def schedule_tasks_cognitive(parsed_tasks, available_time_minutes):
-    parsed_tasks = sorted(
+    parsed_tasks = prioritized(parsed_tasks)
+    if mode == "optimal":
+        return pack_optimal(parsed_tasks, available_time_minutes)
+
+    schedule = []
+    time_used = 0
+    work_since_last_break = 0
+
+    # chunks past the point where the budget runs out are never built
+    for chunk in round_robin(iter_chunks(task) for task in parsed_tasks):
+        if time_used + chunk.duration > available_time_minutes:
+            return schedule
+
+        schedule.append(chunk.to_dict())
+        time_used += chunk.duration
+        work_since_last_break += chunk.duration
+
+        if work_since_last_break >= WORK_BEFORE_BREAK and time_used + BREAK_DURATION <= available_time_minutes:
+            schedule.append(break_entry())
+            time_used += BREAK_DURATION
+            work_since_last_break = 0
+
+    return schedule
+
+
+def prioritized(parsed_tasks):
+    return sorted(
         parsed_tasks,
         key=lambda t: (t.get("must_do", False), t.get("priority_score", 0)),
         reverse=True
     )
 
-    chunk_queues = []
-    for task in parsed_tasks:
-        chunks = chunk_task(task)
-        chunk_queues.append(deque(chunks))
 
+def round_robin(chunk_iters):
+    """Yield one chunk from each iterator in turn until all run out. An iterator goes back to the end
+    of the rotation after each chunk, so each step is O(1) however many tasks there are."""
+    chunk_queues = deque(chunk_iters)
+    while chunk_queues:
+        queue = chunk_queues.popleft()
+        chunk = next(queue, None)
+        if chunk is not None:
+            chunk_queues.append(queue)
+            yield chunk
+
+
+def break_entry():
+    return {
+        "description": "Take a short break",
+        "subject": None,
+        "task_type": "break",
+        "duration": BREAK_DURATION
+    }
+
+
+def interleave(chunk_iters):
+    """Round-robin the chunk iterators with a break after every WORK_BEFORE_BREAK minutes of work
+    that is followed by more work. Returns (schedule, minutes used)."""
     schedule = []
     time_used = 0
-    break_duration = 5
     work_since_last_break = 0
+    for chunk in round_robin(chunk_iters):
+        if work_since_last_break >= WORK_BEFORE_BREAK:
+            schedule.append(break_entry())
+            time_used += BREAK_DURATION
+            work_since_last_break = 0
+        schedule.append(chunk.to_dict())
+        time_used += chunk.duration
+        work_since_last_break += chunk.duration
+    return schedule, time_used
 
-    while chunk_queues and time_used < available_time_minutes:
-        for queue in list(chunk_queues):  
-            if not queue:
-                chunk_queues.remove(queue)
-                continue
 
-            chunk = queue.popleft()
+def pack_optimal(parsed_tasks, available_time_minutes):
+    """Choose how many leading chunks of each task to schedule so that the priority-weighted
+    minutes are maximal within the budget (a group knapsack over whole minutes, solved with one
+    NumPy DP pass per task), then interleave them with breaks. If the breaks push the plan over
+    budget, the work budget shrinks by the overshoot and the choice is re-read from the same DP."""
+    import numpy as np
 
-            if time_used + chunk['duration'] > available_time_minutes:
-                return schedule
+    capacity = int(available_time_minutes)
+    if capacity <= 0 or not parsed_tasks:
+        return []
 
-            schedule.append(chunk)
-            time_used += chunk['duration']
-            work_since_last_break += chunk['duration']
+    best = np.zeros(capacity + 1)  # best[c]: max value of chosen chunks using at most c minutes
+    choices, costs = [], []
+    for task in parsed_tasks:
+        weight = max(0.1, 1 + task.get("priority_score", 0)) * (MUST_DO_WEIGHT if task.get("must_do") else 1)
+        updated = best.copy()
+        choice = np.zeros(capacity + 1, dtype=np.int32)
+        task_costs = [0]
+        minutes = 0.0
+        for count, chunk in enumerate(iter_chunks(task), start=1):
+            minutes += chunk.duration
+            cost = math.ceil(minutes)
+            if cost > capacity:
+                break
+            task_costs.append(cost)
+            candidate = best[:capacity + 1 - cost] + minutes * weight
+            improves = candidate > updated[cost:]
+            updated[cost:][improves] = candidate[improves]
+            choice[cost:][improves] = count
+        best = updated
+        choices.append(choice)
+        costs.append(task_costs)
 
-            if work_since_last_break >= 25 and time_used + break_duration <= available_time_minutes:
-                schedule.append({
-                    "description": "Take a short break",
-                    "subject": None,
-                    "task_type": "break",
-                    "duration": break_duration
-                })
-                time_used += break_duration
-                work_since_last_break = 0
+    work_budget = capacity
+    while work_budget > 0:
+        counts = [0] * len(parsed_tasks)
+        remaining = work_budget
+        for i in range(len(parsed_tasks) - 1, -1, -1):
+            counts[i] = int(choices[i][remaining])
+            remaining -= costs[i][counts[i]]
 
-    return schedule
+        schedule, time_used = interleave(
+            islice(iter_chunks(task), count) for task, count in zip(parsed_tasks, counts) if count
+        )
+        if time_used <= available_time_minutes:
+            # a closing break only after a full work stretch, as in greedy mode
+            work_since_last_break = 0
+            for item in reversed(schedule):
+                if item["task_type"] == "break":
+                    break
+                work_since_last_break += item["duration"]
+            if work_since_last_break >= WORK_BEFORE_BREAK and time_used + BREAK_DURATION <= available_time_minutes:
+                schedule.append(break_entry())
+            return schedule
+        work_budget -= max(1, math.ceil(time_used - available_time_minutes))
+    return []
+
+
+def schedule_utilization(schedule, available_time_minutes):
+    """How much of the budget a schedule fills, split into work and break minutes."""
+    break_minutes = sum(item["duration"] for item in schedule if item["task_type"] == "break")
+    work_minutes = sum(item["duration"] for item in schedule) - break_minutes
+    return {
+        "work_minutes": work_minutes,
+        "break_minutes": break_minutes,
+        "utilization": (work_minutes + break_minutes) / available_time_minutes if available_time_minutes > 0 else 0.0,
+    }
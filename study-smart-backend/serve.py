@@ -0,0 +1,135 @@
+"""Multi-worker server that loads the models once and forks workers that share them.
+
+`uvicorn --workers N` starts every worker as a fresh interpreter, so each one imports pandas and
+scikit-learn and loads the model on its own. Here the parent imports the app (which applies the
+schema migrations), runs main.preload_ml(), freezes the garbage collector so the children's
+collections don't write to the inherited objects, binds the socket and forks. Pages nobody writes
+stay shared copy-on-write, and the model's arrays are memory-mapped from the registry (see
+model_registry.py), so versions promoted later are shared through the page cache too.
+
+Each worker still runs the app's lifespan: its own log writer, registry watcher, training service
+and executors, which can't be inherited across a fork. Dead workers are replaced; SIGTERM or
+SIGINT stops them all.
+
+With more than one worker, SHARED_CACHE_PATH defaults to a file on /dev/shm so the auth and parse
+caches are shared between them (see shared_cache.py).
+
+Run with: python serve.py [--workers 4] [--host 0.0.0.0] [--port 8000] [--no-preload]
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, log_level: str):
+    import uvicorn
+    from database import engine
+
+    engine.dispose(close=False)  # connections pooled in the parent stay with the parent
+    uvicorn.Server(uvicorn.Config("main:app", log_level=log_level, lifespan="on")).run(sockets=[sock])
+
+
+def spawn(sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        run_worker(sock, log_level)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def remove_shared_cache(path: str):
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-preload", action="store_true", help="import and load everything in each worker")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # before anything imports shared_cache, which reads it
+    own_cache = args.workers > 1 and not os.getenv("SHARED_CACHE_PATH")
+    if own_cache:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp"
+        os.environ["SHARED_CACHE_PATH"] = os.path.join(directory, f"study-smart-{args.port}.sqlite")
+        remove_shared_cache(os.environ["SHARED_CACHE_PATH"])  # left over from a previous run
+
+    sock = bind(args.host, args.port)
+    if not args.no_preload:
+        start = time.perf_counter()
+        import main as app_module
+
+        app_module.preload_ml()
+        gc.collect()
+        gc.freeze()
+        print(f"📦 Preloaded app and model in {time.perf_counter() - start:.1f}s")
+
+    workers = {spawn(sock, args.log_level) for _ in range(args.workers)}
+    print(f"🚀 {args.workers} workers on http://{args.host}:{args.port} (pids {', '.join(map(str, sorted(workers)))})")
+    sys.stdout.flush()
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; starting another")
+            time.sleep(1)  # don't spin if workers die at startup
+            if not stopping:
+                workers.add(spawn(sock, args.log_level))
+    if own_cache:
+        remove_shared_cache(os.environ["SHARED_CACHE_PATH"])
+    print("👋 All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
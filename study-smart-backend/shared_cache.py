@@ -0,0 +1,193 @@
+"""Cache shared by every worker process on one host, in a SQLite file on /dev/shm.
+
+With SHARED_CACHE_PATH set (serve.py sets it when it starts more than one worker), the auth token
+and user caches use it as the second tier of a TieredCache, so one worker's JWT decode and user
+query serve them all. The parse cache uses it as its second tier unless PARSE_CACHE_SHARED puts
+that tier in the database. Both look in their per-process TTLCache first and only go to this file,
+on a worker thread, on a miss.
+
+SharedCache has TTLCache's interface. Values are stored as JSON, expire after their TTL and are
+trimmed to maxsize per namespace every PRUNE_EVERY writes. A lookup is one indexed SELECT on a
+tmpfs file, tens of microseconds; errors (e.g. the file locked past the busy timeout) count as
+misses rather than failing the request.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from ttl_cache import TTLCache
+
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+SHARED_CACHE_BUSY_TIMEOUT_MS = int(os.getenv("SHARED_CACHE_BUSY_TIMEOUT_MS", "200"))
+# how long a worker keeps what it read from the shared tier, which bounds how long another worker's
+# invalidation takes to reach it
+SHARED_CACHE_MEMORY_TTL_SECONDS = float(os.getenv("SHARED_CACHE_MEMORY_TTL_SECONDS", "5"))
+PRUNE_EVERY = 256
+
+_MISSING = object()
+
+
+def default_path(name: str) -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp"
+    return os.path.join(directory, f"{name}.sqlite")
+
+
+def _create_private(path: str):
+    """Create the cache file readable by this user only, since it holds bearer tokens; SQLite gives
+    the -wal and -shm files the database file's mode."""
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+        os.chmod(path, 0o600)  # made by an earlier version, with the umask's mode
+    except OSError as e:
+        # e.g. another user's file at this path: counted as an error like any other
+        raise sqlite3.OperationalError(f"can't use {path} as a private cache: {e}") from e
+
+
+class _Connections(threading.local):
+    # one connection per thread, reopened in a forked child (SQLite connections must not cross a fork)
+    pid = None
+    conn = None
+
+
+class SharedCache:
+    def __init__(self, path: str, namespace: str, maxsize: int = 1024, ttl_seconds: float = 3600,
+                 decode=None):
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.decode = decode
+        self._local = _Connections()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if local.conn is None or local.pid != os.getpid():
+            _create_private(self.path)
+            conn = sqlite3.connect(self.path, timeout=SHARED_CACHE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")  # it's a cache on tmpfs; nothing to make durable
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def get(self, key, default=None):
+        try:
+            row = self._conn().execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, key, time.time()),
+            ).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            row = None
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        value = json.loads(row[0])
+        return self.decode(value) if self.decode is not None else value
+
+    def set(self, key, value, ttl_seconds: float | None = None):
+        expires_at = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), expires_at),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune(conn)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _prune(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM entries WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time()))
+        conn.execute(
+            "DELETE FROM entries WHERE namespace = ? AND key IN ("
+            "SELECT key FROM entries WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.maxsize),
+        )
+
+    def pop(self, key, default=None):
+        value = self.get(key, _MISSING)
+        try:
+            self._conn().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+        except sqlite3.Error:
+            self.errors += 1
+        return default if value is _MISSING else value
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+        except sqlite3.Error:
+            self.errors += 1
+
+    def __len__(self):
+        try:
+            return self._conn().execute(
+                "SELECT count(*) FROM entries WHERE namespace = ? AND expires_at > ?", (self.namespace, time.time())
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+
+class TieredCache:
+    """A per-process TTLCache in front of an optional SharedCache, for async callers: a memory hit
+    is a dict lookup, and the shared tier is only read on a miss, on a worker thread like its
+    writes. pop and clear stay synchronous for ORM event handlers and benchmarks."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float, shared: SharedCache | None = None,
+                 memory_ttl_seconds: float = SHARED_CACHE_MEMORY_TTL_SECONDS):
+        self.shared = shared
+        memory_ttl = ttl_seconds if shared is None else min(ttl_seconds, memory_ttl_seconds)
+        self.memory = TTLCache(maxsize=maxsize, ttl_seconds=memory_ttl)
+
+    @property
+    def hits(self) -> int:
+        return self.memory.hits + (self.shared.hits if self.shared is not None else 0)
+
+    @property
+    def misses(self) -> int:
+        # with a shared tier, every memory miss is looked up there
+        return self.shared.misses if self.shared is not None else self.memory.misses
+
+    async def aget(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING or self.shared is None:
+            return default if value is _MISSING else value
+        value = await asyncio.to_thread(self.shared.get, key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.memory.set(key, value)
+        return value
+
+    async def aset(self, key, value, ttl_seconds: float | None = None):
+        self.memory.set(key, value, None if ttl_seconds is None else min(ttl_seconds, self.memory.ttl_seconds))
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, key, value, ttl_seconds)
+
+    def pop(self, key, default=None):
+        value = self.memory.pop(key, _MISSING)
+        if self.shared is not None:
+            shared_value = self.shared.pop(key, _MISSING)
+            value = shared_value if value is _MISSING else value
+        return default if value is _MISSING else value
+
+    def clear(self):
+        self.memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def __len__(self):
+        return len(self.shared) if self.shared is not None else len(self.memory)
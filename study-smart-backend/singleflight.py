@@ -0,0 +1,33 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key onto one in-flight computation.
+
+    Only calls that overlap in time are merged; nothing is kept once the computation finishes.
+    Every waiter receives the same result object, so callers must copy before mutating it.
+    """
+
+    def __init__(self):
+        self._inflight: dict = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args):
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        else:
+            self.coalesced += 1
+        # shield so one caller disconnecting does not cancel the work for everyone else
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
@@ -0,0 +1,117 @@
+"""Deterministic stand-in for the OpenAI chat completions API, used by the load tests and benchmarks.
+
+With "stream": true the reply is sent as server-sent chat.completion.chunk events of STUB_LLM_STREAM_CHARS
+characters each, spread evenly over the delay, so the first token arrives well before the last.
+
+Run with: python stub_llm.py --port 8001 --delay 2.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+STUB_LLM_DELAY_SECONDS = float(os.getenv("STUB_LLM_DELAY_SECONDS", "1.0"))
+STUB_LLM_STREAM_CHARS = int(os.getenv("STUB_LLM_STREAM_CHARS", "16"))
+
+TYPE_KEYWORDS = {
+    "homework": "homework",
+    "assignment": "assignment",
+    "read": "reading",
+    "chapter": "reading",
+    "video": "video_watching",
+    "lecture": "video_watching",
+    "essay": "writing",
+    "write": "writing",
+    "problem": "problem_solving",
+    "leetcode": "problem_solving",
+    "code": "coding",
+    "project": "project",
+}
+
+app = FastAPI()
+app.state.delay = STUB_LLM_DELAY_SECONDS
+app.state.calls = 0
+
+
+def fake_parse(raw_text: str) -> list[dict]:
+    text = raw_text.split("Tasks:", 1)[-1]
+    tasks = []
+    for part in re.split(r",|;|\n| and ", text):
+        part = part.strip()
+        if not part:
+            continue
+        task_type = next((t for k, t in TYPE_KEYWORDS.items() if k in part.lower()), "homework")
+        tasks.append({
+            "description": part,
+            "subject": "general",
+            "task_type": task_type,
+            "estimated_duration_minutes": 30,
+        })
+    return tasks
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    app.state.calls += 1
+    content = json.dumps(fake_parse(body["messages"][-1]["content"]))
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(body, content), media_type="text/event-stream")
+
+    await asyncio.sleep(app.state.delay)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+async def stream_chunks(body: dict, content: str):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    pieces = [content[i:i + STUB_LLM_STREAM_CHARS] for i in range(0, len(content), STUB_LLM_STREAM_CHARS)]
+    for i, piece in enumerate(pieces + [None]):
+        if piece is not None:
+            await asyncio.sleep(app.state.delay / len(pieces))
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "delta": {"role": "assistant", "content": piece} if piece is not None else {},
+                "finish_reason": None if piece is not None else "stop",
+            }],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/stats")
+async def stats():
+    return {"calls": app.state.calls}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=STUB_LLM_DELAY_SECONDS)
+    args = parser.parse_args()
+
+    app.state.delay = args.delay
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
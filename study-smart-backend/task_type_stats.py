@@ -0,0 +1,219 @@
+"""Per-task-type duration and outcome statistics: per user in user_task_type_stats (maintained by
+feature_store) and across all users in task_type_stats.
+
+Both keep a log count, a duration sum, a count per action (completed, skipped, deferred, extended)
+and a histogram of actual durations over DURATION_BUCKETS, so the mean, quantiles and outcome
+rates come from one row per type instead of a scan over task_logs. The global rows are updated
+incrementally with every batch of logs written and rebuilt from task_logs every
+TASK_TYPE_STATS_REBUILD_SECONDS to correct any drift (logs inserted or deleted outside the log
+writer, or lost to a race with a rebuild).
+
+task_type_priors caches the global rows in memory and reloads them in the background once older
+than TASK_TYPE_STATS_TTL_SECONDS. Their mean durations are the estimates for task types a user has
+no history for yet (all of them, for a new user) and the local parser's per-item priors.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import TaskLog, TaskTypeStats, UserTaskTypeStats
+from task_types import normalize_task_type
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TASK_TYPE_STATS_TTL_SECONDS = float(os.getenv("TASK_TYPE_STATS_TTL_SECONDS", "600"))
+TASK_TYPE_STATS_REBUILD_SECONDS = float(os.getenv("TASK_TYPE_STATS_REBUILD_SECONDS", str(24 * 3600)))
+# Fewer logs than this across all users and a type's mean is too noisy to replace an estimate
+TASK_TYPE_PRIOR_MIN_LOGS = int(os.getenv("TASK_TYPE_PRIOR_MIN_LOGS", "20"))
+
+# Upper bounds (minutes) of the duration histogram buckets; one more bucket holds anything longer
+DURATION_BUCKETS = (5, 10, 15, 20, 25, 30, 45, 60, 90, 120, 180, 240)
+OUTCOME_COLUMNS = {"c": "completed_count", "s": "skipped_count", "d": "deferred_count", "e": "extended_count"}
+SUM_COLUMNS = ["log_count", "duration_sum", *OUTCOME_COLUMNS.values()]
+
+
+def outcome_contributions(df: "pd.DataFrame", keys: list[str]) -> "pd.DataFrame":
+    """Log count, duration sum, outcome counts and duration histogram (a list) per keys group.
+    df has the keys, action and actual_duration, and optionally n, the number of logs each row stands for."""
+    import numpy as np
+    import pandas as pd
+
+    n = df["n"] if "n" in df else pd.Series(1, index=df.index)
+    durations = df["actual_duration"].fillna(0)
+    frame = df[keys].assign(log_count=n, duration_sum=durations * n)
+    for action, column in OUTCOME_COLUMNS.items():
+        frame[column] = n.where(df["action"] == action, 0)
+    frame["bucket"] = np.searchsorted(DURATION_BUCKETS, durations.to_numpy(), side="left")
+
+    sums = frame.groupby(keys)[SUM_COLUMNS].sum()
+    histograms = (
+        frame.groupby([*keys, "bucket"])["log_count"].sum()
+        .unstack(fill_value=0)
+        .reindex(index=sums.index, columns=range(len(DURATION_BUCKETS) + 1), fill_value=0)
+    )
+    sums["duration_histogram"] = [[int(c) for c in row] for row in histograms.to_numpy()]
+    return sums
+
+
+def add_outcomes(row, delta):
+    """Add one outcome_contributions row to a stats row (per-user or global), in place."""
+    for column in OUTCOME_COLUMNS.values():
+        setattr(row, column, (getattr(row, column) or 0) + int(delta[column]))
+    histogram = json.loads(row.duration_histogram or "[]") or [0] * (len(DURATION_BUCKETS) + 1)
+    row.duration_histogram = json.dumps([a + b for a, b in zip(histogram, delta["duration_histogram"])])
+
+
+def as_rows(contributions: "pd.DataFrame") -> list[dict]:
+    """outcome_contributions output as dicts for bulk inserts."""
+    return contributions.reset_index().assign(
+        duration_histogram=contributions["duration_histogram"].map(json.dumps).to_numpy()
+    ).to_dict("records")
+
+
+def duration_quantile(histogram: list[int], q: float) -> float | None:
+    """Interpolated within the bucket that holds the q-th log; the open last bucket reports its lower bound."""
+    total = sum(histogram)
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= target:
+            lower = DURATION_BUCKETS[i - 1] if i else 0
+            if i == len(DURATION_BUCKETS):
+                return float(lower)
+            return lower + (DURATION_BUCKETS[i] - lower) * (target - seen) / count
+        seen += count
+    return float(DURATION_BUCKETS[-1])
+
+
+def summarize(row) -> dict:
+    log_count = row.log_count or 0
+    histogram = json.loads(row.duration_histogram or "[]")
+    summary = {
+        "log_count": log_count,
+        "duration_mean": row.duration_sum / log_count if log_count else None,
+        "duration_p50": duration_quantile(histogram, 0.5),
+        "duration_p90": duration_quantile(histogram, 0.9),
+    }
+    for action, column in OUTCOME_COLUMNS.items():
+        rate = column.replace("_count", "_rate")
+        summary[rate] = (getattr(row, column) or 0) / log_count if log_count else None
+    return summary
+
+
+def record_global_logs(db, df: "pd.DataFrame", now: datetime):
+    """Fold a frame of new logs (task_type normalized) into task_type_stats, in the caller's transaction."""
+    contributions = outcome_contributions(df, ["task_type"])
+    existing = {
+        row.task_type: row
+        for row in db.query(TaskTypeStats).filter(TaskTypeStats.task_type.in_(contributions.index.tolist())).with_for_update()
+    }
+    for task_type, delta in contributions.iterrows():
+        row = existing.get(task_type)
+        if row is None:
+            row = TaskTypeStats(task_type=task_type, log_count=0, duration_sum=0.0, rebuilt_at=now)
+            db.add(row)
+        row.log_count += int(delta["log_count"])
+        row.duration_sum += float(delta["duration_sum"])
+        add_outcomes(row, delta)
+        row.updated_at = now
+
+
+def rebuild_global_stats(db):
+    """Recompute task_type_stats from task_logs with one grouped query, and commit."""
+    import pandas as pd
+
+    # Clear first so on SQLite the write lock is held before task_logs is read
+    db.query(TaskTypeStats).delete()
+    grouped = db.query(
+        TaskLog.task_type, TaskLog.action, func.coalesce(TaskLog.actual_duration, 0), func.count()
+    ).group_by(TaskLog.task_type, TaskLog.action, func.coalesce(TaskLog.actual_duration, 0)).all()
+    now = datetime.utcnow()
+    if grouped:
+        df = pd.DataFrame(grouped, columns=["task_type", "action", "actual_duration", "n"])
+        df["task_type"] = df["task_type"].fillna("unknown").map(normalize_task_type)
+        rows = as_rows(outcome_contributions(df, ["task_type"]))
+        db.bulk_insert_mappings(TaskTypeStats, [dict(row, rebuilt_at=now, updated_at=now) for row in rows])
+    try:
+        db.commit()
+    except IntegrityError:
+        # another worker rebuilt at the same time; its rows are equivalent
+        db.rollback()
+
+
+def user_summaries(user_id: int) -> dict:
+    """{task_type: summary} from the user's feature store rows."""
+    db = SessionLocal()
+    try:
+        rows = db.query(UserTaskTypeStats).filter(UserTaskTypeStats.user_id == user_id).all()
+    finally:
+        db.close()
+    return {row.task_type: summarize(row) for row in rows}
+
+
+class TaskTypePriors:
+    """In-memory copy of task_type_stats, reloaded in the background once older than ttl_seconds.
+    A reload that finds the rows missing or older than rebuild_seconds rebuilds them first."""
+
+    def __init__(self, ttl_seconds: float, rebuild_seconds: float, min_logs: int):
+        self.ttl_seconds = ttl_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.min_logs = min_logs
+        self.stats = {}
+        self.durations = {}  # mean minutes per task type with at least min_logs logs
+        self.loaded_at = None
+        self._refreshing = threading.Lock()
+
+    def stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl_seconds
+
+    def _load(self, db):
+        return db.query(TaskTypeStats).all()
+
+    def refresh(self):
+        if not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            db = SessionLocal()
+            try:
+                rows = self._load(db)
+                oldest = min((row.rebuilt_at for row in rows), default=None)
+                if oldest is None or (datetime.utcnow() - oldest).total_seconds() > self.rebuild_seconds:
+                    if rows or db.query(TaskLog.id).first() is not None:
+                        rebuild_global_stats(db)
+                        rows = self._load(db)
+            finally:
+                db.close()
+            self.stats = {row.task_type: summarize(row) for row in rows}
+            self.durations = {
+                row.task_type: max(5, round(row.duration_sum / row.log_count))
+                for row in rows if row.log_count >= self.min_logs and row.duration_sum
+            }
+            self.loaded_at = time.monotonic()
+        finally:
+            self._refreshing.release()
+
+    def refresh_in_background(self, executor):
+        if self.stale() and not self._refreshing.locked():
+            executor.submit(self.refresh)
+
+    def apply(self, tasks: list[dict]) -> list[dict]:
+        """Replace estimated durations with the all-user mean for types that have one, in place."""
+        durations = self.durations
+        for task in tasks:
+            duration = durations.get(task["task_type"])
+            if duration is not None:
+                task["estimated_duration_minutes"] = duration
+        return tasks
+
+
+task_type_priors = TaskTypePriors(TASK_TYPE_STATS_TTL_SECONDS, TASK_TYPE_STATS_REBUILD_SECONDS, TASK_TYPE_PRIOR_MIN_LOGS)
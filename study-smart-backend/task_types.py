@@ -0,0 +1,29 @@
+"""Task type vocabulary, kept free of heavy imports so request parsing does not need the ML stack."""
+
+TASK_TYPE_MAP = {
+    "essay": "writing",
+    "essay_writing": "writing",
+    "project_work": "project",
+    "video": "video_watching",
+    "video watching": "video_watching",
+    "coding": "problem_solving",
+    "problem solving": "problem_solving",
+    "hw": "homework",
+    "leetcode": "problem_solving"
+}
+
+def normalize_task_type(task_type: str) -> str:
+    key = task_type.strip().lower().replace(" ", "_")
+    return TASK_TYPE_MAP.get(key, key)
+
+# Fixed one-hot vocabulary for exported training data: the parse prompt's categories after
+# normalize_task_type. Types outside it encode as all zeros, as they do at serving time.
+TASK_TYPES = ["assignment", "break", "homework", "problem_solving", "project", "reading", "video_watching", "writing"]
+
+# Model output column -> TaskLog.action
+ACTION_TARGETS = {
+    "action_completed": "c",
+    "action_deferred": "d",
+    "action_skipped": "s",
+    "action_extended": "e",
+}
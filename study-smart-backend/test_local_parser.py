@@ -0,0 +1,37 @@
+from local_parser import DEFAULT_DURATIONS, LOCAL_PARSE_MIN_CONFIDENCE, LocalParser, parse_locally
+
+
+class FixedPriors:
+    durations = DEFAULT_DURATIONS
+
+
+def parse(text: str):
+    return LocalParser(LOCAL_PARSE_MIN_CONFIDENCE, FixedPriors()).parse(text)
+
+
+def test_count_binds_to_the_noun_with_minutes_per_item():
+    tasks = parse("solve 10 leetcode problems")
+    assert [t["estimated_duration_minutes"] for t in tasks] == [50]
+
+
+def test_count_binds_to_the_last_noun_of_a_compound():
+    tasks = parse("read 2 textbook chapters")
+    assert [t["estimated_duration_minutes"] for t in tasks] == [2 * DEFAULT_DURATIONS["reading"]]
+
+
+def test_page_count_before_a_noun_sizes_it():
+    for text in ("write a 2 page essay", "write a 2-page essay"):
+        tasks = parse(text)
+        assert [(t["task_type"], t["estimated_duration_minutes"]) for t in tasks] == [("writing", DEFAULT_DURATIONS["writing"])]
+
+
+def test_item_counts_over_the_cap_go_to_the_llm():
+    assert parse("read 300 pages") is None
+    assert parse_locally("read 300 pages", DEFAULT_DURATIONS) == (None, 0.0)
+    assert [t["estimated_duration_minutes"] for t in parse("read 30 pages")] == [60]
+
+
+def test_confidence_at_the_threshold_goes_to_the_llm():
+    tasks, confidence = parse_locally("finish the chemistry lab report", DEFAULT_DURATIONS)
+    assert tasks is not None and confidence == LOCAL_PARSE_MIN_CONFIDENCE
+    assert parse("finish the chemistry lab report") is None
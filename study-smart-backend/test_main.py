@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+import auth
+from main import app
+
+
+def login(username: str) -> tuple[int, dict]:
+    if auth.load_credentials(username) is None:
+        auth.insert_user(username, auth.get_password_hash(username))
+    user_id, _ = auth.load_credentials(username)
+    return user_id, {"Authorization": f"Bearer {auth.create_access_token({'sub': username})}"}
+
+
+def test_log_tasks_rejects_actions_for_other_users():
+    user_id, headers = login("alice")
+    other_id, _ = login("bob")
+    action = {"task": {"description": "read chapter 3", "task_type": "reading", "duration": 30}, "action": "c"}
+    client = TestClient(app)
+    response = client.post("/log-tasks", headers=headers, json=[dict(action, user_id=user_id), dict(action, user_id=other_id)])
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Actions [1] are for other users"
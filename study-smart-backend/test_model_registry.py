@@ -0,0 +1,25 @@
+import os
+
+from model_registry import ModelRegistry
+
+
+def publish(registry: ModelRegistry, n: int, promote: bool = True) -> list[str]:
+    return [registry.publish({"weights": [i]}, ["feature"], metadata={"run": i}, promote=promote) for i in range(n)]
+
+
+def test_promotion_keeps_only_the_newest_versions(tmp_path):
+    registry = ModelRegistry(str(tmp_path), keep_versions=3)
+    versions = publish(registry, 6)
+    assert registry.versions() == versions[-3:]
+    assert registry.current_version() == versions[-1]
+    assert sorted(os.listdir(tmp_path / "versions")) == versions[-3:]
+
+
+def test_promoted_version_survives_pruning(tmp_path):
+    registry = ModelRegistry(str(tmp_path), keep_versions=2)
+    oldest = publish(registry, 1)[0]
+    newer = publish(registry, 3, promote=False)
+    registry.promote(oldest)
+    assert registry.versions() == [oldest] + newer[-2:]
+    assert registry.active().version == oldest
+    assert registry.active().model == {"weights": [0]}
@@ -0,0 +1,43 @@
+import asyncio
+import os
+import stat
+
+from shared_cache import SharedCache, TieredCache
+
+
+def mode(path: str) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_cache_files_are_private(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    old_umask = os.umask(0o022)
+    try:
+        cache = SharedCache(path, "auth_token")
+        cache.set("token", "alice")
+        assert cache.get("token") == "alice"
+    finally:
+        os.umask(old_umask)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            assert mode(path + suffix) == 0o600, suffix
+
+
+def test_existing_cache_file_is_made_private(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    path.touch(mode=0o644)
+    SharedCache(str(path), "auth_user").set("alice", [1, "alice"])
+    assert mode(str(path)) == 0o600
+
+
+def test_tiered_cache_reads_the_shared_tier_on_a_miss(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = TieredCache(10, 60, SharedCache(path, "t"))
+    second = TieredCache(10, 60, SharedCache(path, "t"))
+
+    async def run():
+        await first.aset("key", "value")
+        return await second.aget("key"), await second.aget("missing")
+
+    assert asyncio.run(run()) == ("value", None)
+    assert second.memory.get("key") == "value"
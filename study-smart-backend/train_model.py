@@ -1,19 +1,194 @@
+"""Train the action model and publish it to the model registry.
+
+Default mode fits MultiOutputClassifier(LogisticRegression) on task_logs_processed.csv in memory
+(export it with `python export_logs.py --format csv`, which records the newest log id it includes in
+task_logs_processed.csv.json; that becomes the published model's last_log_id).
+
+--streaming trains out of core on the parts written by `python export_logs.py`: each of the four
+action targets gets its own process, which streams shuffled mini-batches of the memory-mapped
+feature matrix through SGDClassifier(log_loss).partial_fit. Memory is bounded by --batch-rows, not
+the table size. The result is the same kind of linear MultiOutputClassifier the incremental trainer
+produces, so compute_task_priority_scores (and its compiled scorer) consume it unchanged.
+
+Run with: python train_model.py [--streaming [--epochs 3] [--batch-rows 50000] [--workers 4]]
+"""
+import argparse
+import json
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
 import pandas as pd
-from sklearn.multioutput import MultiOutputClassifier
 from sklearn.linear_model import LogisticRegression
-import joblib
+from sklearn.multioutput import MultiOutputClassifier
+
+from export_logs import EXPORT_DIR, part_paths
+from model_registry import registry
+from task_types import ACTION_TARGETS
+from training import assemble_multioutput, new_sgd_classifier
+
+TARGET_COLUMNS = list(ACTION_TARGETS)
+
+
+def exported_last_id(csv_path: str) -> int:
+    """Newest log id in the CSV, from the .json export_logs.py writes next to it (0 if there is none)."""
+    try:
+        with open(csv_path + ".json") as f:
+            return json.load(f)["last_id"]
+    except FileNotFoundError:
+        # incremental training then revisits every log, rather than skipping ones the CSV lacks
+        print(f"⚠️ No {csv_path}.json; publishing with last_log_id 0")
+        return 0
+
+
+def train_in_memory(csv_path: str = "task_logs_processed.csv"):
+    last_log_id = exported_last_id(csv_path)  # before reading, so a re-export in between can't move it past the rows
+    df = pd.read_csv(csv_path)
+
+    X = df.drop(columns=TARGET_COLUMNS)
+    y = df[TARGET_COLUMNS]
+
+    model = MultiOutputClassifier(LogisticRegression(max_iter=1000))
+
+    model.fit(X, y)
+
+    joblib.dump(model, "multioutput_model.pkl")
+    print("Model trained and saved successfully.")
+
+    feature_names = list(X.columns)
+    joblib.dump(feature_names, 'model_feature_names.pkl')
+
+    version = registry.publish(model, feature_names, metadata={
+        "algorithm": "LogisticRegression(max_iter=1000)",
+        "source": csv_path,
+        "rows": len(df),
+        "last_log_id": last_log_id,
+    })
+    print(f"Published and promoted model version {version}")
+
+
+def load_parts(export_dir: str) -> list[dict]:
+    parts = []
+    for path in part_paths(export_dir):
+        with open(path) as f:
+            part = json.load(f)
+        part["files"] = {kind: os.path.join(export_dir, name) for kind, name in part["files"].items()}
+        parts.append(part)
+    if not parts:
+        raise SystemExit(f"no exported parts in {export_dir}; run `python export_logs.py` first")
+    if any(p["feature_columns"] != parts[0]["feature_columns"] for p in parts):
+        raise SystemExit("exported parts use different feature columns; run a full export")
+    return parts
+
+
+def _batch_refs(parts: list[dict], batch_rows: int):
+    """(part index, slice start or parquet row group) for every mini-batch in the export."""
+    refs = []
+    for i, part in enumerate(parts):
+        if "parquet" in part["files"]:
+            import pyarrow.parquet as pq
+            refs.extend((i, g) for g in range(pq.ParquetFile(part["files"]["parquet"]).num_row_groups))
+        else:
+            refs.extend((i, start) for start in range(0, part["rows"], batch_rows))
+    return refs
+
+
+def _read_batch(parts, ref, target: str, batch_rows: int, cache: dict):
+    i, key = ref
+    part = parts[i]
+    if "parquet" in part["files"]:
+        import pyarrow.parquet as pq
+        table = pq.ParquetFile(part["files"]["parquet"]).read_row_group(key)
+        X = np.column_stack([table.column(c).to_numpy() for c in part["feature_columns"]])
+        return X, table.column(target).to_numpy()
+    if i not in cache:
+        cache[i] = (
+            np.load(part["files"]["features"], mmap_mode="r"),
+            np.load(part["files"]["targets"], mmap_mode="r"),
+        )
+    features, targets = cache[i]
+    column = part["target_columns"].index(target)
+    stop = min(key + batch_rows, part["rows"])
+    return np.asarray(features[key:stop]), np.asarray(targets[key:stop, column])
+
+
+def fit_target(target: str, parts: list[dict], batch_rows: int, epochs: int, seed: int):
+    """Worker: stream every part through one SGD classifier. Returns (estimator, rows seen, seconds, peak RSS KiB)."""
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    refs = _batch_refs(parts, batch_rows)
+    estimator = new_sgd_classifier()
+    cache = {}
+    rows_seen = 0
+    for _ in range(epochs):
+        # id order is time order; shuffling batches keeps SGD from drifting toward the newest logs
+        for index in rng.permutation(len(refs)):
+            X, y = _read_batch(parts, refs[index], target, batch_rows, cache)
+            estimator.partial_fit(X, y, classes=np.array([0, 1]))
+            rows_seen += len(y)
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return estimator, rows_seen, time.perf_counter() - start, peak_kib
+
+
+def train_streaming(export_dir: str = EXPORT_DIR, batch_rows: int = 50_000, epochs: int = 3,
+                    workers: int = len(TARGET_COLUMNS), seed: int = 0, publish: bool = True):
+    parts = load_parts(export_dir)
+    features = parts[0]["feature_columns"]
+    rows = sum(p["rows"] for p in parts)
+    print(f"Streaming {rows} rows from {len(parts)} part(s), {epochs} epoch(s), batches of {batch_rows}")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(TARGET_COLUMNS)))) as pool:
+        futures = [
+            pool.submit(fit_target, target, parts, batch_rows, epochs, seed + i)
+            for i, target in enumerate(TARGET_COLUMNS)
+        ]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
 
-df = pd.read_csv('task_logs_processed.csv')
+    estimators = []
+    for target, (estimator, rows_seen, seconds, peak_kib) in zip(TARGET_COLUMNS, results):
+        estimator.feature_names_in_ = np.array(features, dtype=object)
+        estimators.append(estimator)
+        print(f"  {target:<17} {rows_seen / seconds:>12,.0f} rows/s  peak RSS {peak_kib / 1024:.0f} MiB")
+    model = assemble_multioutput(estimators, features)
 
-X = df.drop(columns=['action_completed', 'action_deferred', 'action_skipped', 'action_extended'])
-y = df[['action_completed', 'action_deferred', 'action_skipped', 'action_extended']]
+    parent_peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        f"Trained in {elapsed:.1f}s: {rows * epochs / elapsed:,.0f} rows/s per target across "
+        f"{len(TARGET_COLUMNS)} targets; parent peak RSS {parent_peak_kib / 1024:.0f} MiB"
+    )
 
-model = MultiOutputClassifier(LogisticRegression(max_iter=1000))
+    if publish:
+        version = registry.publish(model, features, metadata={
+            "algorithm": "SGDClassifier(log_loss).partial_fit, streamed",
+            "source": export_dir,
+            "rows": rows,
+            "epochs": epochs,
+            "batch_rows": batch_rows,
+            "rows_per_second": rows * epochs / elapsed,
+            "last_log_id": max(p["last_id"] for p in parts),
+        })
+        print(f"Published and promoted model version {version}")
+    return model
 
-model.fit(X, y)
 
-joblib.dump(model, "multioutput_model.pkl")
-print("Model trained and saved successfully.")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streaming", action="store_true", help="train out of core on export_logs.py parts")
+    parser.add_argument("--csv", default="task_logs_processed.csv")
+    parser.add_argument("--export-dir", default=EXPORT_DIR)
+    parser.add_argument("--batch-rows", type=int, default=50_000)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=len(TARGET_COLUMNS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-publish", action="store_true")
+    args = parser.parse_args()
 
-feature_names = list(X.columns)
-joblib.dump(feature_names, 'model_feature_names.pkl')
+    if args.streaming:
+        train_streaming(args.export_dir, args.batch_rows, args.epochs, args.workers, args.seed, not args.no_publish)
+    else:
+        train_in_memory(args.csv)
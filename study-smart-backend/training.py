@@ -0,0 +1,206 @@
+"""In-process incremental training.
+
+Logged actions notify a TrainingService, which debounces them and then runs train_increment:
+only TaskLog rows newer than the promoted version's last_log_id watermark are read, in id order,
+and fed to a MultiOutputClassifier of SGD logistic regressions via partial_fit. The result is
+published and promoted in the model registry, which every worker hot-reloads.
+"""
+import copy
+import fcntl
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.multioutput import MultiOutputClassifier
+
+import personalization
+from database import SessionLocal
+from model_registry import registry
+from models import TaskLog
+from task_types import ACTION_TARGETS
+
+TRAINING_ENABLED = os.getenv("TRAINING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRAINING_DEBOUNCE_SECONDS = float(os.getenv("TRAINING_DEBOUNCE_SECONDS", "30"))
+TRAINING_MAX_DELAY_SECONDS = float(os.getenv("TRAINING_MAX_DELAY_SECONDS", "300"))
+TRAINING_BATCH_SIZE = int(os.getenv("TRAINING_BATCH_SIZE", "200"))
+TRAINING_CHUNK_ROWS = int(os.getenv("TRAINING_CHUNK_ROWS", "5000"))
+TRAINING_LEARNING_RATE = float(os.getenv("TRAINING_LEARNING_RATE", "0.001"))
+# Feature-store scores are re-derived after this many incremental updates (see current_model_version)
+TRAINING_RESCORE_EVERY_UPDATES = int(os.getenv("TRAINING_RESCORE_EVERY_UPDATES", "50"))
+
+
+def new_sgd_classifier():
+    return SGDClassifier(loss="log_loss", learning_rate="constant", eta0=TRAINING_LEARNING_RATE)
+
+
+def assemble_multioutput(estimators, features: list[str]) -> MultiOutputClassifier:
+    """A fitted MultiOutputClassifier from per-target binary classifiers, one per ACTION_TARGETS column."""
+    model = MultiOutputClassifier(new_sgd_classifier())
+    model.estimators_ = estimators
+    model.n_features_in_ = len(features)
+    model.feature_names_in_ = np.array(features, dtype=object)
+    return model
+
+
+def incremental_learner(model, features: list[str]):
+    """A partial_fit-capable copy of model; LogisticRegression estimators are converted to
+    SGD logistic regressions warm-started from their coefficients. Never mutates model, which
+    other threads may be scoring with."""
+    if all(hasattr(e, "partial_fit") for e in model.estimators_):
+        return copy.deepcopy(model)
+
+    n_features = len(features)
+    zero_row = pd.DataFrame(np.zeros((1, n_features)), columns=features)
+    estimators = []
+    for fitted in model.estimators_:
+        sgd = new_sgd_classifier()
+        sgd.partial_fit(zero_row, [0], classes=np.array([0, 1]))  # allocates coef_/intercept_
+        sgd.coef_ = np.array(fitted.coef_, dtype=float, copy=True)
+        sgd.intercept_ = np.array(fitted.intercept_, dtype=float, copy=True)
+        estimators.append(sgd)
+
+    return assemble_multioutput(estimators, features)
+
+
+def training_frame(logs) -> tuple[pd.DataFrame, np.ndarray]:
+    df = pd.DataFrame([{
+        "task_type": log.task_type or "unknown",
+        "scheduled_duration": log.scheduled_duration,
+        "actual_duration": log.actual_duration,
+        "action": log.action,
+    } for log in logs])
+    X = personalization.log_feature_matrix(df).astype(float)
+    Y = np.column_stack([(df["action"] == action).to_numpy(dtype=int) for action in ACTION_TARGETS.values()])
+    return X, Y
+
+
+def train_increment() -> int:
+    """Fit the promoted model on logs added since it was trained and promote the result.
+    Returns the number of rows trained on, or 0 if there was nothing new or another worker
+    holds the training lock."""
+    os.makedirs(registry.root, exist_ok=True)
+    with open(os.path.join(registry.root, ".train.lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+
+        base = registry.refresh()
+        last_log_id = base.manifest["training"].get("last_log_id", 0)
+        learner = None
+        trained = 0
+        db = SessionLocal()
+        try:
+            while True:
+                logs = (
+                    db.query(TaskLog)
+                    .filter(TaskLog.id > last_log_id)
+                    .order_by(TaskLog.id)
+                    .limit(TRAINING_CHUNK_ROWS)
+                    .all()
+                )
+                if not logs:
+                    break
+                if learner is None:
+                    learner = incremental_learner(base.model, base.features)
+                X, Y = training_frame(logs)
+                learner.partial_fit(X, Y)
+                trained += len(logs)
+                last_log_id = logs[-1].id
+        finally:
+            db.close()
+
+        if not trained:
+            return 0
+
+        updates = base.manifest["training"].get("updates_since_rescore", 0) + 1
+        scoring_generation = base.scoring_generation
+        if updates >= TRAINING_RESCORE_EVERY_UPDATES:
+            scoring_generation = uuid.uuid4().hex
+            updates = 0
+
+        registry.publish(
+            learner,
+            base.features,
+            metadata={
+                "algorithm": "SGDClassifier(log_loss).partial_fit",
+                "parent_version": base.version,
+                "rows": trained,
+                "last_log_id": last_log_id,
+                "updates_since_rescore": updates,
+                "trained_at": time.time(),
+            },
+            scoring_generation=scoring_generation,
+        )
+        return trained
+
+
+class TrainingService:
+    """Background thread that batches logged actions into train_increment runs. A run starts once
+    TRAINING_BATCH_SIZE actions are pending, TRAINING_DEBOUNCE_SECONDS pass without a new one,
+    or the oldest pending action has waited TRAINING_MAX_DELAY_SECONDS."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._first_pending_at = None
+        self._last_notified_at = None
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="training-service", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self, count: int = 1):
+        with self._cond:
+            now = time.monotonic()
+            self._pending += count
+            self._last_notified_at = now
+            if self._first_pending_at is None:
+                self._first_pending_at = now
+            self._cond.notify()
+
+    def _wait_until_due(self) -> bool:
+        with self._cond:
+            while not self._stopped:
+                if self._pending:
+                    now = time.monotonic()
+                    remaining = min(
+                        self._last_notified_at + TRAINING_DEBOUNCE_SECONDS - now,
+                        self._first_pending_at + TRAINING_MAX_DELAY_SECONDS - now,
+                    )
+                    if self._pending >= TRAINING_BATCH_SIZE or remaining <= 0:
+                        self._pending = 0
+                        self._first_pending_at = None
+                        return True
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            return False
+
+    def _run(self):
+        while self._wait_until_due():
+            try:
+                trained = train_increment()
+                if trained:
+                    print(f"📈 Incremental training on {trained} new logs")
+            except Exception as e:
+                print(f"Incremental training failed: {e}")
+
+
+training_service = TrainingService()
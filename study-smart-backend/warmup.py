@@ -0,0 +1,62 @@
+"""Background warm-up for the slow-to-import parts of the app.
+
+main.py keeps pandas, scikit-learn and the model weights out of its import graph so the auth
+routes can answer as soon as the process starts. The lifespan handler starts a Warmup, which runs
+the loader in a thread; endpoints that need the ML path await it, and /ready reports its status.
+"""
+import asyncio
+import time
+
+
+class Warmup:
+    def __init__(self, load):
+        self._load = load
+        self._task = None
+        self._started_at = None
+        self.value = None
+        self.error = None
+        self.seconds = None
+
+    def start(self):
+        if self._task is None:
+            self._started_at = time.perf_counter()
+            self._task = asyncio.ensure_future(asyncio.to_thread(self._run))
+        return self._task
+
+    def _run(self):
+        try:
+            self.value = self._load()
+            return self.value
+        except Exception as e:
+            self.error = e
+            raise
+        finally:
+            self.seconds = time.perf_counter() - self._started_at
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    async def wait(self):
+        """The loader's result, starting the warm-up if nothing has yet (e.g. no lifespan)."""
+        if self.value is not None:
+            return self.value
+        if self.error is not None:
+            # a failed warm-up is retried by the next caller rather than cached forever
+            self._task = None
+            self.error = None
+        return await asyncio.shield(self.start())
+
+    def status(self) -> dict:
+        if self.ready:
+            state = "ready"
+        elif self.error is not None:
+            state = "failed"
+        elif self._task is not None:
+            state = "warming"
+        else:
+            state = "cold"
+        status = {"status": state, "seconds": self.seconds}
+        if self.error is not None:
+            status["error"] = str(self.error)
+        return status